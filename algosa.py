@@ -0,0 +1,355 @@
+"""
+ALGOSA 배치 분석 CLI
+
+    python -m algosa analyze --category 103004 --workers 8
+    python -m algosa analyze                       # DB의 모든 카테고리
+    python -m algosa analyze --no-llm --force      # 요약 제외, 전부 다시 계산
+    python -m algosa analyze --changes             # 변경 로그(change_log)로 들어온 상품만
+    python -m algosa compact                       # 가격 이력 다운샘플링 + 처리된 변경 로그 정리
+
+상품마다 KPI / 키워드 / 사이즈 체감 신호(CPU, 프로세스 풀)를 계산하고,
+끝나는 대로 요약 3종(LLM I/O, 스레드 풀)을 이어서 요청한다. 결과는 상품 단위로
+product_analyses에 커밋되므로 중단 후 다시 실행하면 데이터 버전이 같은 완료 상품은 건너뛴다.
+마지막에 카테고리 전체 결과를 JSON(+ pyarrow가 있으면 Parquet) 리포트로 저장.
+
+--changes는 변경 로그의 'algosa.analyze' 오프셋 이후 변경된 상품만 대상으로 하고
+(수집 후 재계산 비용이 전체가 아닌 변경분에 비례), 끝나면 오류가 있어도 읽은 마지막 seq로
+오프셋을 커밋한다. 실패한 상품은 product_analyses에 status='error'(오류 내용은 error 컬럼)로
+남고, 요약 없이(--no-llm) 끝난 상품은 summary가 NULL로 남는다. 다음 --changes 실행이 이 행들을
+변경분과 함께 다시 시도하므로 (요약 없는 행은 --no-llm이 아닐 때만) 오프셋을 넘겨도 빠지지 않는다.
+오류가 하나라도 있으면 종료 코드는 1.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger("algosa.batch")
+
+CONSUMER = "algosa.analyze"   # 변경 로그 오프셋 이름
+
+SIZE_QUERY = "사이즈 정사이즈 발볼 발등 착화감 크다 작다"
+COORD_QUERY = "코디 스타일 청바지 슬랙스 데일리 색상 옷"
+
+# -------------------------
+# CPU 단계 (프로세스 풀 워커에서 실행)
+# -------------------------
+def _quiet_logs():
+    # 호출별 지표 로그와 Streamlit 런타임 없음 경고는 생략 (끝에 합계만 출력)
+    logging.getLogger("algosa.metrics").setLevel(logging.WARNING)
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+
+def _worker_init():
+    logging.basicConfig(level=logging.WARNING)
+    _quiet_logs()
+
+def prepare_product(product_id: str, category: str) -> dict:
+    """DB에서 리뷰를 읽어 KPI/키워드/사이즈 신호 계산 + 요약에 쓸 리뷰 선택"""
+    from modules.data import data_version, load_review_token_lists, _fetch_reviews_by_product, _fetch_keyword_counts
+    from modules.analytics import compute_kpis, keyword_freq, default_stopwords, fit_signals
+    from modules.distinctive import distinctive_terms
+    from modules.semantic import relevant_texts
+
+    t0 = time.perf_counter()
+    version = data_version(f"product:{product_id}")
+    reviews = _fetch_reviews_by_product(product_id)
+    base = {"product_id": product_id, "category": category, "data_version": version}
+    if reviews.empty:
+        return {**base, "status": "empty", "cpu_s": time.perf_counter() - t0}
+
+    rep = reviews[reviews["dup_of"].isna()] if "dup_of" in reviews else reviews
+    texts = rep["content"].dropna().tolist()
+
+    freq = _fetch_keyword_counts(product_id, limit=50)
+    if not freq:
+        freq = keyword_freq(texts, stopwords=default_stopwords(), tokens=load_review_token_lists(rep), top_k=50)
+    distinct = distinctive_terms(category, product_id, k=10) if category else []
+
+    return {
+        **base,
+        "status": "ok",
+        "kpis": compute_kpis(reviews),
+        "keywords": {
+            "top": [[t, int(c)] for t, c in sorted(freq.items(), key=lambda x: -x[1])],
+            "distinctive": [[t, round(float(s), 3)] for t, s in distinct],
+        },
+        "fit": fit_signals(texts),
+        "_texts": texts,
+        "_size_texts": relevant_texts(rep, SIZE_QUERY, k=80),
+        "_coord_texts": relevant_texts(rep, COORD_QUERY, k=80),
+        "cpu_s": time.perf_counter() - t0,
+    }
+
+# -------------------------
+# LLM 단계 (스레드 풀)
+# -------------------------
+def summarize_product(result: dict) -> dict:
+    from analyzer import summarize_reviews, summarize_size_and_fit, summarize_coordination, is_fallback
+
+    t0 = time.perf_counter()
+    pid = result["product_id"]
+    result["summary"] = summarize_reviews(result["_texts"], sample_size=50, product_id=pid)
+    result["size"] = summarize_size_and_fit(result["_size_texts"], sample_size=80, product_id=pid)
+    result["coordination"] = summarize_coordination(result["_coord_texts"], sample_size=80, product_id=pid)
+    result["llm_s"] = time.perf_counter() - t0
+
+    # 모델 호출/파싱 실패 시 analyzer는 기본값을 돌려준다 → 오류로 저장해 다음 실행에서 다시 시도
+    failed = [k for k in ("summary", "size", "coordination") if is_fallback(result[k])]
+    if failed:
+        logger.warning(f"[{pid}] 요약 실패: {', '.join(failed)}")
+        result["status"] = "error"
+        result["error"] = f"llm: 요약 실패 ({', '.join(failed)})"
+    return result
+
+# -------------------------
+# 실행
+# -------------------------
+def _categories(requested) -> list:
+    from config import engine
+    if requested:
+        return [str(c) for c in requested]
+    df = pd.read_sql("SELECT DISTINCT category FROM products WHERE category IS NOT NULL AND category <> ''", engine)
+    return sorted(df["category"].astype(str))
+
+def _products(categories) -> pd.DataFrame:
+    from config import engine
+    from db import _ph
+    marks = ",".join([_ph()] * len(categories))
+    return pd.read_sql(
+        f"SELECT product_id, category FROM products WHERE category IN ({marks}) ORDER BY category, product_id",
+        engine, params=tuple(categories),
+    ).astype(str)
+
+def _changed_products(limit: int, use_llm: bool) -> tuple[list, int | None]:
+    """
+    변경 로그에서 아직 처리하지 않은 변경 + 이전 실행에서 실패한 상품 → (상품 id 목록, 읽은 마지막 seq).
+    실패한 상품은 오프셋을 막지 않고 product_analyses의 error 행으로 남아 여기서 다시 시도된다.
+    요약을 하는 실행이면 --no-llm으로 요약 없이 끝난 상품도 다시 대상에 넣는다.
+    """
+    from db import read_changes, load_failed_analyses
+    changes = read_changes(CONSUMER, limit=limit)
+    failed = load_failed_analyses(limit, unsummarized=use_llm)
+    last_seq = int(changes["seq"].max()) if not changes.empty else None
+    return sorted(set(changes["product_id"].astype(str)) | set(failed)), last_seq
+
+def _todo(products: pd.DataFrame, force: bool, use_llm: bool) -> pd.DataFrame:
+    """
+    이어하기: 데이터 버전이 그대로이고 이미 완료(ok/empty)된 상품은 제외.
+    요약을 하는 실행에서는 요약 없이(--no-llm) 저장된 ok 행은 완료로 보지 않는다.
+    """
+    if force or products.empty:
+        return products
+    from db import load_analysis_status
+    from modules.data import data_version
+    done = load_analysis_status(products["product_id"])
+    keep = []
+    for pid in products["product_id"]:
+        ver, status, summarized = done.get(pid, (None, None, False))
+        complete = status == "empty" or (status == "ok" and (summarized or not use_llm))
+        keep.append(not (complete and ver == data_version(f"product:{pid}")))
+    return products[keep]
+
+def _save(result: dict):
+    from db import save_product_analysis
+    save_product_analysis({k: v for k, v in result.items() if not k.startswith("_")})
+
+def _progress(total: int):
+    try:
+        from tqdm import tqdm
+        return tqdm(total=total, unit="상품", dynamic_ncols=True)
+    except ImportError:
+        class _Log:
+            n = 0
+            def update(self, k=1):
+                self.n += k
+                if self.n % 10 == 0 or self.n == total:
+                    logger.info(f"{self.n}/{total}")
+            def set_postfix_str(self, s): pass
+            def close(self): pass
+        return _Log()
+
+def run_analysis(categories, workers: int, llm_workers: int, use_llm: bool, force: bool,
+                 only: list | None = None) -> dict:
+    products = _products(categories)
+    if only is not None:
+        products = products[products["product_id"].isin(only)]
+    todo = _todo(products, force, use_llm)
+    stats = {
+        "categories": categories, "products": len(products), "skipped": len(products) - len(todo),
+        "done": 0, "errors": 0, "cpu_s": 0.0, "llm_s": 0.0,
+    }
+    if todo.empty:
+        return stats
+
+    t0 = time.perf_counter()
+    bar = _progress(len(todo))
+    cpu_pool = (ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"), initializer=_worker_init)
+                if workers > 1 else ThreadPoolExecutor(max_workers=1))
+    llm_pool = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="algosa-llm")
+
+    def finish(result: dict):
+        _save(result)
+        stats["done"] += 1
+        stats["errors"] += int(result.get("status") == "error")
+        stats["cpu_s"] += result.get("cpu_s", 0.0)
+        stats["llm_s"] += result.get("llm_s", 0.0)
+        bar.update(1)
+        bar.set_postfix_str(f"{stats['done'] / (time.perf_counter() - t0):.1f}/s 오류 {stats['errors']}")
+
+    def failed(pid: str, category: str, stage: str, e: Exception) -> dict:
+        logger.warning(f"[{pid}] {stage} 실패: {e}")
+        return {"product_id": pid, "category": category, "data_version": None,
+                "status": "error", "error": f"{stage}: {type(e).__name__}: {e}"}
+
+    try:
+        pending = {}
+        for pid, cat in todo.itertuples(index=False, name=None):
+            pending[cpu_pool.submit(prepare_product, pid, cat)] = ("cpu", pid, cat)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, pid, cat = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    finish(failed(pid, cat, stage, e))
+                    continue
+                # CPU 단계가 끝난 상품은 바로 요약 요청 (다른 상품의 CPU 작업과 겹쳐 진행)
+                if stage == "cpu" and use_llm and result["status"] == "ok":
+                    pending[llm_pool.submit(summarize_product, result)] = ("llm", pid, cat)
+                else:
+                    finish(result)
+    finally:
+        bar.close()
+        cpu_pool.shutdown(cancel_futures=True)
+        llm_pool.shutdown(cancel_futures=True)
+
+    stats["cpu_s"], stats["llm_s"] = round(stats["cpu_s"], 2), round(stats["llm_s"], 2)
+    stats["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    stats["products_per_s"] = round(stats["done"] / max(stats["elapsed_s"], 1e-9), 2)
+    return stats
+
+# -------------------------
+# 리포트
+# -------------------------
+def _report_frame(categories) -> pd.DataFrame:
+    from config import engine
+    from db import _ph
+    marks = ",".join([_ph()] * len(categories))
+    df = pd.read_sql(f"SELECT * FROM product_analyses WHERE category IN ({marks})", engine, params=tuple(categories))
+    if df.empty:
+        return df
+
+    def parse(col):
+        return df[col].map(lambda v: json.loads(v) if isinstance(v, str) and v else {})
+
+    kpis, fit, kw = parse("kpis"), parse("fit"), parse("keywords")
+    summary, size, coord = parse("summary"), parse("size"), parse("coordination")
+    flat = pd.DataFrame({
+        "product_id": df["product_id"], "category": df["category"],
+        "data_version": df["data_version"], "status": df["status"], "error": df["error"],
+        "reviews": kpis.map(lambda k: k.get("total")), "pos": kpis.map(lambda k: k.get("pos")),
+        "neu": kpis.map(lambda k: k.get("neu")), "neg": kpis.map(lambda k: k.get("neg")),
+        "duplicates": kpis.map(lambda k: k.get("duplicates")),
+        **{f"fit_{name}": fit.map(lambda f, n=name: f.get(n)) for name in ("small", "large", "true", "wide_foot")},
+        "top_keywords": kw.map(lambda k: ", ".join(t for t, _ in k.get("top", [])[:10])),
+        "distinctive": kw.map(lambda k: ", ".join(t for t, _ in k.get("distinctive", []))),
+        "overall": summary.map(lambda s: s.get("positive_negative")),
+        "size_summary": size.map(lambda s: s.get("size_summary")),
+        "coord_summary": coord.map(lambda s: s.get("coord_summary")),
+        "updated_at": df["updated_at"],
+    })
+    return flat.sort_values(["category", "product_id"]).reset_index(drop=True)
+
+def write_report(categories, out_dir: str) -> list:
+    df = _report_frame(categories)
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.join(out_dir, f"analysis_{'-'.join(categories)}_{datetime.now():%Y%m%d_%H%M%S}")
+    paths = [stem + ".json"]
+    df.to_json(paths[0], orient="records", force_ascii=False, indent=1)
+    try:
+        df.to_parquet(stem + ".parquet", index=False)
+        paths.append(stem + ".parquet")
+    except ImportError:
+        logger.info("pyarrow가 없어 Parquet 리포트는 생략")
+    return paths
+
+def _default_report_dir() -> str:
+    import config
+    default = os.path.join(os.path.dirname(getattr(config, "DB_PATH", "./db/musinsa.db")) or ".", "reports")
+    return getattr(config, "REPORT_DIR", default)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m algosa", description="ALGOSA 배치 분석")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("analyze", help="카테고리 전체 상품 분석")
+    p.add_argument("--category", action="append", help="카테고리 코드 (여러 번 지정 가능, 생략 시 전체)")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="CPU 단계 프로세스 수")
+    p.add_argument("--llm-workers", type=int, default=8, help="동시 모델 호출 수")
+    p.add_argument("--no-llm", action="store_true", help="요약(모델 호출) 생략")
+    p.add_argument("--force", action="store_true", help="완료된 상품도 다시 계산")
+    p.add_argument("--changes", action="store_true", help="변경 로그로 들어온 상품 + 이전 실패 상품만 (끝나면 오프셋 커밋)")
+    p.add_argument("--changes-limit", type=int, default=5000, help="한 번에 읽을 변경 수")
+    p.add_argument("--out-dir", default=None, help="리포트 저장 폴더 (기본: DB 폴더/reports)")
+    c = sub.add_parser("compact", help="가격 이력 다운샘플링 + 처리된 변경 로그 정리")
+    c.add_argument("--daily-after-days", type=int, default=None, help="이보다 오래된 이력은 하루 1행 (기본 30)")
+    c.add_argument("--weekly-after-days", type=int, default=None, help="이보다 오래된 이력은 주 1행 (기본 180)")
+    args = parser.parse_args(argv)
+    if args.command == "analyze" and args.changes and args.category:
+        parser.error("--changes는 --category와 함께 쓸 수 없습니다 (오프셋은 전체 변경 기준)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    _quiet_logs()
+
+    import config
+    if not config.USE_MYSQL:
+        from db import init_db
+        init_db()
+
+    if args.command == "compact":
+        from db import compact_product_history, trim_change_log
+        stats = {"history": compact_product_history(args.daily_after_days, args.weekly_after_days),
+                 "change_log_trimmed": trim_change_log()}
+        logger.info(json.dumps({"event": "compact_done", **stats}, ensure_ascii=False))
+        return 0
+
+    categories = _categories(args.category)
+    if not categories:
+        logger.error("분석할 카테고리가 없습니다 (products 테이블이 비어 있음)")
+        return 1
+
+    only, last_seq = None, None
+    if args.changes:
+        only, last_seq = _changed_products(args.changes_limit, use_llm=not args.no_llm)
+        if not only and last_seq is None:
+            logger.info("처리할 변경이 없습니다")
+            return 0
+
+    stats = run_analysis(categories, max(1, args.workers), max(1, args.llm_workers),
+                         use_llm=not args.no_llm, force=args.force, only=only)
+    if last_seq is not None:
+        # 실패한 상품은 error로 저장됐으므로 오프셋은 넘긴다 (다음 --changes 실행에서 재시도)
+        from db import commit_offset, trim_change_log
+        commit_offset(CONSUMER, last_seq)
+        stats["offset"] = last_seq
+        stats["trimmed"] = trim_change_log()
+    paths = write_report(categories, args.out_dir or _default_report_dir())
+
+    from modules import metrics
+    llm = metrics.snapshot()["by_kind"]
+    stats["llm_calls"] = sum(b["calls"] for b in llm.values())
+    stats["llm_cost_usd"] = round(sum(b["cost_usd"] for b in llm.values()), 4)
+    logger.info(json.dumps({"event": "batch_done", **stats, "reports": paths}, ensure_ascii=False))
+    return 1 if stats["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,47 @@
 import json
 import re
+import hashlib
 import logging
-from openai import OpenAI
+import threading
+from copy import deepcopy
+from cachetools import LRUCache
+import config
 from config import OPENAI_API_KEY
+from modules import metrics, tracing
+from modules.cache import shared_cache
 
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+# 첫 모델 호출 때 생성 (openai 패키지 import만 0.5초+). 벤치마크/테스트는 스텁을 직접 대입
+client = None
+_client_lock = threading.Lock()
 
-def summarize_reviews(reviews, sample_size=50):
-    """
-    리뷰 리스트를 받아서 전체적인 평가 요약을 JSON 형태로 반환
-    - positive_negative: 긍정/부정 의견 핵심
-    - features: 자주 언급된 특징
-    - cautions: 소비자가 주의해야 할 점
-    """
-    text = "\n".join(reviews[:sample_size])
+def get_client():
+    """OpenAI 클라이언트 (키가 없으면 None)"""
+    global client
+    if client is None and OPENAI_API_KEY:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=OPENAI_API_KEY)
+    return client
+
+MODEL = "gpt-4o-mini"
+MAX_RETRIES = 2
+# 다른 레플리카가 같은 요약을 호출 중일 때 기다리는 최대 시간 (넘으면 직접 호출)
+LOCK_WAIT = float(getattr(config, "LLM_LOCK_WAIT", 20))
+# 실패한 프롬프트는 잠시 기억 → 기다리던 레플리카/다음 요청이 곧바로 같은 호출을 반복하지 않는다
+FAILURE_TTL = float(getattr(config, "LLM_FAILURE_TTL", 30))
 
-    prompt = f"""
+# 같은 프롬프트(=같은 리뷰 샘플)에 대한 결과 재사용
+# 프로세스 내 LRU → 레플리카 공유 캐시(modules.cache) 순으로 조회
+_cache: LRUCache = LRUCache(maxsize=256)
+_cache_lock = threading.Lock()
+
+# -------------------------
+# 프롬프트 구성
+# -------------------------
+def build_summary_prompt(reviews, sample_size=50) -> str:
+    text = "\n".join(reviews[:sample_size])
+    return f"""
     다음은 어떤 상품에 대한 리뷰 모음입니다.
     이를 읽고 다음 항목에 따라 요약하세요.
     - positive_negative: 긍정/부정 핵심의견을 통한 전반적인 평가를 구체적으로 해주세요.
@@ -33,34 +59,9 @@ def summarize_reviews(reviews, sample_size=50):
     }}
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful review analysis assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=600
-        )
-        content = response.choices[0].message.content.strip()
-
-        match = re.search(r"\{.*\}", content, re.S)
-        if match:
-            content = match.group()
-
-        return json.loads(content)
-
-    except Exception as e:
-        logging.error(f"요약 분석 실패: {e}")
-        return {
-            "positive_negative": "⚠️ 요약 실패",
-            "features": [],
-            "cautions": []
-        }
-    
-def summarize_size_and_fit(reviews, sample_size=80):
+def build_size_prompt(reviews, sample_size=80) -> str:
     text = "\n".join(reviews[:sample_size])
-    prompt = f"""
+    return f"""
     아래는 어떤 신발에 대한 사용자 리뷰입니다. '사이즈 체감/착화감'만 요약하세요.
     - size_summary: 한 문장 요약(예: '정사이즈 경향, 발볼 넓으면 반 사이즈 업 권장')
     - recommendations: 소비자에게 줄 구체 조언 3가지(사이즈 선택, 발볼/발등, 양말 두께/끈 조절 등)
@@ -72,24 +73,10 @@ def summarize_size_and_fit(reviews, sample_size=80):
       "recommendations": ["조언1","조언2","조언3"]
     }}
     """
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"system","content":"You are a concise sizing assistant."},
-                      {"role":"user","content":prompt}],
-            max_tokens=400
-        )
-        import json, re
-        s = resp.choices[0].message.content.strip()
-        m = re.search(r"\{.*\}", s, re.S)
-        if m: s = m.group()
-        return json.loads(s)
-    except Exception:
-        return {"size_summary":"요약 실패","recommendations":[]}
-
-def summarize_coordination(reviews, sample_size=80):
+
+def build_coordination_prompt(reviews, sample_size=80) -> str:
     text = "\n".join(reviews[:sample_size])
-    prompt = f"""
+    return f"""
     아래 리뷰를 바탕으로 '코디/활용'만 요약하세요.
     - coord_summary: 한 문장 요약(예: '캐주얼·데일리에 적합, 슬랙스/데님 매치 좋음')
     - outfit_tips: 코디 팁 3가지(스타일/계절/활동/컬러 등)
@@ -101,17 +88,308 @@ def summarize_coordination(reviews, sample_size=80):
       "outfit_tips": ["팁1","팁2","팁3"]
     }}
     """
+
+# -------------------------
+# 공통 호출부 (캐시 + 재시도 + 계측)
+# -------------------------
+def _cache_key(kind: str, prompt: str) -> str:
+    return hashlib.sha1(f"{MODEL}\x00{kind}\x00{prompt}".encode("utf-8")).hexdigest()
+
+def _parse_json(content: str, call: metrics.LLMCall):
+    """JSON 그대로 파싱 → 실패 시 {...} 구간만 잘라 재시도"""
+    content = content.strip()
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"system","content":"You are a styling assistant."},
-                      {"role":"user","content":prompt}],
-            max_tokens=400
-        )
-        import json, re
-        s = resp.choices[0].message.content.strip()
-        m = re.search(r"\{.*\}", s, re.S)
-        if m: s = m.group()
-        return json.loads(s)
-    except Exception:
-        return {"coord_summary":"요약 실패","outfit_tips":[]}
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    call.parse_fallback = True
+    match = re.search(r"\{.*\}", content, re.S)
+    if match:
+        try:
+            return json.loads(match.group())
+        except json.JSONDecodeError:
+            pass
+    call.parse_failed = True
+    return None
+
+def _lookup(key: str):
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is None:
+        cached = shared_cache().get(f"llm:{key}")
+        if cached is not None:
+            with _cache_lock:
+                _cache[key] = cached
+    return deepcopy(cached) if cached is not None else None
+
+def _remember(key: str, result: dict):
+    with _cache_lock:
+        _cache[key] = deepcopy(result)
+    shared_cache().set(f"llm:{key}", result)
+
+def _failed_recently(key: str) -> bool:
+    return shared_cache().get(f"llm:fail:{key}") is not None
+
+def _remember_failure(key: str):
+    if FAILURE_TTL > 0:   # LLM_FAILURE_TTL=0: 실패를 기억하지 않음
+        shared_cache().set(f"llm:fail:{key}", True, ttl=FAILURE_TTL)
+
+def clear_cache():
+    """요약 결과 캐시(프로세스 LRU + 공유 캐시의 llm 항목)를 비운다"""
+    with _cache_lock:
+        _cache.clear()
+    shared_cache().clear("llm")
+
+def _request_json(kind: str, system: str, prompt: str, max_tokens: int, fallback: dict, product_id=None) -> dict:
+    key = _cache_key(kind, prompt)
+    cached = _lookup(key)
+    metrics.record_cache(kind, product_id, hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    if _failed_recently(key):
+        return fallback
+
+    # 다른 레플리카/스레드가 같은 프롬프트를 호출 중이면 (최대 LOCK_WAIT초) 기다렸다가 결과 재사용
+    with shared_cache().lock(f"llm:{key}", timeout=LOCK_WAIT):
+        cached = _lookup(key)
+        if cached is not None:
+            return cached
+        if _failed_recently(key):
+            return fallback
+        with tracing.span(f"llm.{kind}"):
+            result = _call_json(kind, system, prompt, max_tokens, fallback, product_id, key)
+        if result is fallback:
+            _remember_failure(key)
+        return result
+
+def _retryable(e: Exception) -> bool:
+    """일시적 오류(타임아웃/연결/429/5xx)만 재시도. 인증·요청 오류는 바로 실패"""
+    from openai import APIConnectionError, APIStatusError, RateLimitError
+    if isinstance(e, (APIConnectionError, RateLimitError)):  # APITimeoutError 포함
+        return True
+    return isinstance(e, APIStatusError) and e.status_code >= 500
+
+def _call_json(kind, system, prompt, max_tokens, fallback, product_id, key) -> dict:
+    with metrics.llm_call(kind, product_id, MODEL) as call:
+        llm = get_client()
+        if llm is None:
+            call.error = "OPENAI_API_KEY not configured"
+            logging.error(f"[{kind}] 요약 분석 실패: {call.error}")
+            return fallback
+
+        response = None
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = llm.chat.completions.create(
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens
+                )
+                break
+            except Exception as e:
+                if attempt == MAX_RETRIES or not _retryable(e):
+                    call.error = f"{type(e).__name__}: {e}"
+                    logging.error(f"[{kind}] 요약 분석 실패: {e}")
+                    return fallback
+                call.retries += 1
+                logging.warning(f"[{kind}] 모델 호출 재시도 {attempt + 1}/{MAX_RETRIES}: {e}")
+
+        call.set_usage(getattr(response, "usage", None))
+        result = _parse_json(response.choices[0].message.content or "", call)
+        if not isinstance(result, dict):
+            call.parse_failed = True
+            logging.error(f"[{kind}] 응답 JSON 파싱 실패")
+            return fallback
+
+    _remember(key, result)
+    return result
+
+# -------------------------
+# 스트리밍 호출 (필드 단위 점진 파싱)
+# -------------------------
+_json_decoder = json.JSONDecoder()
+
+def _completed_fields(buf: str, fields, done: set) -> dict:
+    """누적 버퍼에서 값이 닫힌(완성된) 필드만 꺼낸다. 미완성 값은 다음 청크에서 재시도"""
+    out = {}
+    for key in fields:
+        if key in done:
+            continue
+        m = re.search(rf'"{re.escape(key)}"\s*:\s*', buf)
+        if not m or m.end() >= len(buf):
+            continue
+        try:
+            value, _ = _json_decoder.raw_decode(buf, m.end())
+        except json.JSONDecodeError:
+            continue
+        out[key] = value
+    return out
+
+def _stream_json(kind: str, system: str, prompt: str, max_tokens: int, fallback: dict,
+                 on_field=None, product_id=None) -> dict:
+    """
+    stream=True로 호출하여 필드가 완성되는 즉시 on_field(key, value)를 호출.
+    최종 결과는 일반 호출과 같은 캐시에 저장된다.
+    """
+    fields = list(fallback.keys())
+    emit = on_field or (lambda k, v: None)
+
+    def replay(cached: dict) -> dict:
+        for f in fields:
+            emit(f, deepcopy(cached.get(f, fallback[f])))
+        return cached
+
+    key = _cache_key(kind, prompt)
+    cached = _lookup(key)
+    metrics.record_cache(kind, product_id, hit=cached is not None)
+    if cached is not None:
+        return replay(cached)
+
+    if _failed_recently(key):
+        return replay(fallback)
+
+    with shared_cache().lock(f"llm:{key}", timeout=LOCK_WAIT):
+        cached = _lookup(key)
+        if cached is not None:
+            return replay(cached)
+        if _failed_recently(key):
+            return replay(fallback)
+        with tracing.span(f"llm.{kind}", stream=True):
+            result = _call_stream(kind, system, prompt, max_tokens, fallback, emit, fields, product_id, key)
+        if result is fallback:
+            _remember_failure(key)
+        return result
+
+def _call_stream(kind, system, prompt, max_tokens, fallback, emit, fields, product_id, key) -> dict:
+    done: set = set()
+    result = None
+    with metrics.llm_call(kind, product_id, MODEL) as call:
+        llm = get_client()
+        if llm is None:
+            call.error = "OPENAI_API_KEY not configured"
+            logging.error(f"[{kind}] 요약 분석 실패: {call.error}")
+        else:
+            buf = ""
+            for attempt in range(MAX_RETRIES + 1):
+                try:
+                    stream = llm.chat.completions.create(
+                        model=MODEL,
+                        messages=[
+                            {"role": "system", "content": system},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=max_tokens,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+                    for chunk in stream:
+                        if getattr(chunk, "usage", None):
+                            call.set_usage(chunk.usage)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        call.first_token()
+                        buf += delta
+                        for f, v in _completed_fields(buf, fields, done).items():
+                            done.add(f)
+                            emit(f, v)
+                    break
+                except Exception as e:
+                    # 이미 화면에 일부가 나갔다면 재시도하지 않는다
+                    if done or attempt == MAX_RETRIES or not _retryable(e):
+                        call.error = f"{type(e).__name__}: {e}"
+                        logging.error(f"[{kind}] 스트리밍 요약 실패: {e}")
+                        break
+                    call.retries += 1
+                    buf = ""
+                    logging.warning(f"[{kind}] 모델 호출 재시도 {attempt + 1}/{MAX_RETRIES}: {e}")
+
+            if call.error is None:
+                result = _parse_json(buf, call)
+                if not isinstance(result, dict):
+                    call.parse_failed = True
+                    result = None
+
+    if result is None:
+        for f in fields:
+            if f not in done:
+                emit(f, fallback[f])
+        return fallback
+
+    # 스트림 중 놓친 필드(파서가 못 잡은 경우) 마무리
+    for f in fields:
+        if f not in done:
+            emit(f, result.get(f, fallback[f]))
+
+    _remember(key, result)
+    return result
+
+# -------------------------
+# 요약 함수
+# -------------------------
+_SUMMARY_FALLBACK = {
+    "positive_negative": "⚠️ 요약 실패",
+    "features": [],
+    "cautions": []
+}
+_SIZE_FALLBACK = {"size_summary": "요약 실패", "recommendations": []}
+_COORD_FALLBACK = {"coord_summary": "요약 실패", "outfit_tips": []}
+
+def is_fallback(result) -> bool:
+    """모델 호출/파싱 실패 시 돌려준 기본값인지. 이런 결과는 메모/캐시/저장하지 않는다"""
+    return any(result == fb for fb in (_SUMMARY_FALLBACK, _SIZE_FALLBACK, _COORD_FALLBACK))
+
+def summarize_reviews(reviews, sample_size=50, product_id=None):
+    """
+    리뷰 리스트를 받아서 전체적인 평가 요약을 JSON 형태로 반환
+    - positive_negative: 긍정/부정 의견 핵심
+    - features: 자주 언급된 특징
+    - cautions: 소비자가 주의해야 할 점
+    """
+    return _request_json(
+        "summary",
+        "You are a helpful review analysis assistant.",
+        build_summary_prompt(reviews, sample_size),
+        max_tokens=600,
+        fallback=deepcopy(_SUMMARY_FALLBACK),
+        product_id=product_id,
+    )
+
+def summarize_size_and_fit(reviews, sample_size=80, product_id=None):
+    return _request_json(
+        "size",
+        "You are a concise sizing assistant.",
+        build_size_prompt(reviews, sample_size),
+        max_tokens=400,
+        fallback=deepcopy(_SIZE_FALLBACK),
+        product_id=product_id,
+    )
+
+def summarize_coordination(reviews, sample_size=80, product_id=None):
+    return _request_json(
+        "coordination",
+        "You are a styling assistant.",
+        build_coordination_prompt(reviews, sample_size),
+        max_tokens=400,
+        fallback=deepcopy(_COORD_FALLBACK),
+        product_id=product_id,
+    )
+
+def stream_summary(reviews, sample_size=50, product_id=None, on_field=None):
+    """summarize_reviews의 스트리밍 버전. 필드가 완성될 때마다 on_field(key, value) 호출"""
+    return _stream_json(
+        "summary",
+        "You are a helpful review analysis assistant.",
+        build_summary_prompt(reviews, sample_size),
+        max_tokens=600,
+        fallback=deepcopy(_SUMMARY_FALLBACK),
+        on_field=on_field,
+        product_id=product_id,
+    )
@@ -0,0 +1,373 @@
+"""
+ALGOSA JSON API (Streamlit 런타임 없이 분석 결과 제공)
+
+    python api.py --port 8502
+
+GET /api/health
+GET /api/categories/{category}/products
+GET /api/products/{product_id}/reviews?page_size=50&cursor=...&min_grade=&max_grade=&start_date=&end_date=&q=
+GET /api/products/{product_id}/kpis
+GET /api/products/{product_id}/keywords?limit=50
+GET /api/products/{product_id}/summaries
+GET /api/metrics
+GET /metrics                  (Prometheus text: 단계별 소요시간 히스토그램)
+
+응답은 (경로, 쿼리, 데이터 버전) 키로 직렬화·gzip까지 끝낸 바이트를 캐시하므로
+같은 데이터 버전 동안은 DB/모델 호출 없이 바로 내려간다. ETag/Last-Modified는
+data_versions에서 만들고, 수집이 커밋되면 버전이 올라가 자동으로 새로 계산된다.
+"""
+import os
+import json
+import gzip
+import base64
+import asyncio
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache, TTLCache
+from sqlalchemy import text
+import tornado.web
+import tornado.ioloop
+
+import config
+from modules import metrics, tracing
+from modules.cache import shared_cache
+from modules.data import (
+    data_stamp, load_review_token_lists,
+    _fetch_products_by_category, _fetch_reviews_by_product, _fetch_keyword_counts,
+    _fetch_review_page, _fetch_review_count,
+)
+from modules.analytics import compute_kpis, keyword_freq, default_stopwords
+from modules.distinctive import distinctive_terms
+from modules.semantic import relevant_texts
+from analyzer import summarize_reviews, summarize_size_and_fit, summarize_coordination, is_fallback
+
+logger = logging.getLogger("algosa.api")
+
+SIZE_QUERY = "사이즈 정사이즈 발볼 발등 착화감 크다 작다"
+COORD_QUERY = "코디 스타일 청바지 슬랙스 데일리 색상 옷"
+MAX_PAGE_SIZE = 200
+
+# -------------------------
+# 직렬화
+# -------------------------
+def _json_default(v):
+    if isinstance(v, (pd.Timestamp, datetime)):
+        return v.isoformat()
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, np.floating):
+        return None if np.isnan(v) else float(v)
+    return str(v)
+
+def _records(df: pd.DataFrame) -> list:
+    dates = df.select_dtypes("datetime").columns
+    df = df.assign(**{c: df[c].dt.strftime("%Y-%m-%d") for c in dates})
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+def _encode_cursor(cursor) -> str | None:
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip("=")
+
+def _decode_cursor(raw: str | None):
+    if not raw:
+        return None
+    try:
+        date, review_no = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        return (None if date is None else str(date)), str(review_no)   # None: 작성일 없는 리뷰 구간
+    except Exception:
+        raise tornado.web.HTTPError(400, reason="invalid cursor")
+
+# -------------------------
+# 리소스 (블로킹 → 스레드 풀에서 실행)
+# -------------------------
+def _product_reviews(product_id: str) -> pd.DataFrame:
+    df = _fetch_reviews_by_product(product_id)
+    if df.empty:
+        raise tornado.web.HTTPError(404, reason="product has no reviews")
+    return df
+
+def _representatives(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df["dup_of"].isna()] if "dup_of" in df else df
+
+def _category_of(product_id: str) -> str | None:
+    with config.engine.connect() as conn:
+        return conn.execute(text("SELECT category FROM products WHERE product_id = :pid"), {"pid": product_id}).scalar()
+
+def get_products(category: str) -> dict:
+    df = _fetch_products_by_category(category)
+    return {"category": category, "count": len(df), "products": _records(df)}
+
+def get_reviews(product_id: str, cursor, page_size: int, filters: dict) -> dict:
+    page, next_cursor = _fetch_review_page(product_id, cursor, page_size, **filters)
+    return {
+        "product_id": product_id,
+        "total": _fetch_review_count(product_id, **filters),
+        "page_size": page_size,
+        "next_cursor": _encode_cursor(next_cursor),
+        "reviews": _records(page),
+    }
+
+def get_kpis(product_id: str) -> dict:
+    kpis = compute_kpis(_product_reviews(product_id))
+    return {"product_id": product_id, **kpis}
+
+def get_keywords(product_id: str, limit: int) -> dict:
+    freq = _fetch_keyword_counts(product_id, limit=limit)
+    if not freq:
+        rep = _representatives(_product_reviews(product_id))
+        freq = keyword_freq(
+            rep["content"].dropna().tolist(),
+            stopwords=default_stopwords(),
+            tokens=load_review_token_lists(rep),
+            top_k=limit,
+        )
+    category = _category_of(product_id)
+    distinct = distinctive_terms(category, product_id, k=10) if category else []
+    return {
+        "product_id": product_id,
+        "keywords": [{"term": t, "count": int(c)} for t, c in sorted(freq.items(), key=lambda x: -x[1])],
+        "distinctive": [{"term": t, "score": round(s, 3)} for t, s in distinct],
+    }
+
+def get_summaries(product_id: str) -> dict:
+    rep = _representatives(_product_reviews(product_id))
+    texts = rep["content"].dropna().tolist()
+    return {
+        "product_id": product_id,
+        "summary": summarize_reviews(texts, sample_size=50, product_id=product_id),
+        "size": summarize_size_and_fit(relevant_texts(rep, SIZE_QUERY, k=80), sample_size=80, product_id=product_id),
+        "coordination": summarize_coordination(relevant_texts(rep, COORD_QUERY, k=80), sample_size=80, product_id=product_id),
+    }
+
+def summaries_complete(payload: dict) -> bool:
+    """요약 중 하나라도 실패 기본값이면 False → 캐시/ETag 없이 내려보내 다음 요청에서 다시 시도"""
+    return not any(is_fallback(payload[k]) for k in ("summary", "size", "coordination"))
+
+# -------------------------
+# 응답 캐시 (직렬화 + gzip 결과를 버전별로 보관)
+# -------------------------
+class CachedResponse:
+    __slots__ = ("etag", "last_modified", "body", "gzipped")
+
+    def __init__(self, etag: str | None, last_modified: datetime | None, body: bytes):
+        self.etag = etag   # None이면 캐시하지 않는 응답 (Cache-Control: no-store)
+        self.last_modified = last_modified
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= 1024 else None
+
+_responses = LRUCache(maxsize=int(getattr(config, "API_CACHE_ENTRIES", 2048)))
+# 버전 조회도 짧게 재사용 (수집 결과는 최대 API_VERSION_TTL초 뒤 반영)
+_stamps = TTLCache(maxsize=4096, ttl=float(getattr(config, "API_VERSION_TTL", 1.0)))
+_inflight: dict = {}
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+_executor: ThreadPoolExecutor | None = None
+
+def _last_modified(updated_at: str | None) -> datetime | None:
+    if not updated_at:
+        return None
+    try:
+        return datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc, microsecond=0)
+    except ValueError:
+        return None
+
+async def _stamp(scope: str | None) -> tuple:
+    if scope is None:
+        return 0, None
+    stamp = _stamps.get(scope)
+    if stamp is None:
+        stamp = _stamps[scope] = await asyncio.get_running_loop().run_in_executor(_executor, data_stamp, scope)
+    return stamp
+
+def _traced(name: str, compute):
+    def run():
+        with tracing.span(name):
+            return compute()
+    return run
+
+async def cached_response(key: tuple, scope: str | None, compute, cacheable=lambda payload: True) -> CachedResponse:
+    """
+    같은 (key, 버전)은 한 번만 계산 (동시 요청은 진행 중인 계산을 함께 기다림).
+    cacheable(payload)가 False면 보관하지 않고 이번 요청(과 함께 기다린 요청)에만 쓴다
+    """
+    loop = asyncio.get_running_loop()
+    version, updated_at = await _stamp(scope)
+    full_key = (*key, version)
+
+    hit = _responses.get(full_key)
+    if hit is not None:
+        _stats["hits"] += 1
+        return hit
+
+    future = _inflight.get(full_key)
+    if future is None:
+        _stats["misses"] += 1
+        future = _inflight[full_key] = loop.create_future()
+        try:
+            payload = await loop.run_in_executor(_executor, _traced(f"api.{key[0]}", compute))
+            body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+            if cacheable(payload):
+                etag = 'W/"%s"' % hashlib.blake2b(repr(full_key).encode() + body, digest_size=12).hexdigest()
+                resp = _responses[full_key] = CachedResponse(etag, _last_modified(updated_at), body)
+            else:
+                resp = CachedResponse(None, None, body)
+            future.set_result(resp)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()   # 기다리는 요청이 없을 때 경고 방지
+            raise
+        finally:
+            _inflight.pop(full_key, None)
+    return await future
+
+# -------------------------
+# 핸들러
+# -------------------------
+class BaseHandler(tornado.web.RequestHandler):
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.set_header("Cache-Control", "no-cache")   # 매번 재검증 (ETag로 304)
+
+    def compute_etag(self):
+        # 캐시하지 않는 응답(요약 실패 포함)은 tornado 기본 ETag도 붙이지 않는다 (304로 굳지 않게)
+        if self._headers.get("Cache-Control") == "no-store":
+            return None
+        return super().compute_etag()
+
+    def write_error(self, status_code, **kwargs):
+        self.finish(json.dumps({"error": self._reason, "status": status_code}, ensure_ascii=False))
+
+    def send_cached(self, resp: CachedResponse):
+        self.set_header("Vary", "Accept-Encoding")
+        if resp.etag is None:
+            self.set_header("Cache-Control", "no-store")
+        else:
+            self.set_header("ETag", resp.etag)
+        if resp.last_modified:
+            self.set_header("Last-Modified", format_datetime(resp.last_modified, usegmt=True))
+
+        if resp.etag is not None and self._not_modified(resp):
+            _stats["not_modified"] += 1
+            self.set_status(304)
+            return self.finish()
+
+        if resp.gzipped is not None and "gzip" in self.request.headers.get("Accept-Encoding", ""):
+            self.set_header("Content-Encoding", "gzip")
+            return self.finish(resp.gzipped)
+        return self.finish(resp.body)
+
+    def _not_modified(self, resp: CachedResponse) -> bool:
+        inm = self.request.headers.get("If-None-Match")
+        if inm:
+            return resp.etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*"
+        ims = self.request.headers.get("If-Modified-Since")
+        if ims and resp.last_modified:
+            try:
+                return resp.last_modified <= parsedate_to_datetime(ims)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def int_arg(self, name: str, default: int, lo: int, hi: int) -> int:
+        raw = self.get_argument(name, None)
+        if raw is None:
+            return default
+        try:
+            return max(lo, min(hi, int(raw)))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"invalid {name}")
+
+    async def respond(self, key: tuple, scope: str | None, compute, cacheable=lambda payload: True):
+        self.send_cached(await cached_response(key, scope, compute, cacheable))
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.finish({"status": "ok"})
+
+class ProductsHandler(BaseHandler):
+    async def get(self, category):
+        await self.respond(("products", category), f"category:{category}", lambda: get_products(category))
+
+class ReviewsHandler(BaseHandler):
+    async def get(self, product_id):
+        page_size = self.int_arg("page_size", 50, 1, MAX_PAGE_SIZE)
+        cursor = _decode_cursor(self.get_argument("cursor", None))
+        filters = {
+            "min_grade": self.int_arg("min_grade", 1, 1, 5),
+            "max_grade": self.int_arg("max_grade", 5, 1, 5),
+            "start_date": self.get_argument("start_date", None),
+            "end_date": self.get_argument("end_date", None),
+            "text_query": self.get_argument("q", None) or None,
+        }
+        key = ("reviews", product_id, cursor, page_size, tuple(sorted(filters.items())))
+        await self.respond(key, f"product:{product_id}", lambda: get_reviews(product_id, cursor, page_size, filters))
+
+class KpisHandler(BaseHandler):
+    async def get(self, product_id):
+        await self.respond(("kpis", product_id), f"product:{product_id}", lambda: get_kpis(product_id))
+
+class KeywordsHandler(BaseHandler):
+    async def get(self, product_id):
+        limit = self.int_arg("limit", 50, 1, 500)
+        await self.respond(("keywords", product_id, limit), f"product:{product_id}", lambda: get_keywords(product_id, limit))
+
+class SummariesHandler(BaseHandler):
+    async def get(self, product_id):
+        await self.respond(("summaries", product_id), f"product:{product_id}", lambda: get_summaries(product_id),
+                           cacheable=summaries_complete)
+
+class PrometheusHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(tracing.prometheus_text())
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.finish(json.dumps({
+            "llm": metrics.snapshot(),
+            "response_cache": {**_stats, "entries": len(_responses), "max_entries": _responses.maxsize},
+            "shared_cache": shared_cache().stats(),
+        }, ensure_ascii=False, default=_json_default))
+
+
+def make_app() -> tornado.web.Application:
+    pid = r"([^/]+)"
+    return tornado.web.Application([
+        (r"/api/health", HealthHandler),
+        (rf"/api/categories/{pid}/products", ProductsHandler),
+        (rf"/api/products/{pid}/reviews", ReviewsHandler),
+        (rf"/api/products/{pid}/kpis", KpisHandler),
+        (rf"/api/products/{pid}/keywords", KeywordsHandler),
+        (rf"/api/products/{pid}/summaries", SummariesHandler),
+        (r"/api/metrics", MetricsHandler),
+        (r"/metrics", PrometheusHandler),
+    ])
+
+def main():
+    global _executor
+    parser = argparse.ArgumentParser(description="ALGOSA JSON API")
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", getattr(config, "API_PORT", 8502))))
+    parser.add_argument("--address", default="0.0.0.0")
+    parser.add_argument("--workers", type=int, default=8, help="DB/모델 호출용 스레드 수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    if not config.USE_MYSQL:
+        from db import init_db
+        init_db()
+
+    _executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="algosa-api")
+    make_app().listen(args.port, address=args.address, xheaders=True)
+    logger.info(f"ALGOSA API listening on {args.address}:{args.port}")
+    tornado.ioloop.IOLoop.current().start()
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,16 @@ import streamlit as st
 import pandas as pd
 from sqlalchemy import text
 
-from modules.layout import setup_page, render_sidebar, render_product_info
-from modules.data import load_products_by_category, load_reviews_by_product
+from modules.layout import setup_page, render_sidebar, render_product_picker, render_product_info, render_perf_panel
+from modules.data import load_reviews_by_product, rerun_versions, forget_versions
 from modules.tabs import render_tabs
-from crawler import run_all_crawlers
+from modules import tracing
 
-# 추가: SQLite 모드일 때 테이블 자동 생성
+# 추가: SQLite 모드일 때 테이블 자동 생성 (프로세스당 1회)
 from config import USE_MYSQL
 if not USE_MYSQL:
-    from db import init_db
-    init_db()
+    from db import ensure_schema
+    ensure_schema()
 
 setup_page(title="📦 ALGOSA!")
 st.markdown("####  MUSINSA 상품리뷰 AI분석 서비스")
@@ -39,27 +39,32 @@ CATEGORY_MAP = {"스니커즈": "103004",
                 "스포츠화": "103005", 
                 "구두": "103001"}
 
-selected_category_code, do_crawl = render_sidebar(CATEGORY_MAP)
+def main():
+    selected_category_code, do_crawl = render_sidebar(CATEGORY_MAP)
 
-if do_crawl:
-    with st.spinner("전체 카테고리 크롤링 중..."):
-        run_all_crawlers(num_products=60, max_reviews=300)
-    st.success("데이터 수집 및 DB 저장 완료")
+    if do_crawl:
+        from crawler import run_all_crawlers   # requests 등은 수집할 때만 불러옴
+        with st.spinner("전체 카테고리 크롤링 중..."):
+            run_all_crawlers(num_products=60, max_reviews=300)
+        forget_versions()
+        st.success("데이터 수집 및 DB 저장 완료")
 
-products = load_products_by_category(selected_category_code)
-if products.empty:
-    st.warning("⚠️ 선택한 카테고리에 상품이 없습니다.")
-    st.stop()
+    selected_row, _ = render_product_picker(selected_category_code)
+    if selected_row is None:
+        return
+    selected_product_id = selected_row["product_id"]
+    render_product_info(selected_row)
 
-products["display_name"] = products["brandName"] + " | " + products["goodsName"]
-selected_display = st.selectbox("상품을 선택하세요", products["display_name"].tolist())
-selected_row = products.loc[products["display_name"] == selected_display].iloc[0]
-selected_product_id = selected_row["product_id"]
-render_product_info(selected_row)
+    reviews_df = load_reviews_by_product(selected_product_id)
+    if reviews_df.empty:
+        st.warning("⚠️ 해당 상품에 리뷰가 없습니다.")
+        return
 
-reviews_df = load_reviews_by_product(selected_product_id)
-if reviews_df.empty:
-    st.warning("⚠️ 해당 상품에 리뷰가 없습니다.")
-    st.stop()
+    render_tabs(reviews_df, selected_row)
 
-render_tabs(reviews_df, products)
+# 숨김 성능 패널: 주소에 ?debug=perf 를 붙이면 이번 실행만 계측하여 사이드바에 표시
+debug_perf = st.query_params.get("debug") == "perf"
+with tracing.span("rerun", force=debug_perf) as rerun, rerun_versions():
+    main()
+if debug_perf:
+    render_perf_panel(rerun)
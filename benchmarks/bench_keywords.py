@@ -0,0 +1,80 @@
+"""
+키워드 후처리(_post_filter) 마이크로벤치마크
+
+전체 리뷰 코퍼스(data/reviews.csv)의 어휘로
+  - 기존 방식 (집합 + 정규식 + endswith 루프 + 전체 정렬)
+  - KeywordFilter 단건 경로 / pandas 벡터 경로
+  - top-k 부분 선택
+을 비교한다.
+
+    python benchmarks/bench_keywords.py [--repeat 20]
+"""
+import os
+import re
+import sys
+import argparse
+import timeit
+from collections import Counter
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.keywords import KeywordFilter, default_stopwords, verb_suffixes  # noqa: E402
+from modules.nlp import regex_tokens  # noqa: E402
+
+_hangul = re.compile(r"^[가-힣]+$")
+
+def legacy_post_filter(freq, stop, suffixes):
+    out = {}
+    for w, c in freq.items():
+        if w in stop:
+            continue
+        if len(w) < 2:
+            continue
+        if not _hangul.match(w):
+            continue
+        if any(w.endswith(suf) for suf in suffixes):
+            continue
+        out[w] = c
+    return dict(sorted(out.items(), key=lambda kv: kv[1], reverse=True))
+
+def corpus_vocab(csv_path: str) -> dict:
+    texts = pd.read_csv(csv_path, encoding="utf-8-sig")["content"].fillna("").astype(str)
+    counter = Counter()
+    for t in texts:
+        counter.update(regex_tokens(t))
+    return dict(counter)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(__file__), "..", "data", "reviews.csv"))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    vocab = corpus_vocab(args.csv)
+    stop = set(default_stopwords())
+    suffixes = verb_suffixes()
+    engine = KeywordFilter(stop, suffixes)
+
+    expected = legacy_post_filter(vocab, stop, suffixes)
+    scalar = KeywordFilter(stop, suffixes)
+    scalar.VECTORIZE_MIN = float("inf")
+    assert scalar.filter(vocab) == expected
+    assert list(engine.filter(vocab)) == list(expected)
+
+    cases = {
+        "legacy (loop + full sort)": lambda: legacy_post_filter(vocab, stop, suffixes),
+        "engine scalar (full sort)": lambda: scalar.filter(vocab),
+        "engine scalar (top 200)":   lambda: scalar.filter(vocab, top_k=200),
+        "engine pandas (full sort)": lambda: engine.filter(vocab),
+        "engine pandas (top 200)":   lambda: engine.filter(vocab, top_k=200),
+    }
+    print(f"vocabulary: {len(vocab):,} terms, kept: {len(expected):,}")
+    base = None
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat)) * 1000
+        base = base or best
+        print(f"{name:28s} {best:8.2f} ms  x{base / best:5.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+대시보드 동시 세션 부하 테스트
+
+Streamlit AppTest로 app.py를 세션 N개에서 동시에 실행한다 (세션마다 별도 프로세스). 각 세션은
+카테고리 전환 → 상품 선택 → 섹션 순회(추이 단위 변경 포함) → 리뷰 검색을 반복하며,
+단계별 지연 백분위수, 처리량(스크립트 실행/초), 세션당 메모리를 보고한다.
+
+    python benchmarks/loadtest.py                          # 8세션 × 3회
+    python benchmarks/loadtest.py --sessions 32 --iterations 5 --llm-latency-ms 800
+    python benchmarks/loadtest.py --out benchmarks/results/loadtest.json
+
+DB는 data/*.csv로 채운 임시 SQLite, 모델 호출은 지연을 흉내 내는 스트리밍 스텁.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from collections import defaultdict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from run import ROOT, use_temp_database, load_corpus, _StubCompletions  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+CATEGORIES = ["스니커즈", "스포츠화", "구두"]
+CATEGORY_CODES = ["103004", "103005", "103001"]
+SEARCH_QUERIES = ["발볼 넓은 사람 후기", "사이즈 반업 추천", "오래 신어도 편한지"]
+PRODUCT_QUERIES = ["", "", "나이키", "아디다스", "블랙"]   # 상품 선택기 검색어 (빈 문자열 = 검색 해제)
+
+# -------------------------
+# 스텁 모델 (지연 + 스트리밍)
+# -------------------------
+class _Delta:
+    def __init__(self, content): self.content = content
+
+class _Choice:
+    def __init__(self, content):
+        self.delta = _Delta(content)
+        self.message = _Delta(content)
+
+class _Chunk:
+    def __init__(self, content=None, usage=None):
+        self.choices = [_Choice(content)] if content is not None else []
+        self.usage = usage
+
+class _Usage:
+    prompt_tokens = 1000
+    completion_tokens = 200
+
+class _SlowCompletions(_StubCompletions):
+    """첫 토큰까지 latency의 절반, 나머지 절반 동안 조각을 흘려보낸다"""
+
+    def __init__(self, latency_ms: float, pieces: int = 20):
+        self.latency = latency_ms / 1000
+        self.pieces = pieces
+
+    def create(self, stream=False, **kwargs):
+        if not stream:
+            time.sleep(self.latency)
+            return super().create(**kwargs)
+        return self._stream()
+
+    def _stream(self):
+        time.sleep(self.latency / 2)
+        step = max(1, len(self.CONTENT) // self.pieces)
+        for i in range(0, len(self.CONTENT), step):
+            time.sleep(self.latency / 2 / self.pieces)
+            yield _Chunk(self.CONTENT[i:i + step])
+        yield _Chunk(usage=_Usage)
+
+class SlowStubClient:
+    def __init__(self, latency_ms: float):
+        self.chat = type("chat", (), {"completions": _SlowCompletions(latency_ms)})()
+
+# -------------------------
+# 준비
+# -------------------------
+def seed_database():
+    """상품을 세 카테고리에 나눠 담아 카테고리 전환이 빈 화면이 되지 않게 한다"""
+    import db
+    db.init_db()
+    products, reviews = load_corpus()
+    products["category"] = [CATEGORY_CODES[i % len(CATEGORY_CODES)] for i in range(len(products))]
+    db.save_products(products)
+    db.save_reviews(reviews)
+    return products
+
+@lru_cache(maxsize=1)
+def product_ids() -> tuple:
+    """시드된 전체 상품 id. 상품 선택기 옵션은 product_id(표시는 format_func)라 현재 페이지 id를 되찾을 때 사용"""
+    import pandas as pd
+    from config import engine
+    return tuple(pd.read_sql("SELECT product_id FROM products", engine)["product_id"])
+
+def rss_bytes() -> int:
+    """현재 프로세스 RSS (리눅스 /proc, 그 외엔 최대 RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+# -------------------------
+# 세션 시나리오
+# -------------------------
+class Session:
+    def __init__(self, sid: int, timeout: float, seed: int):
+        from streamlit.testing.v1 import AppTest
+        self.sid = sid
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.rng = random.Random(seed + sid)
+        self.timings = defaultdict(list)
+        self.errors = []
+
+    def _step(self, stage: str, action):
+        t0 = time.perf_counter()
+        try:
+            action()
+            if self.at.exception:
+                self.errors.append(f"{stage}: {self.at.exception[0].message}")
+        except Exception as e:
+            self.errors.append(f"{stage}: {type(e).__name__}: {e}")
+        self.timings[stage].append((time.perf_counter() - t0) * 1000)
+
+    def _has(self, kind: str, key: str) -> bool:
+        return any(w.key == key for w in getattr(self.at, kind))
+
+    def first_load(self):
+        self._step("first_load", lambda: self.at.run())
+
+    def iterate(self):
+        at = self.at
+        self._step("switch_category", lambda: at.sidebar.selectbox[0].select(self.rng.choice(CATEGORIES)).run())
+        if self._has("text_input", "product_query"):
+            term = self.rng.choice(PRODUCT_QUERIES)
+            self._step("product_search", lambda: at.text_input(key="product_query").input(term).run())
+        if not self._has("selectbox", "product_pick"):
+            return
+        pick = at.selectbox(key="product_pick")
+        pid = self.rng.choice([pid for pid in product_ids() if pick.format_func(pid) is not None])
+        self._step("select_product", lambda: at.selectbox(key="product_pick").set_value(pid).run())
+        if self._has("radio", "section"):
+            for i, name in enumerate(at.radio(key="section").options[1:], start=1):
+                self._step(f"section_{i}", lambda: at.radio(key="section").set_value(name).run())
+                if self._has("radio", "trend_period"):
+                    value = self.rng.choice(["월간", "주간"])
+                    self._step("trend_period", lambda: at.radio(key="trend_period").set_value(value).run())
+                if self._has("button", "rb_next") and not at.button(key="rb_next").disabled:
+                    self._step("review_page", lambda: at.button(key="rb_next").click().run())
+            if self._has("radio", "section"):
+                at.radio(key="section").set_value(at.radio(key="section").options[0])
+        if self._has("text_input", "review_search"):
+            query = self.rng.choice(SEARCH_QUERIES)
+            self._step("review_search", lambda: at.text_input(key="review_search").input(query).run())
+
+def _drive_session(sid: int, workdir: str, args: dict, barrier):
+    """
+    세션 1개를 자기 프로세스에서 실행. AppTest는 실행마다 전역 Runtime/옵션을 바꿨다 되돌리므로
+    한 프로세스에서 여러 세션을 동시에 돌리면 서로의 상태를 지운다 → 세션마다 프로세스를 나눈다
+    """
+    use_temp_database(workdir)
+    import analyzer
+    analyzer.client = SlowStubClient(args["llm_latency_ms"])
+
+    # 모듈 import/모델 로딩 같은 1회성 비용은 세션 메모리·지연에서 제외
+    Session(-1, args["timeout"], args["seed"]).first_load()
+    rss_before = rss_bytes()
+    s = Session(sid, args["timeout"], args["seed"])
+    barrier.wait()   # 모든 세션이 준비된 뒤 동시에 시작
+
+    started = time.time()
+    s.first_load()
+    for _ in range(args["iterations"]):
+        if args["cold_llm_cache"]:
+            analyzer.clear_cache()
+        s.iterate()
+    return {"timings": dict(s.timings), "errors": s.errors, "started": started, "ended": time.time(),
+            "rss": rss_bytes(), "rss_growth": rss_bytes() - rss_before}
+
+def run_load(args, workdir: str) -> dict:
+    # 세션 = 프로세스 1개 (레플리카 여러 대에 세션이 하나씩인 배치). 프로세스 간에는 공유 캐시(modules.cache)만 공유
+    ctx = multiprocessing.get_context("spawn")
+    options = {k: getattr(args, k) for k in ("llm_latency_ms", "timeout", "seed", "iterations", "cold_llm_cache")}
+    with ctx.Manager() as manager, ProcessPoolExecutor(max_workers=args.sessions, mp_context=ctx) as pool:
+        barrier = manager.Barrier(args.sessions)
+        results = list(pool.map(_drive_session, range(args.sessions), [workdir] * args.sessions,
+                                [options] * args.sessions, [barrier] * args.sessions))
+    wall = max(r["ended"] for r in results) - min(r["started"] for r in results)
+
+    timings = defaultdict(list)
+    errors = []
+    for sid, r in enumerate(results):
+        for stage, ts in r["timings"].items():
+            timings[stage].extend(ts)
+        errors.extend(f"session {sid} {e}" for e in r["errors"])
+    all_runs = [t for ts in timings.values() for t in ts]
+
+    stages = {}
+    for stage, ts in list(timings.items()) + [("all", all_runs)]:
+        arr = np.asarray(ts)
+        stages[stage] = {
+            "count": int(arr.size),
+            **{f"p{q}_ms": round(float(np.percentile(arr, q)), 1) for q in (50, 90, 95, 99)},
+            "max_ms": round(float(arr.max()), 1),
+        }
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "cpus": os.cpu_count(),
+            "sessions": args.sessions, "iterations": args.iterations,
+            "llm_latency_ms": args.llm_latency_ms, "cold_llm_cache": args.cold_llm_cache,
+        },
+        "wall_s": round(wall, 2),
+        "throughput_runs_per_s": round(len(all_runs) / wall, 2),
+        "throughput_sessions_per_s": round(args.sessions / wall, 3),
+        "rss_mb": round(sum(r["rss"] for r in results) / 2**20, 1),
+        "memory_per_session_mb": round(sum(r["rss_growth"] for r in results) / 2**20 / args.sessions, 2),
+        "stages": stages,
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+def print_report(report: dict):
+    print(f"\n세션 {report['meta']['sessions']}개 × {report['meta']['iterations']}회, "
+          f"LLM 지연 {report['meta']['llm_latency_ms']:.0f}ms")
+    print(f"{'stage':18s} {'n':>5s} {'p50':>9s} {'p90':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:18s} {s['count']:5d} {s['p50_ms']:9.1f} {s['p90_ms']:9.1f} "
+              f"{s['p95_ms']:9.1f} {s['p99_ms']:9.1f} {s['max_ms']:9.1f}")
+    print(f"\n소요 {report['wall_s']}s · 처리량 {report['throughput_runs_per_s']} runs/s · "
+          f"RSS 합계 {report['rss_mb']}MB · 세션당 {report['memory_per_session_mb']}MB")
+    if report["error_count"]:
+        print(f"오류 {report['error_count']}건:")
+        for e in report["errors"]:
+            print(f"  {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="ALGOSA 대시보드 동시 세션 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=3, help="세션당 카테고리 전환~탭 상호작용 반복 횟수")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--cold-llm-cache", action="store_true", help="반복마다 요약 캐시를 비워 매번 모델 호출")
+    parser.add_argument("--timeout", type=float, default=120, help="스크립트 1회 실행 제한(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="algosa-load-")
+    try:
+        use_temp_database(workdir)
+        seed_database()
+        report = run_load(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.out}")
+    return 1 if report["error_count"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
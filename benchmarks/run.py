@@ -0,0 +1,252 @@
+"""
+분석/요약 핫패스 벤치마크
+
+data/reviews.csv(+ 합성 확장 100k / 1M행)로 각 경로를 측정하여 JSON으로 저장하고,
+기준선(baseline)과 비교해 threshold 이상 느려진 항목이 있으면 종료코드 1을 반환한다.
+
+    python benchmarks/run.py                              # base, 100k
+    python benchmarks/run.py --sizes base,100k,1m --repeat 3
+    python benchmarks/run.py --update-baseline            # 현재 결과를 기준선으로 저장
+    python benchmarks/run.py --threshold 0.25 --only keyword
+
+DB는 임시 SQLite로 분리되며, 모델 호출은 고정 응답을 돌려주는 스텁으로 대체한다.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+SIZES = {"base": None, "100k": 100_000, "1m": 1_000_000}
+
+# -------------------------
+# 환경 준비 (임시 DB + 스텁 모델)
+# -------------------------
+def use_temp_database(workdir: str):
+    """config의 DB를 임시 SQLite로 바꾼 뒤에 db/modules를 import 해야 한다"""
+    from sqlalchemy import create_engine
+    import config
+
+    config.USE_MYSQL = False
+    config.DB_PATH = os.path.join(workdir, "bench.db")
+    config.SEMANTIC_DIR = os.path.join(workdir, "semantic")
+    config.engine = create_engine(f"sqlite:///{config.DB_PATH}")
+
+class _StubCompletions:
+    CONTENT = json.dumps({
+        "positive_negative": "전반적으로 편하고 가볍다는 평가",
+        "features": ["가벼움", "쿠션", "디자인"],
+        "cautions": ["발볼 좁음", "끈 풀림", "사이즈 편차"],
+        "size_summary": "정사이즈", "recommendations": ["정사이즈", "발볼 넓으면 반업", "두꺼운 양말 주의"],
+        "coord_summary": "데일리", "outfit_tips": ["데님", "슬랙스", "조거"],
+    }, ensure_ascii=False)
+
+    def create(self, **kwargs):
+        class _Msg: content = self.CONTENT
+        class _Choice: message = _Msg
+        class _Usage: prompt_tokens = 1000; completion_tokens = 200
+        class _Resp: choices = [_Choice]; usage = _Usage
+        return _Resp
+
+class StubClient:
+    class chat:
+        completions = _StubCompletions()
+
+# -------------------------
+# 데이터
+# -------------------------
+def load_corpus():
+    reviews = pd.read_csv(os.path.join(ROOT, "data", "reviews.csv"), dtype=str, encoding="utf-8-sig")
+    products = pd.read_csv(os.path.join(ROOT, "data", "products.csv"), dtype=str, encoding="utf-8-sig")
+    products["category"] = "103004"
+    reviews = reviews.drop_duplicates(subset=["review_no"], keep="last").reset_index(drop=True)
+    reviews["grade"] = pd.to_numeric(reviews["grade"], errors="coerce").fillna(0).astype(int)
+    return products, reviews
+
+def scale_up(reviews: pd.DataFrame, n: int, seed: int = 0) -> pd.DataFrame:
+    """원본 리뷰를 복제·셔플하여 n행으로 확장 (review_no는 새로, 날짜는 ±180일 흔들기)"""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(reviews), size=n)
+    df = reviews.iloc[idx].reset_index(drop=True).copy()
+    df["review_no"] = [f"s{i}" for i in range(n)]
+    shift = pd.to_timedelta(rng.integers(-180, 180, size=n), unit="D")
+    df["createDate"] = (pd.to_datetime(df["createDate"], errors="coerce") + shift).dt.strftime("%Y-%m-%d")
+    return df
+
+# -------------------------
+# 측정
+# -------------------------
+def measure(fn, repeat: int, setup=None) -> dict:
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3), "runs": repeat}
+
+def build_cases(size_label: str, reviews: pd.DataFrame):
+    import analyzer
+    from modules import analytics
+    from modules.data import load_reviews_by_product, typed_reviews
+    from modules.keywords import post_filter, default_stopwords
+    from modules.nlp import get_okt, regex_tokens
+    from collections import Counter
+
+    texts = reviews["content"].fillna("").astype(str).tolist()
+    stop = set(default_stopwords())
+    vocab = Counter()
+    for t in texts:
+        vocab.update(regex_tokens(t))
+    freq = analytics.keyword_freq(texts[:5000], top_k=200)
+    typed = typed_reviews(reviews)  # 로더와 같은 타입 (변환은 데이터 경계에서 1회)
+    kpis = analytics.compute_kpis(typed)
+    top_product = reviews["product_id"].value_counts().index[0]
+
+    analyzer.client = StubClient()
+    sample = texts[:200]
+
+    cases = {
+        "typed_reviews": (lambda: typed_reviews(reviews), None),
+        "compute_kpis": (lambda: analytics.compute_kpis(typed), None),
+        "keyword_freq.regex": (lambda: analytics.keyword_freq(texts, use_morph=False), None),
+        "post_filter": (lambda: post_filter(vocab, stop), None),
+        "post_filter.top200": (lambda: post_filter(vocab, stop, top_k=200), None),
+        "load_reviews_by_product": (lambda: load_reviews_by_product.fetch(top_product), None),
+        "load_reviews_by_product.cached": (lambda: load_reviews_by_product(top_product), None),
+        "analyzer.prompts": (lambda: (analyzer.build_summary_prompt(sample),
+                                      analyzer.build_size_prompt(sample),
+                                      analyzer.build_coordination_prompt(sample)), None),
+        "analyzer.summarize_stub": (lambda: (analyzer.summarize_reviews(sample),
+                                             analyzer.summarize_size_and_fit(sample),
+                                             analyzer.summarize_coordination(sample)),
+                                    analyzer.clear_cache),
+    }
+    if get_okt() is not None:
+        okt_texts = texts[:2000]  # Okt는 느리므로 고정 표본
+        cases["keyword_freq.okt_2k"] = (lambda: analytics.keyword_freq(okt_texts, use_morph=True), None)
+
+    # 차트는 데이터 크기와 무관 → base에서만
+    if size_label == "base":
+        import matplotlib.pyplot as plt
+        vals = analytics.sentiment_percentages(kpis)
+        cases["donut_figure"] = (lambda: plt.close(analytics.donut_figure(vals, kpis["total"])), None)
+        if analytics.font_path():
+            cases["wordcloud_figure"] = (lambda: plt.close(analytics.wordcloud_figure(freq)[0]), None)
+    return cases
+
+def bench_save_reviews(reviews, repeat: int) -> dict:
+    """빈 테이블에 전체 배치를 저장하는 시간 (토큰/키워드/롤업/중복/벡터 색인 포함)"""
+    import db
+    import config
+
+    def reset():
+        with config.engine.begin() as conn:
+            for t in ["reviews", "review_tokens", "keyword_counts", "review_rollups",
+                      "review_minhash", "review_lsh", "review_vectors"]:
+                conn.exec_driver_sql(f"DELETE FROM {t}")
+
+    return measure(lambda: db.save_reviews(reviews), repeat, setup=reset)
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="algosa-bench-")
+    try:
+        use_temp_database(workdir)
+        import db
+        db.init_db()
+        products, base_reviews = load_corpus()
+        db.save_products(products)
+
+        results = {}
+        for label in args.sizes.split(","):
+            n = SIZES[label]
+            reviews = base_reviews if n is None else scale_up(base_reviews, n)
+
+            save_repeat = 1 if n else args.repeat
+            if not args.only or args.only in "save_reviews":
+                results[f"{label}/save_reviews"] = bench_save_reviews(reviews, save_repeat)
+                print(f"{label:>5s} {'save_reviews':28s} {results[f'{label}/save_reviews']['median_ms']:10.2f} ms", flush=True)
+            else:
+                db.save_reviews(reviews)
+
+            for name, (fn, setup) in build_cases(label, reviews).items():
+                if args.only and args.only not in name:
+                    continue
+                results[f"{label}/{name}"] = measure(fn, args.repeat, setup)
+                print(f"{label:>5s} {name:28s} {results[f'{label}/{name}']['median_ms']:10.2f} ms", flush=True)
+        return {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(), "machine": platform.machine(),
+                "cpus": os.cpu_count(), "sizes": args.sizes, "repeat": args.repeat,
+            },
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """기준선 대비 (1 + threshold)배 이상 느려진 항목"""
+    regressions = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or base["median_ms"] <= 0:
+            continue
+        ratio = cur["median_ms"] / base["median_ms"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["median_ms"], cur["median_ms"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="ALGOSA 핫패스 벤치마크")
+    parser.add_argument("--sizes", default="base,100k", help="쉼표 구분: base,100k,1m")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="이름에 이 문자열이 포함된 항목만")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2, help="허용 느려짐 비율 (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    result = run(args)
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {args.out}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"기준선 갱신: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("기준선 없음 - 비교 생략 (--update-baseline 으로 생성)")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(result, baseline, args.threshold)
+    for name, base, cur, ratio in regressions:
+        print(f"[느려짐] {name}: {base:.2f} → {cur:.2f} ms (x{ratio:.2f})")
+    if regressions:
+        return 1
+    print(f"기준선 대비 {args.threshold:.0%} 이상 느려진 항목 없음")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+대시보드 시작 비용 벤치마크
+
+    python benchmarks/startup.py                   # 콜드 import 5회 + 재실행 20회
+    python benchmarks/startup.py --repeat 10 --reruns 50 --out benchmarks/results/startup.json
+
+- cold_import: 새 파이썬 프로세스에서 app.py가 첫 실행 때 import 하는 모듈을 불러오는 시간
+  (-X importtime으로 matplotlib·sklearn·openai 등 무거운 의존성을 불러왔는지도 보고)
+- first_run / rerun: AppTest로 app.py를 처음 실행한 시간과, 같은 세션에서 다시 실행한 시간.
+  재실행은 캐시가 모두 찬 상태이므로 스크립트 자체의 고정 비용(스키마 확인, import 등)에 가깝다.
+
+DB는 data/*.csv로 채운 임시 SQLite, 모델 호출은 스텁.
+"""
+import os
+import sys
+import ast
+import json
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from run import ROOT, use_temp_database  # noqa: E402
+from loadtest import SlowStubClient, seed_database  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+HEAVY_MODULES = ["matplotlib.pyplot", "wordcloud", "sklearn", "scipy.sparse", "openai", "requests", "konlpy"]
+
+def app_imports() -> str:
+    """app.py 최상위 import 문 (첫 실행 때 항상 실행되는 것만). streamlit은 서버가 이미 불러온 상태라 제외"""
+    with open(APP_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    stmts = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "; ".join(s for s in stmts if "streamlit" not in s)
+def _ms(times) -> dict:
+    return {"median_ms": round(statistics.median(times), 1), "min_ms": round(min(times), 1), "runs": len(times)}
+
+def cold_import(repeat: int) -> dict:
+    """새 프로세스에서 import 시간 (streamlit은 미리 import 해 두고 그 이후만 측정)"""
+    imports = app_imports()
+    code = ("import time, streamlit; t0 = time.perf_counter(); "
+            f"{imports}; print((time.perf_counter() - t0) * 1000)")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+
+    # 무거운 의존성이 처음 import 되는 지점의 누적 시간 (마지막 1회, 불러오지 않았으면 생략)
+    trace = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import streamlit; {imports}"],
+                           capture_output=True, text=True, env=env, cwd=ROOT, check=True).stderr
+    cumulative, after_streamlit = {}, False
+    for line in trace.splitlines():
+        parts = line[len("import time:"):].split("|") if line.startswith("import time:") else []
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if after_streamlit and name not in cumulative:
+            cumulative[name] = int(parts[1]) / 1000
+        after_streamlit = after_streamlit or name == "streamlit"
+    heavy = {n: round(cumulative[n], 1) for n in HEAVY_MODULES if n in cumulative}
+    return {**_ms(times), "heavy_modules_ms": heavy}
+
+def app_runs(reruns: int) -> dict:
+    import analyzer
+    from streamlit.testing.v1 import AppTest
+
+    analyzer.client = SlowStubClient(0)
+    at = AppTest.from_file(APP_PATH, default_timeout=300)
+    t0 = time.perf_counter()
+    at.run()
+    first = (time.perf_counter() - t0) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    times = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"first_run_ms": round(first, 1), "rerun": _ms(times)}
+
+def main():
+    parser = argparse.ArgumentParser(description="ALGOSA 시작 비용 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5, help="콜드 import 측정 횟수")
+    parser.add_argument("--reruns", type=int, default=20, help="같은 세션 재실행 횟수")
+    parser.add_argument("--out", help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "cpus": os.cpu_count(),
+        },
+        "cold_import": cold_import(args.repeat),
+    }
+
+    workdir = tempfile.mkdtemp(prefix="algosa-startup-")
+    try:
+        use_temp_database(workdir)
+        seed_database()
+        report.update(app_runs(args.reruns))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    cold = report["cold_import"]
+    print(f"cold import   {cold['median_ms']:8.1f} ms (min {cold['min_ms']:.1f})")
+    for name, ms in cold["heavy_modules_ms"].items():
+        print(f"  {name:20s} {ms:8.1f} ms")
+    print(f"first run     {report['first_run_ms']:8.1f} ms")
+    print(f"rerun         {report['rerun']['median_ms']:8.1f} ms (min {report['rerun']['min_ms']:.1f})")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
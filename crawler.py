@@ -6,6 +6,7 @@ from db import (
     init_db, save_products, save_reviews,
     get_last_collected_date, update_last_collected_date
 )
+from modules import tracing
 
 # -------------------------
 # 카테고리 매핑
@@ -21,7 +22,8 @@ CATEGORY_MAP = {
 # -------------------------
 def get_products(category="103004", top_n=50):
     url = f"https://api.musinsa.com/api2/dp/v1/plp/goods?gf=A&category={category}&size={top_n}&caller=CATEGORY&page=1"
-    res = requests.get(url, headers={"user-agent": "Mozilla/5.0"})
+    with tracing.span("crawler.http", api="products"):
+        res = requests.get(url, headers={"user-agent": "Mozilla/5.0"})
     res.raise_for_status()
     items = res.json().get("data", {}).get("list", [])
     return pd.DataFrame([{
@@ -74,7 +76,8 @@ def get_reviews(
             break
 
         url = f"{base_url}?page={page}&pageSize={page_size}&goodsNo={goods_no}"
-        res = requests.get(url, headers={"user-agent": "Mozilla/5.0"})
+        with tracing.span("crawler.http", api="reviews"):
+            res = requests.get(url, headers={"user-agent": "Mozilla/5.0"})
         if res.status_code != 200:
             break
 
@@ -96,7 +99,8 @@ def get_reviews(
             reviews.append(row)
             collected += 1
 
-        time.sleep(sleep_sec)
+        with tracing.span("crawler.sleep"):
+            time.sleep(sleep_sec)
 
     df = pd.DataFrame(reviews)
     if df.empty:
@@ -113,6 +117,7 @@ def get_reviews(
 # -------------------------
 # 크롤러 실행 (전체 카테고리)
 # -------------------------
+@tracing.traced("crawler.run")
 def run_all_crawlers(num_products: int = 60, max_reviews: int = 300, backfill: bool = False):
     init_db()
     all_products, all_reviews = [], []
@@ -1,7 +1,13 @@
+import json
+import threading
 import pandas as pd
 import config
-from datetime import datetime
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from config import engine  # ← 앱이 실제로 사용하는 SQLAlchemy engine
+from modules import tracing
+# 토큰화/중복 탐지/의미 색인/롤업 모듈은 쓰는 함수 안에서 불러온다 (앱 시작 때 db import 비용 최소화)
 
 def get_connection():
     """config.USE_MYSQL에 따라 DBAPI 커넥션을 반환 (대량 insert 등에 활용)"""
@@ -24,6 +30,15 @@ def get_connection():
         return conn
 
 
+def _ph() -> str:
+    """DBAPI 플레이스홀더 (pymysql: %s / sqlite3: ?)"""
+    return "%s" if config.USE_MYSQL else "?"
+
+def _fetchall_tuples(cur) -> list:
+    # pymysql DictCursor / sqlite3.Row 모두 SELECT 컬럼 순서의 튜플로 통일
+    return [tuple(r.values()) if isinstance(r, dict) else tuple(r) for r in cur.fetchall()]
+
+
 # -------------------------
 # DB 초기화 (테이블 생성)
 # → 반드시 SQLAlchemy engine으로 실행하여
@@ -41,7 +56,9 @@ def init_db():
             reviewScore  FLOAT,
             thumbnail    TEXT,
             goodsLinkUrl TEXT,
-            category     VARCHAR(50)
+            category     VARCHAR(50),
+            INDEX category_reviews_idx (category, reviewCount, product_id),
+            INDEX category_score_idx (category, reviewScore, product_id)
         ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
 
@@ -54,7 +71,8 @@ def init_db():
             content       TEXT,
             grade         INT,
             FOREIGN KEY(product_id) REFERENCES products(product_id),
-            INDEX product_idx (product_id)
+            INDEX product_idx (product_id),
+            INDEX product_date_idx (product_id, createDate, review_no)
         ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
 
@@ -64,10 +82,153 @@ def init_db():
             last_collected_date DATE
         ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
+
+        CREATE_TOKENS = """
+        CREATE TABLE IF NOT EXISTS review_tokens (
+            review_no   VARCHAR(50) PRIMARY KEY,
+            product_id  VARCHAR(50),
+            tokenizer   VARCHAR(10),
+            tokens      TEXT,
+            INDEX product_idx (product_id)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_KEYWORDS = """
+        CREATE TABLE IF NOT EXISTS keyword_counts (
+            product_id  VARCHAR(50),
+            month       CHAR(7),
+            term        VARCHAR(100),
+            count       INT,
+            PRIMARY KEY (product_id, month, term)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_ROLLUPS = """
+        CREATE TABLE IF NOT EXISTS review_rollups (
+            product_id    VARCHAR(50),
+            period        CHAR(1),
+            period_start  DATE,
+            reviews       INT,
+            grade_sum     INT,
+            grade_1 INT, grade_2 INT, grade_3 INT, grade_4 INT, grade_5 INT,
+            pos INT, neu INT, neg INT,
+            PRIMARY KEY (product_id, period, period_start)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_MINHASH = """
+        CREATE TABLE IF NOT EXISTS review_minhash (
+            review_no   VARCHAR(50) PRIMARY KEY,
+            product_id  VARCHAR(50),
+            signature   BLOB,
+            dup_of      VARCHAR(50),
+            INDEX product_idx (product_id)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_LSH = """
+        CREATE TABLE IF NOT EXISTS review_lsh (
+            product_id  VARCHAR(50),
+            band        SMALLINT,
+            bucket      BIGINT,
+            review_no   VARCHAR(50),
+            INDEX bucket_idx (product_id, band, bucket)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_VECTORS = """
+        CREATE TABLE IF NOT EXISTS review_vectors (
+            review_no   VARCHAR(50) PRIMARY KEY,
+            product_id  VARCHAR(50),
+            row_idx     INT,
+            INDEX product_idx (product_id),
+            INDEX row_idx (row_idx)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_VERSIONS = """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope       VARCHAR(80) PRIMARY KEY,
+            version     BIGINT NOT NULL,
+            updated_at  DATETIME
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_CHANGES = """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq          BIGINT AUTO_INCREMENT PRIMARY KEY,
+            product_id   VARCHAR(50),
+            kind         VARCHAR(10),
+            reviews      INT,
+            date_min     DATE,
+            date_max     DATE,
+            version      BIGINT,
+            created_at   DATETIME
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_OFFSETS = """
+        CREATE TABLE IF NOT EXISTS change_offsets (
+            consumer     VARCHAR(50) PRIMARY KEY,
+            seq          BIGINT NOT NULL,
+            updated_at   DATETIME
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_HISTORY = """
+        CREATE TABLE IF NOT EXISTS product_history (
+            product_id   VARCHAR(50),
+            observed_at  DATETIME,
+            price        INT,
+            reviewCount  INT,
+            reviewScore  FLOAT,
+            PRIMARY KEY (product_id, observed_at)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_OBSERVED = """
+        CREATE TABLE IF NOT EXISTS product_observed (
+            product_id   VARCHAR(50) PRIMARY KEY,
+            observed_at  DATETIME
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        CREATE_ANALYSES = """
+        CREATE TABLE IF NOT EXISTS product_analyses (
+            product_id    VARCHAR(50) PRIMARY KEY,
+            category      VARCHAR(20),
+            data_version  BIGINT,
+            status        VARCHAR(10),
+            error         TEXT,
+            kpis          TEXT,
+            keywords      TEXT,
+            fit           TEXT,
+            summary       TEXT,
+            size          TEXT,
+            coordination  TEXT,
+            updated_at    DATETIME,
+            INDEX category_idx (category)
+        ) CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
         with engine.begin() as conn:
             conn.exec_driver_sql(CREATE_PRODUCTS)
+            _ensure_mysql_index(conn, "products", "category_reviews_idx", "category, reviewCount, product_id")
+            _ensure_mysql_index(conn, "products", "category_score_idx", "category, reviewScore, product_id")
             conn.exec_driver_sql(CREATE_REVIEWS)
+            _ensure_mysql_index(conn, "reviews", "product_date_idx", "product_id, createDate, review_no")
             conn.exec_driver_sql(CREATE_LASTDATE)
+            conn.exec_driver_sql(CREATE_TOKENS)
+            conn.exec_driver_sql(CREATE_KEYWORDS)
+            conn.exec_driver_sql(CREATE_ROLLUPS)
+            conn.exec_driver_sql(CREATE_MINHASH)
+            conn.exec_driver_sql(CREATE_LSH)
+            conn.exec_driver_sql(CREATE_VECTORS)
+            conn.exec_driver_sql(CREATE_VERSIONS)
+            conn.exec_driver_sql(CREATE_CHANGES)
+            conn.exec_driver_sql(CREATE_OFFSETS)
+            conn.exec_driver_sql(CREATE_HISTORY)
+            conn.exec_driver_sql(CREATE_OBSERVED)
+            conn.exec_driver_sql(CREATE_ANALYSES)
 
     else:
         # SQLite 스키마
@@ -104,18 +265,201 @@ def init_db():
         );
         """
 
+        # 리뷰별 명사 토큰 (공백 구분) - 수집 시 1회 채움
+        CREATE_TOKENS = """
+        CREATE TABLE IF NOT EXISTS review_tokens (
+            review_no   TEXT PRIMARY KEY,
+            product_id  TEXT,
+            tokenizer   TEXT,
+            tokens      TEXT
+        );
+        """
+
+        # 상품·월별 키워드 빈도 (불용어/접미사 필터 적용 후) - 수집 시 증분 갱신
+        CREATE_KEYWORDS = """
+        CREATE TABLE IF NOT EXISTS keyword_counts (
+            product_id  TEXT,
+            month       TEXT,
+            term        TEXT,
+            count       INTEGER,
+            PRIMARY KEY (product_id, month, term)
+        );
+        """
+
+        # 상품별 주간(W)/월간(M) 리뷰 수·평점 분포 롤업 - 수집 시 해당 기간만 재계산
+        CREATE_ROLLUPS = """
+        CREATE TABLE IF NOT EXISTS review_rollups (
+            product_id    TEXT,
+            period        TEXT,
+            period_start  TEXT,
+            reviews       INTEGER,
+            grade_sum     INTEGER,
+            grade_1 INTEGER, grade_2 INTEGER, grade_3 INTEGER, grade_4 INTEGER, grade_5 INTEGER,
+            pos INTEGER, neu INTEGER, neg INTEGER,
+            PRIMARY KEY (product_id, period, period_start)
+        );
+        """
+
+        # 유사/중복 리뷰: MinHash 서명 + 대표 리뷰(dup_of가 NULL이면 대표)
+        CREATE_MINHASH = """
+        CREATE TABLE IF NOT EXISTS review_minhash (
+            review_no   TEXT PRIMARY KEY,
+            product_id  TEXT,
+            signature   BLOB,
+            dup_of      TEXT
+        );
+        """
+
+        # LSH 밴드 버킷 (같은 상품 안에서만 후보 탐색)
+        CREATE_LSH = """
+        CREATE TABLE IF NOT EXISTS review_lsh (
+            product_id  TEXT,
+            band        INTEGER,
+            bucket      INTEGER,
+            review_no   TEXT
+        );
+        """
+
+        # 의미 검색 벡터 행 번호 (벡터 자체는 semantic/vectors.f32)
+        CREATE_VECTORS = """
+        CREATE TABLE IF NOT EXISTS review_vectors (
+            review_no   TEXT PRIMARY KEY,
+            product_id  TEXT,
+            row_idx     INTEGER
+        );
+        """
+
+        # 캐시 무효화용 데이터 버전 (scope: 'product:<id>', 'category:<code>', 'history:<id>', 'all')
+        CREATE_VERSIONS = """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope       TEXT PRIMARY KEY,
+            version     INTEGER NOT NULL,
+            updated_at  TEXT
+        );
+        """
+
+        # 변경 로그 (CDC): 저장 함수가 같은 트랜잭션에서 추가만 하고, 파생 데이터 작업자가 seq 순으로 읽는다
+        # kind: 'reviews' (리뷰 추가/수정, 기간 = 영향받은 작성일 범위) | 'product' (상품 정보 변경)
+        CREATE_CHANGES = """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id   TEXT,
+            kind         TEXT,
+            reviews      INTEGER,
+            date_min     TEXT,
+            date_max     TEXT,
+            version      INTEGER,
+            created_at   TEXT
+        );
+        """
+
+        # 작업자(consumer)별 처리 완료 seq
+        CREATE_OFFSETS = """
+        CREATE TABLE IF NOT EXISTS change_offsets (
+            consumer     TEXT PRIMARY KEY,
+            seq          INTEGER NOT NULL,
+            updated_at   TEXT
+        );
+        """
+
+        # 상품 가격/리뷰 수/평점 이력: 값이 바뀐 수집 시점만 기록 (다음 행 전까지 같은 값)
+        CREATE_HISTORY = """
+        CREATE TABLE IF NOT EXISTS product_history (
+            product_id   TEXT,
+            observed_at  TEXT,
+            price        INTEGER,
+            reviewCount  INTEGER,
+            reviewScore  REAL,
+            PRIMARY KEY (product_id, observed_at)
+        );
+        """
+
+        # 상품별 마지막 수집 시각. product_history만으로는 "값이 그대로"와 "수집 안 됨"을 구분할 수 없다
+        CREATE_OBSERVED = """
+        CREATE TABLE IF NOT EXISTS product_observed (
+            product_id   TEXT PRIMARY KEY,
+            observed_at  TEXT
+        );
+        """
+
+        # 배치 분석 결과 (python -m algosa analyze). JSON 문자열 컬럼
+        CREATE_ANALYSES = """
+        CREATE TABLE IF NOT EXISTS product_analyses (
+            product_id    TEXT PRIMARY KEY,
+            category      TEXT,
+            data_version  INTEGER,
+            status        TEXT,
+            error         TEXT,
+            kpis          TEXT,
+            keywords      TEXT,
+            fit           TEXT,
+            summary       TEXT,
+            size          TEXT,
+            coordination  TEXT,
+            updated_at    TEXT
+        );
+        """
+
         with engine.begin() as conn:
             # SQLite 옵션들
             conn.exec_driver_sql("PRAGMA foreign_keys = ON;")
             conn.exec_driver_sql(CREATE_PRODUCTS)
+            # 상품 선택기: 카테고리 안에서 리뷰 수/평점 순 키셋 페이지네이션
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_products_category_reviews ON products(category, reviewCount, product_id);")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_products_category_score ON products(category, reviewScore, product_id);")
             conn.exec_driver_sql(CREATE_REVIEWS)
             conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_reviews_product ON reviews(product_id);")
+            # 리뷰 목록 키셋 페이지네이션 (product_id, createDate, review_no)
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_reviews_product_date ON reviews(product_id, createDate, review_no);")
             conn.exec_driver_sql(CREATE_LASTDATE)
+            conn.exec_driver_sql(CREATE_TOKENS)
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_tokens_product ON review_tokens(product_id);")
+            conn.exec_driver_sql(CREATE_KEYWORDS)
+            conn.exec_driver_sql(CREATE_ROLLUPS)
+            conn.exec_driver_sql(CREATE_MINHASH)
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_minhash_product ON review_minhash(product_id);")
+            conn.exec_driver_sql(CREATE_LSH)
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON review_lsh(product_id, band, bucket);")
+            conn.exec_driver_sql(CREATE_VECTORS)
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_vectors_product ON review_vectors(product_id);")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_vectors_row ON review_vectors(row_idx);")
+            conn.exec_driver_sql(CREATE_VERSIONS)
+            conn.exec_driver_sql(CREATE_CHANGES)
+            conn.exec_driver_sql(CREATE_OFFSETS)
+            conn.exec_driver_sql(CREATE_HISTORY)
+            conn.exec_driver_sql(CREATE_OBSERVED)
+            conn.exec_driver_sql(CREATE_ANALYSES)
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_analyses_category ON product_analyses(category);")
 
 
+def _ensure_mysql_index(conn, table: str, name: str, columns: str):
+    """MySQL에는 CREATE INDEX IF NOT EXISTS가 없으므로 기존 테이블은 여기서 인덱스를 추가"""
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, name),
+    ).first()
+    if not exists:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD INDEX {name} ({columns})")
+
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema():
+    """init_db()를 프로세스당 한 번만 (스크립트 재실행마다 DDL을 다시 보내지 않음)"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            init_db()
+            _schema_ready = True
+
 # -------------------------
 # 저장 함수
 # -------------------------
+@tracing.traced("db.save_products")
 def save_products(product_df):
     if product_df is None or product_df.empty:
         return
@@ -161,11 +505,23 @@ def save_products(product_df):
           category=excluded.category
         """
 
+    # 값이 실제로 바뀐(또는 새로 생긴) 상품만 변경 로그에 남긴다
+    product_ids = list(dict.fromkeys(str(r[0]) for r in rows))
+    before = _product_rows(cur, product_ids)
     cur.executemany(sql, rows)
+    after = _product_rows(cur, product_ids)
+    _record_history(cur, after)
+    # 다른 카테고리로 옮겨진 상품은 원래 카테고리도 무효화.
+    # 이력은 값이 그대로여도 마지막 수집 시각이 늘어나므로 수집한 상품 전부 무효화
+    moved_from = {str(row["category"]) for row in before.values() if row["category"]}
+    _bump_versions(cur, {f"category:{c}" for c in set(product_df["category"].dropna().astype(str)) | moved_from}
+                        | {f"history:{pid}" for pid in product_ids})
+    _log_changes(cur, "product", [(pid, None, None, None) for pid in product_ids if before.get(pid) != after.get(pid)])
     conn.commit()
     conn.close()
 
 
+@tracing.traced("db.save_reviews")
 def save_reviews(df):
     if df is None or df.empty:
         return
@@ -177,35 +533,790 @@ def save_reviews(df):
     for col in ["review_no", "product_id", "userNickName", "content"]:
         df[col] = df[col].fillna("").astype(str)
     df["grade"] = pd.to_numeric(df["grade"], errors="coerce").fillna(0).astype(int)
+    # 같은 배치 안의 중복은 마지막 값만 (upsert 결과와 동일)
+    df = df.drop_duplicates(subset=["review_no"], keep="last")
 
     rows = df[["review_no", "product_id", "createDate", "userNickName", "content", "grade"]].values.tolist()
+    # 토큰화(프로세스 풀)는 쓰기 잠금을 잡기 전에 끝낸다
+    tokens = _tokenize_reviews(df)
 
     conn = get_connection()
     cur = conn.cursor()
 
+    # 증분 집계: 덮어쓰기 전 기존 리뷰의 기여분 (키워드 빈도 차감, 옮겨진 기간 재계산)
+    previous = _previous_reviews(cur, df["review_no"].tolist())
+
+    with tracing.span("db.upsert_reviews", rows=len(rows)):
+        if config.USE_MYSQL:
+            # MySQL도 문자열 날짜를 안전하게 받아줍니다.
+            cur.executemany("""
+              REPLACE INTO reviews (review_no, product_id, createDate, userNickName, content, grade)
+              VALUES (%s,%s,%s,%s,%s,%s)
+            """, rows)
+        else:
+            # SQLite: ? 플레이스홀더 사용 + ON CONFLICT
+            cur.executemany("""
+              INSERT INTO reviews (review_no, product_id, createDate, userNickName, content, grade)
+              VALUES (?,?,?,?,?,?)
+              ON CONFLICT(review_no) DO UPDATE SET
+                product_id   = excluded.product_id,
+                createDate   = excluded.createDate,
+                userNickName = excluded.userNickName,
+                content      = excluded.content,
+                grade        = excluded.grade
+            """, rows)
+
+    _store_review_tokens(cur, df, tokens)
+    token_lists = tokens[0]
+    dup_of = _dedup_reviews(cur, df)
+
+    # 키워드 빈도는 대표 리뷰만 집계 (유사/중복 리뷰 제외)
+    delta = _keyword_delta(((pid, d, toks) for pid, d, toks, dup in previous if dup is None), sign=-1)
+    delta.update(_keyword_delta(
+        (row for row, rno in zip(zip(df["product_id"], df["createDate"], token_lists), df["review_no"])
+         if dup_of.get(rno) is None),
+        sign=1,
+    ))
+    _apply_keyword_delta(cur, delta)
+
+    touched = pd.concat([
+        df[["product_id", "createDate"]],
+        pd.DataFrame([(pid, d) for pid, d, _, _ in previous], columns=["product_id", "createDate"]),
+    ], ignore_index=True)
+    _refresh_rollups(cur, touched)
+    _index_review_vectors(cur, df)
+
+    pids = set(touched["product_id"].dropna().astype(str))
+    _bump_versions(cur, {f"product:{pid}" for pid in pids}
+                        | {f"category:{cat}" for cat in _categories_of(cur, pids)})
+
+    # 상품별 (저장한 리뷰 수, 영향받은 작성일 범위). 다른 상품에서 옮겨 온 리뷰는 원래 상품도 기록
+    # 작성일이 없는 리뷰만 바뀐 상품도 기록한다 (범위는 NULL)
+    counts = df["product_id"].value_counts()
+    spans = touched.dropna(subset=["product_id"]).groupby("product_id")["createDate"].agg(["min", "max"])
+    _log_changes(cur, "reviews", [
+        (pid, int(counts.get(pid, 0)), None if pd.isna(lo) else lo, None if pd.isna(hi) else hi)
+        for pid, lo, hi in spans.itertuples()
+    ])
+
+    conn.commit()
+    conn.close()
+
+
+# -------------------------
+# 데이터 버전 (조회 캐시 무효화)
+# -------------------------
+@tracing.traced("db.versions")
+def _bump_versions(cur, scopes):
+    """같은 트랜잭션 안에서 scope별 버전을 1 올린다. 커밋되는 순간 캐시된 조회가 무효화됨"""
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")  # UTC (API Last-Modified)
+    rows = [(scope, now) for scope in sorted(scopes)]
+    if not rows:
+        return
     if config.USE_MYSQL:
-        # MySQL도 문자열 날짜를 안전하게 받아줍니다.
         cur.executemany("""
-          REPLACE INTO reviews (review_no, product_id, createDate, userNickName, content, grade)
-          VALUES (%s,%s,%s,%s,%s,%s)
+          INSERT INTO data_versions (scope, version, updated_at) VALUES (%s, 1, %s)
+          ON DUPLICATE KEY UPDATE version = version + 1, updated_at = VALUES(updated_at)
+        """, rows)
+    else:
+        cur.executemany("""
+          INSERT INTO data_versions (scope, version, updated_at) VALUES (?, 1, ?)
+          ON CONFLICT(scope) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
         """, rows)
+
+PRODUCT_COLUMNS = ["brandName", "goodsName", "price", "reviewCount", "reviewScore", "thumbnail", "goodsLinkUrl", "category"]
+
+def _product_rows(cur, product_ids) -> dict:
+    """{product_id: {컬럼: 값}} - 저장 전후 비교용"""
+    out = {}
+    for i in range(0, len(product_ids), 500):
+        batch = product_ids[i:i + 500]
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"SELECT product_id, {', '.join(PRODUCT_COLUMNS)} FROM products WHERE product_id IN ({marks})", batch)
+        out.update((str(row[0]), dict(zip(PRODUCT_COLUMNS, row[1:]))) for row in _fetchall_tuples(cur))
+    return out
+
+def _categories_of(cur, product_ids) -> set:
+    product_ids = sorted(product_ids)
+    cats = set()
+    for i in range(0, len(product_ids), 500):
+        batch = product_ids[i:i + 500]
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"SELECT DISTINCT category FROM products WHERE product_id IN ({marks})", batch)
+        cats.update(str(c) for (c,) in _fetchall_tuples(cur) if c)
+    return cats
+
+
+# -------------------------
+# 변경 로그 (CDC)
+# -------------------------
+# 저장 함수가 같은 트랜잭션에서 change_log에 추가하므로, 커밋된 데이터와 로그가 항상 함께 보인다.
+# 파생 데이터 작업자는 read_changes(consumer)로 자기 오프셋 이후의 변경만 읽어 해당 상품만 다시 계산하고,
+# 끝나면 commit_offset(consumer, seq). 실행이 중단되면 오프셋을 올리지 않으므로 다음 실행이 같은 변경을 다시 받는다.
+# 상품 단위 실패는 결과 테이블(product_analyses status='error')에 남기고 오프셋은 넘긴다 (한 상품이 소비를 막지 않게).
+# (MySQL에서 여러 수집기가 동시에 쓰면 seq 순서와 커밋 순서가 다를 수 있으므로 수집기는 하나로 운영)
+@tracing.traced("db.change_log")
+def _log_changes(cur, kind: str, changes):
+    """changes: [(product_id, 리뷰 수, 작성일 최소, 최대)]. version은 기록 시점의 상품 데이터 버전"""
+    changes = list(changes)
+    if not changes:
+        return
+    versions = _product_versions(cur, [pid for pid, *_ in changes])
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    marks = ",".join([_ph()] * 7)
+    cur.executemany(
+        f"INSERT INTO change_log (product_id, kind, reviews, date_min, date_max, version, created_at) VALUES ({marks})",
+        [(pid, kind, n, lo, hi, versions.get(pid, 0), now) for pid, n, lo, hi in changes],
+    )
+
+def _product_versions(cur, product_ids) -> dict:
+    """{product_id: 상품 버전 + 전체 버전} (modules.data.data_version과 같은 값)"""
+    cur.execute(f"SELECT version FROM data_versions WHERE scope = {_ph()}", ("all",))
+    row = cur.fetchone()
+    base = int((row["version"] if isinstance(row, dict) else row[0]) or 0) if row else 0
+    out = {pid: base for pid in product_ids}
+    scopes = sorted({f"product:{pid}" for pid in product_ids})
+    for i in range(0, len(scopes), 500):
+        batch = scopes[i:i + 500]
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"SELECT scope, version FROM data_versions WHERE scope IN ({marks})", batch)
+        for scope, version in _fetchall_tuples(cur):
+            out[scope.split(":", 1)[1]] = base + int(version)
+    return out
+
+def read_changes(consumer: str, limit: int = 5000) -> pd.DataFrame:
+    """consumer가 마지막으로 커밋한 seq 이후의 변경 (seq 순, 최대 limit건)"""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+      SELECT seq, product_id, kind, reviews, date_min, date_max, version, created_at
+      FROM change_log
+      WHERE seq > COALESCE((SELECT seq FROM change_offsets WHERE consumer = {_ph()}), 0)
+      ORDER BY seq
+      LIMIT {int(limit)}
+    """, (consumer,))
+    rows = _fetchall_tuples(cur)
+    conn.close()
+    return pd.DataFrame(rows, columns=["seq", "product_id", "kind", "reviews", "date_min", "date_max", "version", "created_at"])
+
+def commit_offset(consumer: str, seq: int):
+    """consumer가 seq까지 처리했음을 기록 (이미 더 앞선 오프셋이면 그대로)"""
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    conn = get_connection()
+    cur = conn.cursor()
+    if config.USE_MYSQL:
+        cur.execute("""
+          INSERT INTO change_offsets (consumer, seq, updated_at) VALUES (%s, %s, %s)
+          ON DUPLICATE KEY UPDATE seq = GREATEST(seq, VALUES(seq)), updated_at = VALUES(updated_at)
+        """, (consumer, int(seq), now))
     else:
-        # SQLite: ? 플레이스홀더 사용 + ON CONFLICT
+        cur.execute("""
+          INSERT INTO change_offsets (consumer, seq, updated_at) VALUES (?, ?, ?)
+          ON CONFLICT(consumer) DO UPDATE SET seq = MAX(seq, excluded.seq), updated_at = excluded.updated_at
+        """, (consumer, int(seq), now))
+    conn.commit()
+    conn.close()
+
+def trim_change_log(retention_days: int | None = None) -> int:
+    """모든 consumer가 처리했고 보존 기간(기본 config.CHANGE_LOG_RETENTION_DAYS=30일)이 지난 변경 삭제"""
+    days = retention_days if retention_days is not None else getattr(config, "CHANGE_LOG_RETENTION_DAYS", 30)
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+      DELETE FROM change_log
+      WHERE seq <= (SELECT COALESCE(MIN(seq), 0) FROM change_offsets) AND created_at < {_ph()}
+    """, (cutoff,))
+    deleted = cur.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+# -------------------------
+# 상품 가격/리뷰 수 이력 (product_history)
+# -------------------------
+# 수집할 때마다 전 상품을 쌓지 않고, 마지막 이력과 값이 다를 때만 1행 (run-length).
+# 어느 시점의 값 = 그 시점 이전 마지막 행. 오래된 구간은 compact_product_history()로 일/주 단위로 줄인다.
+# 마지막 행 이후 "값이 그대로"인 구간은 product_observed(상품별 마지막 수집 시각)까지로 본다.
+HISTORY_COLUMNS = ["price", "reviewCount", "reviewScore"]
+
+def _history_value(v):
+    return None if v is None or v == "" else v
+
+def _latest_history(cur, product_ids) -> dict:
+    """{product_id: (price, reviewCount, reviewScore)} - 상품별 마지막 이력 (PK 인덱스로 상품당 1행)"""
+    out = {}
+    for i in range(0, len(product_ids), 500):
+        batch = product_ids[i:i + 500]
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"""
+          SELECT h.product_id, h.price, h.reviewCount, h.reviewScore
+          FROM product_history h
+          JOIN (SELECT product_id, MAX(observed_at) AS observed_at
+                FROM product_history WHERE product_id IN ({marks}) GROUP BY product_id) last
+            ON last.product_id = h.product_id AND last.observed_at = h.observed_at
+        """, batch)
+        out.update((str(row[0]), tuple(row[1:])) for row in _fetchall_tuples(cur))
+    return out
+
+@tracing.traced("db.product_history")
+def _record_history(cur, products: dict) -> list:
+    """products({product_id: 저장된 상품 값}) 중 마지막 이력과 달라진 상품만 이력 추가 → 추가한 상품 id"""
+    latest = _latest_history(cur, list(products))
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    observed = [(pid, now) for pid in products]
+    if config.USE_MYSQL:
         cur.executemany("""
-          INSERT INTO reviews (review_no, product_id, createDate, userNickName, content, grade)
-          VALUES (?,?,?,?,?,?)
+          INSERT INTO product_observed (product_id, observed_at) VALUES (%s,%s)
+          ON DUPLICATE KEY UPDATE observed_at=VALUES(observed_at)
+        """, observed)
+    else:
+        cur.executemany("""
+          INSERT INTO product_observed (product_id, observed_at) VALUES (?,?)
+          ON CONFLICT(product_id) DO UPDATE SET observed_at=excluded.observed_at
+        """, observed)
+    rows = []
+    for pid, row in products.items():
+        values = tuple(_history_value(row[c]) for c in HISTORY_COLUMNS)
+        if latest.get(pid) != values:
+            rows.append((pid, now, *values))
+    if not rows:
+        return []
+    if config.USE_MYSQL:
+        cur.executemany("""
+          INSERT INTO product_history (product_id, observed_at, price, reviewCount, reviewScore)
+          VALUES (%s,%s,%s,%s,%s)
+          ON DUPLICATE KEY UPDATE price=VALUES(price), reviewCount=VALUES(reviewCount), reviewScore=VALUES(reviewScore)
+        """, rows)
+    else:
+        cur.executemany("""
+          INSERT INTO product_history (product_id, observed_at, price, reviewCount, reviewScore)
+          VALUES (?,?,?,?,?)
+          ON CONFLICT(product_id, observed_at) DO UPDATE SET
+            price=excluded.price, reviewCount=excluded.reviewCount, reviewScore=excluded.reviewScore
+        """, rows)
+    return [r[0] for r in rows]
+
+def _downsample_history(old: pd.DataFrame, weekly_before: pd.Timestamp) -> pd.DataFrame:
+    """버킷(weekly_before 이전은 주, 이후는 일)마다 마지막 행만, 이어서 같은 값이 반복되는 행은 제거"""
+    at = pd.to_datetime(old["observed_at"])
+    day = at.dt.normalize()
+    bucket = day.where(at >= weekly_before, day - pd.to_timedelta(day.dt.weekday, unit="D"))
+    kept = (old.assign(_bucket=bucket, _at=at)
+               .sort_values(["product_id", "_at"])
+               .groupby(["product_id", "_bucket"], sort=False).tail(1))
+    values = kept[HISTORY_COLUMNS]
+    prev = values.shift()
+    same = ((prev.eq(values) | (prev.isna() & values.isna())).all(axis=1)
+            & kept["product_id"].eq(kept["product_id"].shift()))
+    return kept.loc[~same, ["product_id", "observed_at", *HISTORY_COLUMNS]]
+
+def compact_product_history(daily_after_days: int | None = None, weekly_after_days: int | None = None) -> dict:
+    """
+    이력 다운샘플링 (보존 정책): daily_after_days(기본 30일)보다 오래된 이력은 하루 마지막 값,
+    weekly_after_days(기본 180일)보다 오래된 이력은 주 마지막 값만 남긴다.
+    상품당 행 수가 수집 횟수가 아니라 기간에 비례하므로 조회 비용이 일정하게 유지된다.
+    """
+    daily = daily_after_days if daily_after_days is not None else getattr(config, "PRODUCT_HISTORY_DAILY_DAYS", 30)
+    weekly = weekly_after_days if weekly_after_days is not None else getattr(config, "PRODUCT_HISTORY_WEEKLY_DAYS", 180)
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    cutoff = (now - pd.Timedelta(days=daily)).normalize()   # 하루 단위로 잘라 같은 날 행이 나뉘지 않게
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+      SELECT product_id, observed_at, price, reviewCount, reviewScore
+      FROM product_history WHERE observed_at < {_ph()}
+    """, (cutoff.strftime("%Y-%m-%d %H:%M:%S"),))
+    old = pd.DataFrame(_fetchall_tuples(cur), columns=["product_id", "observed_at", *HISTORY_COLUMNS])
+    if old.empty:
+        conn.close()
+        return {"before": 0, "after": 0}
+
+    old["observed_at"] = old["observed_at"].astype(str)
+    kept = _downsample_history(old, (now - pd.Timedelta(days=weekly)).normalize())
+    drop = old.loc[~old.set_index(["product_id", "observed_at"]).index.isin(
+        kept.set_index(["product_id", "observed_at"]).index), ["product_id", "observed_at"]]
+    cur.executemany(
+        f"DELETE FROM product_history WHERE product_id = {_ph()} AND observed_at = {_ph()}",
+        drop.values.tolist(),
+    )
+    conn.commit()
+    conn.close()
+    return {"before": len(old), "after": len(kept)}
+
+
+# -------------------------
+# 리뷰 토큰 저장소 (review_no → 명사)
+# -------------------------
+@tracing.traced("db.tokenize")
+def _tokenize_reviews(df, workers=None, chunk_size=500) -> tuple:
+    """df(content) → (토큰 리스트들, 토크나이저 이름들, 통계). DB 연결 없이 (쓰기 트랜잭션 밖에서) 호출"""
+    from modules.nlp import batch_tokenize
+    texts = df["content"].fillna("").astype(str).tolist()
+    return batch_tokenize(texts, workers=workers, chunk_size=chunk_size)
+
+@tracing.traced("db.tokens")
+def _store_review_tokens(cur, df, tokens):
+    """df(review_no, product_id)의 토큰(_tokenize_reviews 결과)을 review_tokens에 upsert"""
+    from modules.nlp import join_tokens
+    token_lists, tokenizers, _ = tokens
+    rows = [
+        (rno, pid, name, join_tokens(toks))
+        for rno, pid, name, toks in zip(
+            df["review_no"].astype(str), df["product_id"].astype(str), tokenizers, token_lists
+        )
+    ]
+
+    if config.USE_MYSQL:
+        cur.executemany("""
+          REPLACE INTO review_tokens (review_no, product_id, tokenizer, tokens)
+          VALUES (%s,%s,%s,%s)
+        """, rows)
+    else:
+        cur.executemany("""
+          INSERT INTO review_tokens (review_no, product_id, tokenizer, tokens)
+          VALUES (?,?,?,?)
           ON CONFLICT(review_no) DO UPDATE SET
-            product_id   = excluded.product_id,
-            createDate   = excluded.createDate,
-            userNickName = excluded.userNickName,
-            content      = excluded.content,
-            grade        = excluded.grade
+            product_id = excluded.product_id,
+            tokenizer  = excluded.tokenizer,
+            tokens     = excluded.tokens
+        """, rows)
+
+def _replace_review_tokens(cur, df, tokens) -> dict:
+    """
+    이미 저장된 리뷰의 토큰 교체. keyword_counts에서 기존 토큰의 기여분을 빼고
+    새 토큰을 더해 rebuild_keyword_counts와 같은 결과를 유지한다 (같은 트랜잭션)
+    """
+    review_nos = df["review_no"].astype(str).tolist()
+    before = _previous_reviews(cur, review_nos)
+    _store_review_tokens(cur, df, tokens)
+    after = _previous_reviews(cur, review_nos)
+
+    delta = _keyword_delta(((pid, d, toks) for pid, d, toks, dup in before if dup is None), sign=-1)
+    delta.update(_keyword_delta(((pid, d, toks) for pid, d, toks, dup in after if dup is None), sign=1))
+    _apply_keyword_delta(cur, delta)
+
+    pids = {str(pid) for pid, _, _, _ in after}
+    _bump_versions(cur, {f"product:{pid}" for pid in pids}
+                        | {f"category:{cat}" for cat in _categories_of(cur, pids)})
+    return tokens[2]
+
+def save_review_tokens(df):
+    """이미 저장된 리뷰의 토큰만 (재)생성할 때 사용 - 지연 채움/백필용"""
+    if df is None or df.empty:
+        return
+    tokens = _tokenize_reviews(df)
+    conn = get_connection()
+    cur = conn.cursor()
+    _replace_review_tokens(cur, df, tokens)
+    conn.commit()
+    conn.close()
+
+def backfill_review_tokens(workers=None, chunk_size=500, only_missing=True) -> dict:
+    """전체 리뷰 코퍼스 토큰 백필. only_missing이면 현재 토크나이저 토큰이 없는 리뷰만 처리"""
+    from modules.nlp import active_tokenizer
+    sql = "SELECT r.review_no, r.product_id, r.content FROM reviews r"
+    params = ()
+    if only_missing:
+        sql += f"""
+        LEFT JOIN review_tokens t
+          ON t.review_no = r.review_no AND t.tokenizer = {_ph()}
+        WHERE t.review_no IS NULL
+        """
+        params = (active_tokenizer(),)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    df = pd.DataFrame(_fetchall_tuples(cur), columns=["review_no", "product_id", "content"])
+    conn.close()
+    if df.empty:
+        return {"reviews": 0}
+
+    tokens = _tokenize_reviews(df, workers=workers, chunk_size=chunk_size)
+    conn = get_connection()
+    cur = conn.cursor()
+    stats = _replace_review_tokens(cur, df, tokens)
+    conn.commit()
+    conn.close()
+    return stats
+
+def load_review_tokens(product_id: str) -> dict:
+    """현재 토크나이저로 만들어진 토큰만 {review_no: [명사, ...]} 로 반환"""
+    from modules.nlp import active_tokenizer, split_tokens
+    conn = get_connection()
+    cur = conn.cursor()
+
+    if config.USE_MYSQL:
+        cur.execute(
+            "SELECT review_no, tokens FROM review_tokens WHERE product_id=%s AND tokenizer=%s",
+            (product_id, active_tokenizer()),
+        )
+        rows = [(r["review_no"], r["tokens"]) for r in cur.fetchall()]
+    else:
+        cur.execute(
+            "SELECT review_no, tokens FROM review_tokens WHERE product_id=? AND tokenizer=?",
+            (product_id, active_tokenizer()),
+        )
+        rows = [(r[0], r[1]) for r in cur.fetchall()]
+
+    conn.close()
+    return {str(rno): split_tokens(toks) for rno, toks in rows}
+
+
+# -------------------------
+# 키워드 빈도 인덱스 (product_id, month, term) → count
+# -------------------------
+@lru_cache(maxsize=1)
+def _keyword_filter():
+    """키워드 규칙(keyword_rules.json)은 처음 집계할 때 읽는다"""
+    from modules.keywords import default_filter
+    return default_filter()
+
+def _previous_reviews(cur, review_nos) -> list:
+    """이미 저장된 리뷰들의 (product_id, createDate, tokens, dup_of) - 토큰이 없으면 빈 리스트"""
+    from modules.nlp import split_tokens
+    out = []
+    for i in range(0, len(review_nos), 500):
+        batch = list(review_nos[i:i + 500])
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"""
+          SELECT r.product_id, r.createDate, t.tokens, m.dup_of
+          FROM reviews r
+          LEFT JOIN review_tokens t ON t.review_no = r.review_no
+          LEFT JOIN review_minhash m ON m.review_no = r.review_no
+          WHERE r.review_no IN ({marks})
+        """, batch)
+        out.extend((pid, d, split_tokens(toks), dup) for pid, d, toks, dup in _fetchall_tuples(cur))
+    return out
+
+def _keyword_delta(rows, sign: int = 1) -> Counter:
+    """(product_id, createDate, tokens) 반복자 → {(product_id, 'YYYY-MM', term): ±count}"""
+    keep = _keyword_filter().keep
+    delta: Counter = Counter()
+    for pid, created, tokens in rows:
+        month = str(created)[:7] if created else ""
+        for term in tokens:
+            if keep(term):
+                delta[(str(pid), month, term)] += sign
+    return delta
+
+@tracing.traced("db.keyword_counts")
+def _apply_keyword_delta(cur, delta: Counter):
+    rows = [(pid, month, term, c) for (pid, month, term), c in delta.items() if c != 0]
+    if not rows:
+        return
+
+    if config.USE_MYSQL:
+        cur.executemany("""
+          INSERT INTO keyword_counts (product_id, month, term, count)
+          VALUES (%s,%s,%s,%s)
+          ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+        """, rows)
+    else:
+        cur.executemany("""
+          INSERT INTO keyword_counts (product_id, month, term, count)
+          VALUES (?,?,?,?)
+          ON CONFLICT(product_id, month, term) DO UPDATE SET count = count + excluded.count
         """, rows)
 
+    for pid in {r[0] for r in rows}:
+        cur.execute(f"DELETE FROM keyword_counts WHERE product_id = {_ph()} AND count <= 0", (pid,))
+
+def rebuild_keyword_counts():
+    """review_tokens 기준으로 keyword_counts 전체 재생성 (기존 DB 최초 구축/복구용)"""
+    from modules.nlp import split_tokens
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+      SELECT r.product_id, r.createDate, t.tokens
+      FROM reviews r
+      JOIN review_tokens t ON t.review_no = r.review_no
+      LEFT JOIN review_minhash m ON m.review_no = r.review_no
+      WHERE m.dup_of IS NULL
+    """)
+    rows = ((pid, d, split_tokens(toks)) for pid, d, toks in _fetchall_tuples(cur))
+    delta = _keyword_delta(rows)
+
+    cur.execute("DELETE FROM keyword_counts")
+    _apply_keyword_delta(cur, delta)
+    _bump_versions(cur, {"all"})
+    conn.commit()
+    conn.close()
+
+
+# -------------------------
+# 유사/중복 리뷰 (MinHash LSH)
+# -------------------------
+@tracing.traced("db.dedup")
+def _dedup_reviews(cur, df) -> dict:
+    """
+    df 리뷰의 {review_no: 대표 review_no 또는 None}.
+    이미 서명이 있는 리뷰는 저장된 판정을 그대로 쓰고, 새 리뷰만
+    같은 상품의 LSH 버킷 후보와 비교하여 서명/버킷을 추가한다.
+    """
+    from modules import dedup
+    review_nos = df["review_no"].astype(str).tolist()
+    result = {}
+    for i in range(0, len(review_nos), 500):
+        batch = review_nos[i:i + 500]
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"SELECT review_no, dup_of FROM review_minhash WHERE review_no IN ({marks})", batch)
+        result.update({rno: dup for rno, dup in _fetchall_tuples(cur)})
+
+    new = df.loc[~df["review_no"].astype(str).isin(result.keys())]
+    new = new.sort_values(["createDate", "review_no"], na_position="last")  # 먼저 쓰인 리뷰가 대표
+
+    for pid, group in new.groupby(new["product_id"].astype(str), sort=False):
+        sigs = [dedup.signature(t) for t in group["content"]]
+        keys = [dedup.band_keys(sig) for sig in sigs]
+
+        index = dedup.LSHIndex()
+        for band in range(dedup.BANDS):
+            buckets = sorted({k[band] for k in keys})
+            for j in range(0, len(buckets), 500):
+                chunk = buckets[j:j + 500]
+                marks = ",".join([_ph()] * len(chunk))
+                cur.execute(f"""
+                  SELECT m.review_no, m.signature, m.dup_of
+                  FROM review_lsh l JOIN review_minhash m ON m.review_no = l.review_no
+                  WHERE l.product_id = {_ph()} AND l.band = {_ph()} AND l.bucket IN ({marks})
+                """, (pid, band, *chunk))
+                for rno, raw, dup in _fetchall_tuples(cur):
+                    index.add_existing(rno, dedup.from_bytes(bytes(raw)), dup)
+
+        minhash_rows, lsh_rows = [], []
+        for rno, sig, ks in zip(group["review_no"].astype(str), sigs, keys):
+            rep = index.assign(rno, sig)
+            result[rno] = rep
+            minhash_rows.append((rno, pid, dedup.to_bytes(sig), rep))
+            lsh_rows.extend((pid, band, key, rno) for band, key in enumerate(ks))
+
+        marks4 = ",".join([_ph()] * 4)
+        cur.executemany(f"INSERT INTO review_minhash (review_no, product_id, signature, dup_of) VALUES ({marks4})", minhash_rows)
+        cur.executemany(f"INSERT INTO review_lsh (product_id, band, bucket, review_no) VALUES ({marks4})", lsh_rows)
+
+    return result
+
+def rebuild_review_dedup():
+    """전체 리뷰로 중복 판정 재생성 후 키워드 인덱스도 다시 만든다"""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM review_lsh")
+    cur.execute("DELETE FROM review_minhash")
+    cur.execute("SELECT review_no, product_id, createDate, content FROM reviews")
+    df = pd.DataFrame(_fetchall_tuples(cur), columns=["review_no", "product_id", "createDate", "content"])
+    if not df.empty:
+        df["createDate"] = df["createDate"].astype(str)
+        _dedup_reviews(cur, df)
+    _bump_versions(cur, {"all"})
+    conn.commit()
+    conn.close()
+    rebuild_keyword_counts()
+
+
+# -------------------------
+# 의미 검색 벡터 색인
+# -------------------------
+@tracing.traced("db.vectors")
+def _index_review_vectors(cur, df) -> int:
+    """
+    이번 배치 리뷰(df: review_no, product_id, content)만 임베딩. 새 리뷰는 뒤에 추가, 이미 색인된 리뷰는
+    같은 행을 덮어쓴다. 모델이 없으면 건너뛴다 (학습·전체 색인은 쓰기 트랜잭션 밖의 rebuild_semantic_index)
+    """
+    from modules import semantic
+    if df.empty or semantic.load_model() is None:
+        return 0
+    # 행 번호는 review_vectors의 MAX(row_idx) 다음부터. 잠금을 잡은 뒤에 기존 행을 읽어야
+    # 다른 프로세스와 같은 행/리뷰를 중복 할당하지 않는다 (SQLite는 이미 쓰기 잠금 보유)
+    cur.execute(f"SELECT COALESCE(MAX(row_idx), -1) + 1 FROM review_vectors{' FOR UPDATE' if config.USE_MYSQL else ''}")
+    start = int(_fetchall_tuples(cur)[0][0])
+    review_nos = df["review_no"].astype(str).tolist()
+    existing = {}
+    for i in range(0, len(review_nos), 500):
+        batch = review_nos[i:i + 500]
+        cur.execute(f"SELECT review_no, row_idx FROM review_vectors WHERE review_no IN ({','.join([_ph()] * len(batch))})", batch)
+        existing.update((str(rno), int(idx)) for rno, idx in _fetchall_tuples(cur))
+
+    new = [rno for rno in review_nos if rno not in existing]
+    rows = dict(existing, **{rno: start + j for j, rno in enumerate(new)})
+    vecs = semantic.embed(df["content"].fillna("").astype(str).tolist())
+    semantic.write_vectors([rows[rno] for rno in review_nos], vecs)
+
+    product_of = dict(zip(review_nos, df["product_id"].astype(str)))
+    cur.executemany(
+        f"INSERT INTO review_vectors (review_no, product_id, row_idx) VALUES ({_ph()},{_ph()},{_ph()})",
+        [(rno, product_of[rno], rows[rno]) for rno in new],
+    )
+    cur.executemany(  # 다른 상품으로 옮겨진 리뷰
+        f"UPDATE review_vectors SET product_id = {_ph()} WHERE review_no = {_ph()}",
+        [(product_of[rno], rno) for rno in existing],
+    )
+    return len(review_nos)
+
+def rebuild_semantic_index(batch_size: int = 5000) -> int:
+    """
+    임베딩 모델을 전체 코퍼스로 다시 학습하고 벡터 파일/색인을 새로 만든다.
+    학습은 쓰기 잠금 밖에서, 모델/벡터는 임시 파일에 만들고 커밋한 뒤에 교체 (그 전까지 읽는 쪽은 이전 색인).
+    """
+    from modules import semantic
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT content FROM reviews")
+    texts = [c or "" for (c,) in _fetchall_tuples(cur)]
+    if len(texts) < semantic.MIN_FIT_DOCS:
+        conn.close()
+        return 0
+
+    model_path, vectors_path = semantic.staged_paths()
+    try:
+        model = semantic.fit_model(texts, model_path)
+        # 학습 중에 들어온 리뷰까지 쓰기 잠금을 잡은 뒤 다시 읽어 전부 색인
+        cur.execute("DELETE FROM review_vectors")
+        cur.execute("SELECT review_no, product_id, content FROM reviews ORDER BY review_no")
+        reviews = _fetchall_tuples(cur)
+        semantic.discard(vectors_path)
+        marks = ",".join([_ph()] * 3)
+        for i in range(0, len(reviews), batch_size):
+            batch = reviews[i:i + batch_size]
+            semantic.write_vectors(i, semantic.embed([c or "" for _, _, c in batch], model=model), path=vectors_path)
+            cur.executemany(
+                f"INSERT INTO review_vectors (review_no, product_id, row_idx) VALUES ({marks})",
+                [(rno, pid, i + j) for j, (rno, pid, _) in enumerate(batch)],
+            )
+        _bump_versions(cur, {"all"})
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        semantic.discard(model_path, vectors_path)
+        raise
+    finally:
+        conn.close()
+    semantic.install(model_path, vectors_path)
+    return len(reviews)
+
+
+# -------------------------
+# 기간별 롤업 (review_rollups)
+# -------------------------
+def _insert_rollups(cur, rollups: pd.DataFrame):
+    from modules.trends import ROLLUP_COLUMNS
+    if rollups.empty:
+        return
+    marks = ",".join([_ph()] * len(ROLLUP_COLUMNS))
+    # numpy 정수 → 파이썬 int (DBAPI 바인딩용)
+    rows = [tuple(v.item() if hasattr(v, "item") else v for v in row)
+            for row in rollups.itertuples(index=False, name=None)]
+    cur.executemany(f"INSERT INTO review_rollups ({', '.join(ROLLUP_COLUMNS)}) VALUES ({marks})", rows)
+
+@tracing.traced("db.rollups")
+def _refresh_rollups(cur, touched: pd.DataFrame):
+    """touched(product_id, createDate)가 속한 주/월 버킷만 reviews에서 다시 집계"""
+    from modules.trends import PERIODS, compute_rollups, period_bounds
+    touched = touched.dropna()
+    touched = touched.assign(
+        product_id=touched["product_id"].astype(str),
+        createDate=touched["createDate"].astype(str).str[:10],
+    )
+    for pid, dates in touched.groupby("product_id")["createDate"]:
+        for period in PERIODS:
+            lo, hi = period_bounds(dates, period)
+            if pd.isna(lo):
+                continue
+            lo_s, hi_s = lo.strftime("%Y-%m-%d"), hi.strftime("%Y-%m-%d")
+
+            cur.execute(f"""
+              SELECT product_id, createDate, grade FROM reviews
+              WHERE product_id = {_ph()} AND createDate >= {_ph()} AND createDate < {_ph()}
+            """, (pid, lo_s, hi_s))
+            reviews = pd.DataFrame(_fetchall_tuples(cur), columns=["product_id", "createDate", "grade"])
+            rollups = compute_rollups(reviews, period)
+
+            cur.execute(f"""
+              DELETE FROM review_rollups
+              WHERE product_id = {_ph()} AND period = {_ph()} AND period_start >= {_ph()} AND period_start < {_ph()}
+            """, (pid, period, lo_s, hi_s))
+            _insert_rollups(cur, rollups)
+
+def rebuild_rollups():
+    """reviews 전체로 review_rollups 재생성 (기존 DB 최초 구축/복구용)"""
+    from modules.trends import PERIODS, compute_rollups
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT product_id, createDate, grade FROM reviews")
+    reviews = pd.DataFrame(_fetchall_tuples(cur), columns=["product_id", "createDate", "grade"])
+
+    cur.execute("DELETE FROM review_rollups")
+    for period in PERIODS:
+        _insert_rollups(cur, compute_rollups(reviews, period))
+    _bump_versions(cur, {"all"})
     conn.commit()
     conn.close()
 
 
+# -------------------------
+# 배치 분석 결과 (product_analyses)
+# -------------------------
+ANALYSIS_COLUMNS = [
+    "product_id", "category", "data_version", "status", "error",
+    "kpis", "keywords", "fit", "summary", "size", "coordination", "updated_at",
+]
+
+@tracing.traced("db.save_product_analysis")
+def save_product_analysis(row: dict):
+    """분석 결과 1건 upsert (dict/list 값은 JSON 문자열로 저장). 상품마다 커밋하여 중단 후 이어하기 가능"""
+    values = [
+        json.dumps(row.get(c), ensure_ascii=False, default=str) if isinstance(row.get(c), (dict, list)) else row.get(c)
+        for c in ANALYSIS_COLUMNS
+    ]
+    values[ANALYSIS_COLUMNS.index("updated_at")] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    marks = ",".join([_ph()] * len(ANALYSIS_COLUMNS))
+    cols = ", ".join(ANALYSIS_COLUMNS)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    if config.USE_MYSQL:
+        updates = ", ".join(f"{c} = VALUES({c})" for c in ANALYSIS_COLUMNS[1:])
+        cur.execute(f"INSERT INTO product_analyses ({cols}) VALUES ({marks}) ON DUPLICATE KEY UPDATE {updates}", values)
+    else:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in ANALYSIS_COLUMNS[1:])
+        cur.execute(f"INSERT INTO product_analyses ({cols}) VALUES ({marks}) ON CONFLICT(product_id) DO UPDATE SET {updates}", values)
+    conn.commit()
+    conn.close()
+
+def load_analysis_status(product_ids) -> dict:
+    """{product_id: (data_version, status, 요약 저장 여부)} - 이어하기 판단용"""
+    product_ids = [str(p) for p in product_ids]
+    out = {}
+    conn = get_connection()
+    cur = conn.cursor()
+    for i in range(0, len(product_ids), 500):
+        batch = product_ids[i:i + 500]
+        marks = ",".join([_ph()] * len(batch))
+        cur.execute(f"""
+          SELECT product_id, data_version, status, summary IS NOT NULL
+          FROM product_analyses WHERE product_id IN ({marks})
+        """, batch)
+        out.update({pid: (ver, status, bool(summarized)) for pid, ver, status, summarized in _fetchall_tuples(cur)})
+    conn.close()
+    return out
+
+def load_failed_analyses(limit: int = 5000, unsummarized: bool = False) -> list:
+    """
+    status='error'로 남은 상품 id (변경 로그 소비가 건너뛴 실패분, 오래된 순).
+    unsummarized=True면 요약 없이(--no-llm) 완료된 상품도 포함
+    """
+    cond = "status = 'error'" + (" OR (status = 'ok' AND summary IS NULL)" if unsummarized else "")
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"SELECT product_id FROM product_analyses WHERE {cond} ORDER BY updated_at LIMIT {int(limit)}")
+    out = [str(pid) for (pid,) in _fetchall_tuples(cur)]
+    conn.close()
+    return out
+
+
 # -------------------------
 # 마지막 리뷰 수집일 관리
 # -------------------------
@@ -1,89 +1,115 @@
-import os, re
+import os
+import re
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import font_manager as fm
-from typing import Optional, Tuple, Dict, List
+from functools import lru_cache
+from typing import Optional, Tuple, Dict, List, TYPE_CHECKING
 from collections import Counter
+from itertools import chain
 
-from wordcloud import WordCloud
-from sklearn.feature_extraction.text import CountVectorizer
+from modules.figcache import cached_png, figure_key
+from modules import tracing
+
+# matplotlib / wordcloud / scikit-learn은 import만 1초 이상 걸리므로 실제로 그릴 때·계산할 때 불러온다
+# (PNG 캐시 hit이면 matplotlib을 아예 불러오지 않음)
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
 
 # -------------------------
-# 한글 폰트 경로 탐색 함수
+# 한글 폰트 경로 (프로세스당 1회 탐색)
 # -------------------------
-def _font_path() -> Optional[str]:
-    # Dockerfile에서 COPY한 경로
-    local_font_dir = "/usr/local/share/fonts/truetype/local"
-    if os.path.exists(local_font_dir):
-        for root, _, files in os.walk(local_font_dir):
-            for fn in files:
-                if fn.lower().endswith((".ttf", ".ttc", ".otf")):
-                    return os.path.join(root, fn)
-
-    # 개발용: 프로젝트 font 폴더
-    proj_font_dir = os.path.join(os.path.dirname(__file__), "..", "font")
-    if os.path.exists(proj_font_dir):
-        for root, _, files in os.walk(proj_font_dir):
-            for fn in files:
-                if fn.lower().endswith((".ttf", ".ttc", ".otf")):
-                    return os.path.join(root, fn)
-
-    # 시스템 기본 후보
-    for p in [
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
-    ]:
-        if os.path.exists(p):
-            return p
+_FONT_EXTS = (".ttf", ".ttc", ".otf")
+_FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+    "C:/Windows/Fonts/malgun.ttf",
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+]
 
+def _first_font_in(folder: str) -> Optional[str]:
+    if not os.path.isdir(folder):
+        return None
+    for root, _, files in os.walk(folder):
+        for fn in files:
+            if fn.lower().endswith(_FONT_EXTS):
+                return os.path.join(root, fn)
     return None
 
-# -------------------------
-# Matplotlib 전체에 적용
-# -------------------------
-font_path = _font_path()
-if font_path:
-    fm.fontManager.addfont(font_path)
-    font_name = fm.FontProperties(fname=font_path).get_name()
-    plt.rcParams["font.family"] = [font_name, "DejaVu Sans"]
-else:
-    # 폰트 못 찾으면 fallback
-    plt.rcParams["font.family"] = "DejaVu Sans"
-
-plt.rcParams["axes.unicode_minus"] = False
-
-
-# konlpy가 있으면 명사 기반, 없으면 자동 우회
-try:
-    from konlpy.tag import Okt
-    _HAS_KONLPY = True
-except Exception:
-    Okt = None  # type: ignore
-    _HAS_KONLPY = False
+@lru_cache(maxsize=None)
+def font_path() -> Optional[str]:
+    """Dockerfile에서 COPY한 폰트 → 프로젝트 font 폴더(개발용) → 시스템 기본 후보"""
+    for folder in ["/usr/local/share/fonts/truetype/local",
+                   os.path.join(os.path.dirname(__file__), "..", "font")]:
+        found = _first_font_in(folder)
+        if found:
+            return found
+    return next((p for p in _FONT_CANDIDATES if os.path.exists(p)), None)
+
+@lru_cache(maxsize=None)
+def _pyplot():
+    """matplotlib을 처음 쓸 때 한 번만 불러오고 한글 폰트를 등록"""
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager as fm
+
+    path = font_path()
+    if path:
+        fm.fontManager.addfont(path)
+        plt.rcParams["font.family"] = [fm.FontProperties(fname=path).get_name(), "DejaVu Sans"]
+    else:
+        # 폰트 못 찾으면 fallback
+        plt.rcParams["font.family"] = "DejaVu Sans"
+    plt.rcParams["axes.unicode_minus"] = False
+    return plt
+
+
+# konlpy가 있으면 명사 기반(프로세스 전역 Okt 재사용), 없으면 자동 우회
+from modules.nlp import get_okt
 
 # ============================== KPI/차트 ==============================
 
+@tracing.traced("analytics.kpis")
 def compute_kpis(reviews_df: pd.DataFrame) -> dict:
     total = len(reviews_df)
     pos = int((reviews_df["grade"] >= 4).sum())
     neg = int((reviews_df["grade"] <= 2).sum())
     neu = int(total - pos - neg)
     unique_users = int(reviews_df["userNickName"].nunique())
-    date_min = pd.to_datetime(reviews_df["createDate"], errors="coerce").min()
-    date_max = pd.to_datetime(reviews_df["createDate"], errors="coerce").max()
+    duplicates = int(reviews_df["dup_of"].notna().sum()) if "dup_of" in reviews_df else 0
+    date_min = reviews_df["createDate"].min()
+    date_max = reviews_df["createDate"].max()
     return {
         "total": total, "pos": pos, "neu": neu, "neg": neg,
         "unique_users": unique_users, "date_min": date_min, "date_max": date_max,
+        "duplicates": duplicates,
     }
 
+# 사이즈 체감 신호: 리뷰 본문 정규식 매칭 비율 (LLM 요약 없이 상품 간 비교용)
+_FIT_PATTERNS = {
+    "small": re.compile(r"작아|작다|작은\s?편|작게\s?나|타이트|꽉\s?끼|반\s?업|한\s?치수\s?(크게|업)"),
+    "large": re.compile(r"커요|크다|큰\s?편|크게\s?나|헐렁|반\s?다운|한\s?치수\s?(작게|다운)"),
+    "true": re.compile(r"정사이즈|정\s?사이즈|딱\s?맞|잘\s?맞|사이즈\s?(딱|적당)"),
+    "wide_foot": re.compile(r"발볼|발등"),
+}
+
+def fit_signals(texts: List[str]) -> dict:
+    """{'small'|'large'|'true'|'wide_foot': 해당 표현이 있는 리뷰 비율, 'n': 리뷰 수}"""
+    n = len(texts)
+    out = {"n": n}
+    for name, pat in _FIT_PATTERNS.items():
+        hits = sum(1 for t in texts if t and pat.search(t))
+        out[name] = round(hits / n, 4) if n else 0.0
+    return out
+
 def sentiment_percentages(kpis: dict) -> List[float]:
     t = max(kpis["total"], 1)
     return [kpis["pos"]/t*100, kpis["neu"]/t*100, kpis["neg"]/t*100]
 
+@tracing.traced("matplotlib.donut")
 def donut_figure(values: List[float], total_reviews: int):
     labels = ["긍정", "중립", "부정"]
     colors = ["#4CAF50", "#FFC107", "#F44336"]
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(4.6, 4.6), dpi=140)
 
     if sum(values) > 0:
@@ -103,114 +129,88 @@ def donut_figure(values: List[float], total_reviews: int):
     
     return fig
 
-# ======================= 불용어/접미사 + 키워드 전처리 =======================
+def donut_png(values: List[float], total_reviews: int) -> bytes:
+    """donut_figure의 PNG (입력이 같으면 캐시에서 바로 반환)"""
+    key = figure_key("donut", [round(v, 4) for v in values], int(total_reviews))
+    return cached_png(key, lambda: donut_figure(values, total_reviews))
 
-# ▶ 확장 불용어
-_STOPWORDS: List[str] = [
-    "정도","조금","그리고","그러나","하지만","사용","제품","구매","리뷰","가격","배송",
-    "신발","운동화","브랜드","디자인","평가","사용자","부분","좀","것","거","이번","처음",
-    "솔직히","진짜","너무","정말","약간","그냥","좀더","조금더","그리고요","근데","그래도",
-    "여기","저기","거의","매우","굉장히","대박","완전","요즘","최근","때문","때문에",
-    "역시","살짝","생각보다","신발은","평소","많이","착화감이","착화감도","발볼이",
-    "아주","다른","엄청","없이","발이"
-]
+# ======================= 불용어/접미사 + 키워드 전처리 =======================
 
-# ▶ 용언/어미 접미사 
-_VERB_SUFFIXES: Tuple[str, ...] = (
-    "하다","합니다","해요","했다","했어요","하네요","하니까","하였","하였습","하긴",
-    "같아요","같았","같네요","같았어요","같습니다","이네요","이었","입니다","어요","에요","였어요",
-    "됩니다","되네요","되는","되는지","되요","돼요","됐어요","했네","했구","했더","했습",
-    "좋아요","좋네요","좋습니다","좋아서","좋았","예요","네요","이라","이라고","신는데","신고","신을",
-    "으로","에게","사고","샀는데","구매했습니다","맞고"
-
-)
-
-def default_stopwords() -> List[str]:
-    return list(_STOPWORDS)
-
-def verb_suffixes() -> Tuple[str, ...]:
-    return _VERB_SUFFIXES
-
-_hangul = re.compile(r"^[가-힣]+$")
-
-def _post_filter(freq: Dict[str, int], stop: set[str], remove_suffixes: bool = True) -> Dict[str, int]:
-    out: Dict[str, int] = {}
-    for w, c in freq.items():
-        if w in stop:         # 불용어 제거
-            continue
-        if len(w) < 2:        # 2자 미만 제거
-            continue
-        if not _hangul.match(w):  # 한글만
-            continue
-        if remove_suffixes and any(w.endswith(suf) for suf in _VERB_SUFFIXES):
-            continue
-        out[w] = c
-    # 자주 나온 순서로 정렬하여 반환
-    return dict(sorted(out.items(), key=lambda kv: kv[1], reverse=True))
+from modules.keywords import default_stopwords, verb_suffixes, post_filter as _post_filter
 
+@tracing.traced("analytics.keyword_freq")
 def keyword_freq(
     reviews_texts: List[str],
     stopwords: Optional[List[str]] = None,
     use_morph: bool = False,       # konlpy(Okt) 사용 여부
     max_features: int = 2000,
     remove_suffixes: bool = True,
+    tokens: Optional[List[List[str]]] = None,  # 리뷰별 저장된 토큰 (있으면 재토큰화 생략)
+    top_k: Optional[int] = None,   # 상위 k개만 필요할 때 (전체 정렬 생략)
 ) -> Dict[str, int]:
     stop = set(stopwords or default_stopwords())
 
+    # 0) 토큰 저장소에서 받은 경우: Counter 병합만
+    if tokens is not None:
+        base = Counter(chain.from_iterable(tokens))
+        return _post_filter(base, stop, remove_suffixes, top_k)
+
     # 1) 명사 기반 시도 (JVM/KoNLPy 문제 시 바로 폴백)
-    if use_morph:
+    okt = get_okt() if use_morph else None  # 워밍된 싱글톤, 사용 불가면 None
+    if okt is not None:
         try:
-            from konlpy.tag import Okt
-            okt = Okt()  # <- 여기서 JVM 없으면 예외
             bag: List[str] = []
-            for t in reviews_texts:
-                nouns = [w for w in okt.nouns(t) if len(w) >= 2 and w not in stop]
-                bag.extend(nouns)
+            with tracing.span("analytics.okt", texts=len(reviews_texts)):
+                for t in reviews_texts:
+                    nouns = [w for w in okt.nouns(t) if len(w) >= 2 and w not in stop]
+                    bag.extend(nouns)
             base = dict(Counter(bag))
-            return _post_filter(base, stop, remove_suffixes)
+            return _post_filter(base, stop, remove_suffixes, top_k)
         except Exception:
             # JVM/KoNLPy 실패 시 자동 폴백
             pass
 
     # 2) 폴백: 2글자 이상 한글 토큰 + 불용어 제거
+    from sklearn.feature_extraction.text import CountVectorizer
     vectorizer = CountVectorizer(
         token_pattern=r"(?u)[가-힣]{2,}",
         stop_words=list(stop),
         max_features=max_features,
     )
-    X = vectorizer.fit_transform(reviews_texts)
+    with tracing.span("analytics.vectorizer", texts=len(reviews_texts)):
+        X = vectorizer.fit_transform(reviews_texts)
     counts = np.asarray(X.sum(axis=0)).ravel()
     words = vectorizer.get_feature_names_out()
     base = dict(zip(words, counts))
-    return _post_filter(base, stop, remove_suffixes)
+    return _post_filter(base, stop, remove_suffixes, top_k)
 
 # ============================== 시각화 ==============================
 
-def _font_path() -> Optional[str]:
-    cands = [
-        "C:/Windows/Fonts/malgun.ttf",
-        "/System/Library/Fonts/AppleSDGothicNeo.ttc",
-        "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-    ]
-    for p in cands:
-        if os.path.exists(p):
-            return p
-    return None
+_WORDCLOUD_STYLE = dict(width=900, height=500, background_color="white", prefer_horizontal=0.9, max_words=200)
 
-def wordcloud_figure(freq: dict) -> Tuple[Optional[plt.Figure], Optional[plt.Axes]]:
-    font_path = _font_path()
-    if not font_path:
+def wordcloud_figure(freq: dict) -> Tuple[Optional["plt.Figure"], Optional["plt.Axes"]]:
+    path = font_path()
+    if not path:
         return None, None
-    wc = WordCloud(
-        font_path=font_path, width=900, height=500, background_color="white",
-        prefer_horizontal=0.9, max_words=200
-    ).generate_from_frequencies(freq)
-    fig, ax = plt.subplots(figsize=(6.4, 3.8), dpi=140)
-    ax.imshow(wc); ax.axis("off")
-    plt.tight_layout()
+    from wordcloud import WordCloud
+    with tracing.span("wordcloud.generate", words=len(freq)):
+        wc = WordCloud(font_path=path, **_WORDCLOUD_STYLE).generate_from_frequencies(freq)
+    with tracing.span("matplotlib.wordcloud"):
+        plt = _pyplot()
+        fig, ax = plt.subplots(figsize=(6.4, 3.8), dpi=140)
+        ax.imshow(wc); ax.axis("off")
+        plt.tight_layout()
     return fig, ax
 
+def wordcloud_png(freq: dict) -> Optional[bytes]:
+    """wordcloud_figure의 PNG. 폰트가 없으면 None"""
+    path = font_path()
+    if not path:
+        return None
+    items = sorted(((str(w), int(c)) for w, c in freq.items()), key=lambda kv: (-kv[1], kv[0]))
+    key = figure_key("wordcloud", items[:_WORDCLOUD_STYLE["max_words"]], _WORDCLOUD_STYLE, path)
+    return cached_png(key, lambda: wordcloud_figure(freq)[0])
+
 def topn_progress_table(kw_df: pd.DataFrame, topn: int) -> pd.DataFrame:
     tbl = (
         kw_df.sort_values("count", ascending=False)
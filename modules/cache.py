@@ -0,0 +1,415 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+import config
+
+logger = logging.getLogger("algosa.cache")
+
+# -------------------------
+# 레플리카 간 공유 결과 캐시
+# - st.cache_data / 분석기 LRU는 프로세스별이라 앱 레플리카마다 같은 계산을 반복한다
+# - 그 아래에 공유 저장소를 두어, 한 레플리카가 계산한 결과를 나머지가 그대로 읽는다
+# - 기본은 ./db 볼륨의 SQLite 파일. CacheBackend를 구현하면 다른 저장소로 교체 가능
+#
+#   config.SHARED_CACHE       "sqlite"(기본) | "memory" | "off"
+#   config.SHARED_CACHE_PATH  기본: DB_PATH 폴더/cache.db
+#   config.SHARED_CACHE_MAX_MB, SHARED_CACHE_TTL(초)
+#   config.SHARED_CACHE_SECRET 값 서명 키 (기본: 캐시 파일 옆 cache.key, 소유자만 읽기)
+#
+# 값은 pickle이므로 공유 파일에 쓸 수 있는 누구나 코드를 실행시킬 수 있다 →
+# HMAC 서명이 맞는 값만 unpickle하고, 서명이 틀린 항목은 miss로 처리한다.
+# -------------------------
+_MISSING = object()
+
+def cache_key(namespace: str, *parts) -> str:
+    """'namespace:해시'. namespace는 지표 집계 단위 (예: 'llm', 'fetch_rollups')"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+def _namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class CacheBackend:
+    """
+    저장소 인터페이스. 하위 클래스는 _get/_set/delete/clear/_try_lock/_unlock만 구현하면
+    TTL·single-flight·지표는 여기서 공통 처리된다. 값은 HMAC 서명 + pickle bytes.
+    """
+    name = "base"
+    lock_lease = 120.0     # 잠금 보유자가 죽어도 이 시간이 지나면 다른 레플리카가 넘겨받음
+    lock_poll = 0.05
+
+    def __init__(self, default_ttl: float, secret: Optional[bytes] = None):
+        self.default_ttl = default_ttl
+        self._secret = secret or os.urandom(32)   # 프로세스 내 저장소는 임의 키로 충분
+        self._stats_lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "sets": 0, "lock_waits": 0})
+        self.evictions = 0
+
+    # --- 저장소별 구현 ---
+    def _get(self, key: str) -> Optional[bytes]: raise NotImplementedError
+    def _set(self, key: str, data: bytes, expires_at: float) -> None: raise NotImplementedError
+    def delete(self, key: str) -> None: raise NotImplementedError
+    def clear(self, namespace: Optional[str] = None) -> None: raise NotImplementedError
+    def _try_lock(self, key: str, owner: str, lease: float) -> bool: raise NotImplementedError
+    def _unlock(self, key: str, owner: str) -> None: raise NotImplementedError
+    def _size(self) -> dict: return {}
+
+    # --- 공통 ---
+    def _count(self, key: str, field: str):
+        with self._stats_lock:
+            self._stats[_namespace(key)][field] += 1
+
+    def _sign(self, key: str, payload: bytes) -> bytes:
+        # 키도 서명에 넣어 다른 항목의 값을 옮겨 붙여도 통과하지 않게 한다
+        return hmac.new(self._secret, key.encode("utf-8") + b"\x00" + payload, hashlib.sha256).digest()
+
+    def _dumps(self, key: str, value: Any) -> bytes:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return self._sign(key, payload) + payload
+
+    def _loads(self, key: str, data: bytes):
+        """서명이 맞으면 값, 아니면 _MISSING (다른 키로 쓴 값이거나 변조됨)"""
+        mac, payload = data[:32], data[32:]
+        if not hmac.compare_digest(mac, self._sign(key, payload)):
+            logger.warning(f"공유 캐시 서명 불일치, 무시: {key}")
+            return _MISSING
+        return pickle.loads(payload)
+
+    def get(self, key: str, default=None):
+        data = self._get(key)
+        value = _MISSING if data is None else self._loads(key, data)
+        if value is _MISSING:
+            self._count(key, "misses")
+            return default
+        self._count(key, "hits")
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """ttl(초)이 None이면 기본 TTL, 0 이하면 저장하지 않는다"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._set(key, self._dumps(key, value), time.time() + ttl)
+        self._count(key, "sets")
+
+    @contextmanager
+    def lock(self, key: str, timeout: Optional[float] = None):
+        """
+        레플리카 간 잠금 (lease 방식). timeout까지 못 얻으면 잠금 없이 진행 → yield False.
+        계산이 lease보다 오래 걸리면 다른 레플리카가 중복 계산할 수 있다 (정확성에는 영향 없음).
+        """
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + (self.lock_lease if timeout is None else timeout)
+        acquired = self._try_lock(key, owner, self.lock_lease)
+        if not acquired:
+            self._count(key, "lock_waits")
+            while not acquired and time.monotonic() < deadline:
+                time.sleep(self.lock_poll)
+                acquired = self._try_lock(key, owner, self.lock_lease)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._unlock(key, owner)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None):
+        """
+        있으면 읽고, 없으면 잠금을 잡은 1곳만 compute() → 저장.
+        기다린 쪽은 잠금을 얻은 뒤 다시 조회하여 먼저 계산된 값을 사용한다.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self.lock(key):
+            data = self._get(key)     # 대기 후 재조회 (hit/miss는 위에서 이미 집계)
+            value = _MISSING if data is None else self._loads(key, data)
+            if value is not _MISSING:
+                return value
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            by_ns = {ns: dict(v) for ns, v in self._stats.items()}
+        hits = sum(v["hits"] for v in by_ns.values())
+        misses = sum(v["misses"] for v in by_ns.values())
+        return {
+            "backend": self.name, "hits": hits, "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "evictions": self.evictions, **self._size(), "by_namespace": by_ns,
+        }
+
+
+class NullCache(CacheBackend):
+    """SHARED_CACHE = "off": 항상 miss, 잠금 없음 (프로세스별 캐시만 사용)"""
+    name = "off"
+
+    def _get(self, key): return None
+    def _set(self, key, data, expires_at): pass
+    def delete(self, key): pass
+    def clear(self, namespace=None): pass
+    def _try_lock(self, key, owner, lease): return True
+    def _unlock(self, key, owner): pass
+
+
+class MemoryCache(CacheBackend):
+    """프로세스 내 저장소 (단일 레플리카/테스트용). 총 바이트 기준 LRU + 항목별 만료"""
+    name = "memory"
+
+    def __init__(self, max_bytes: int, default_ttl: float):
+        super().__init__(default_ttl)
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._locks: dict = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                self._drop(key)
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def _drop(self, key):
+        _, data = self._items.pop(key)
+        self._bytes -= len(data)
+
+    def _set(self, key, data, expires_at):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (expires_at, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._items)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+
+    def clear(self, namespace=None):
+        with self._lock:
+            for key in [k for k in self._items if namespace is None or _namespace(k) == namespace]:
+                self._drop(key)
+
+    def _try_lock(self, key, owner, lease):
+        now = time.time()
+        with self._lock:
+            held = self._locks.get(key)
+            if held and held[1] > now:
+                return False
+            self._locks[key] = (owner, now + lease)
+            return True
+
+    def _unlock(self, key, owner):
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == owner:
+                del self._locks[key]
+
+    def _size(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class SQLiteCache(CacheBackend):
+    """
+    공유 볼륨의 SQLite 파일 저장소. 레플리카(프로세스)마다 연결을 열어 같은 파일을 쓴다.
+    - WAL + busy_timeout으로 읽기와 쓰기가 서로 막지 않게 함
+    - 총 크기가 max_bytes를 넘으면 만료 항목 → 오래 안 읽힌 항목 순으로 삭제
+    - 잠금은 cache_locks 행 (INSERT 성공 = 획득, expires_at 지나면 누구나 회수)
+    """
+    name = "sqlite"
+    touch_interval = 60.0   # 읽을 때마다 쓰지 않도록 accessed_at은 이 간격으로만 갱신
+    evict_every = 32        # set N번마다 크기 확인
+
+    def __init__(self, path: str, max_bytes: int, default_ttl: float, secret: Optional[bytes] = None):
+        super().__init__(default_ttl, secret)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at);
+                CREATE TABLE IF NOT EXISTS cache_locks (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+            """)
+
+    @contextmanager
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        yield conn
+
+    def _get(self, key):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            if expires_at < now:
+                conn.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at < ?", (key, now))
+                return None
+            if now - accessed_at > self.touch_interval:
+                conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return bytes(value)
+
+    def _set(self, key, data, expires_at):
+        if len(data) > self.max_bytes:
+            return
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), len(data), expires_at, time.time()),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        now = time.time()
+        removed = conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,)).rowcount
+        conn.execute("DELETE FROM cache_locks WHERE expires_at < ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total > self.max_bytes:
+            # 오래 안 읽힌 순으로 누적 크기를 세어 목표(80%)까지 한 번에 삭제
+            excess, cutoff = total - int(self.max_bytes * 0.8), None
+            for accessed_at, size in conn.execute("SELECT accessed_at, size FROM cache_entries ORDER BY accessed_at"):
+                excess -= size
+                cutoff = accessed_at
+                if excess <= 0:
+                    break
+            if cutoff is not None:
+                removed += conn.execute("DELETE FROM cache_entries WHERE accessed_at <= ?", (cutoff,)).rowcount
+        self.evictions += removed
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self, namespace=None):
+        with self._conn() as conn:
+            if namespace is None:
+                conn.execute("DELETE FROM cache_entries")
+                conn.execute("DELETE FROM cache_locks")
+            else:
+                # 키는 'namespace:해시' → 범위 조건으로 PK 인덱스 사용
+                conn.execute("DELETE FROM cache_entries WHERE key >= ? AND key < ?", (f"{namespace}:", f"{namespace};"))
+
+    def _try_lock(self, key, owner, lease):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache_locks WHERE key = ? AND expires_at < ?", (key, now))
+            cur = conn.execute("INSERT OR IGNORE INTO cache_locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                               (key, owner, now + lease))
+            return cur.rowcount == 1
+
+    def _unlock(self, key, owner):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def _size(self):
+        with self._conn() as conn:
+            n, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+        return {"entries": n, "bytes": total, "max_bytes": self.max_bytes}
+
+
+# -------------------------
+# 전역 인스턴스 (첫 사용 시 config를 읽어 생성)
+# -------------------------
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+def _default_path() -> str:
+    db_dir = os.path.dirname(getattr(config, "DB_PATH", "./db/musinsa.db")) or "."
+    return getattr(config, "SHARED_CACHE_PATH", os.path.join(db_dir, "cache.db"))
+
+def _secret(path: str) -> bytes:
+    """레플리카가 공유하는 서명 키. 설정값이 없으면 캐시 파일 옆에 한 번 만들어 두고 같이 쓴다"""
+    configured = getattr(config, "SHARED_CACHE_SECRET", os.getenv("ALGOSA_SHARED_CACHE_SECRET"))
+    if configured:
+        return configured.encode("utf-8") if isinstance(configured, str) else bytes(configured)
+    key_path = os.path.join(os.path.dirname(os.path.abspath(path)), "cache.key")
+    os.makedirs(os.path.dirname(key_path), exist_ok=True)
+    try:
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+    for _ in range(50):  # 다른 레플리카가 방금 만들어 아직 쓰는 중일 수 있다
+        with open(key_path, "rb") as f:
+            key = f.read()
+        if len(key) == 32:
+            return key
+        time.sleep(0.01)
+    raise OSError(f"캐시 서명 키를 읽을 수 없음: {key_path}")
+
+def make_backend() -> CacheBackend:
+    kind = str(getattr(config, "SHARED_CACHE", os.getenv("ALGOSA_SHARED_CACHE", "sqlite"))).lower()
+    max_bytes = int(getattr(config, "SHARED_CACHE_MAX_MB", 512)) * 1024 * 1024
+    ttl = float(getattr(config, "SHARED_CACHE_TTL", 7 * 24 * 3600))
+    if kind == "off":
+        return NullCache(ttl)
+    if kind == "memory":
+        return MemoryCache(max_bytes, ttl)
+    try:
+        return SQLiteCache(_default_path(), max_bytes, ttl, secret=_secret(_default_path()))
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"공유 캐시 열기 실패, 프로세스 내 캐시로 대체: {e}")
+        return MemoryCache(max_bytes, ttl)
+
+def shared_cache() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend()
+    return _backend
+
+def set_backend(backend: Optional[CacheBackend]) -> None:
+    """다른 저장소로 교체 (None이면 다음 사용 시 config 기준으로 다시 생성)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -1,29 +1,424 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 import pandas as pd
 from sqlalchemy import text
 from config import engine
 import streamlit as st
+from db import load_review_tokens, save_review_tokens
+from modules.cache import shared_cache, cache_key
+from modules import tracing
+
+# -------------------------
+# 데이터 버전 기반 캐시
+# -------------------------
+# 수집(save_products/save_reviews)과 재구축이 같은 트랜잭션에서 data_versions를 올리므로,
+# (인자, 버전)을 키로 캐시하면 반복 렌더는 버전 조회 1번으로 끝나고
+# 새 데이터는 커밋 즉시 보인다. 'all'은 전체 재구축 시 올라가는 공통 버전.
+
+@tracing.traced("sql.data_version")
+def data_stamp(scope: str) -> tuple[int, str | None]:
+    """(scope 버전 + 전체 버전, 마지막 변경 시각 'YYYY-MM-DD HH:MM:SS'). 테이블이 없으면 (0, None)"""
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT COALESCE(SUM(version), 0), MAX(updated_at) FROM data_versions WHERE scope IN (:scope, 'all')"),
+                {"scope": scope},
+            ).first()
+    except Exception:
+        return 0, None
+    return int(row[0] or 0), (str(row[1]) if row[1] else None)
+
+# 화면 한 번 그리는 동안(rerun_versions 블록) scope별 버전은 한 번만 조회
+_run_versions: ContextVar[dict | None] = ContextVar("algosa_run_versions", default=None)
+
+@contextmanager
+def rerun_versions():
+    """블록 안에서 data_version 결과를 재사용 (Streamlit 스크립트 1회 실행 단위)"""
+    token = _run_versions.set({})
+    try:
+        yield
+    finally:
+        _run_versions.reset(token)
+
+def forget_versions():
+    """이번 실행 중에 직접 데이터를 바꿨을 때(수집, 토큰 채움) 기억한 버전을 버린다"""
+    memo = _run_versions.get()
+    if memo is not None:
+        memo.clear()
+
+def data_version(scope: str) -> int:
+    """scope('product:<id>', 'category:<code>') 버전 + 전체 버전. 테이블이 없으면 0"""
+    memo = _run_versions.get()
+    if memo is None:
+        return data_stamp(scope)[0]
+    if scope not in memo:
+        memo[scope] = data_stamp(scope)[0]
+    return memo[scope]
+
+def versioned(scope, max_entries: int = 32):
+    """
+    조회 함수를 (인자, 데이터 버전) 키로 캐시. scope(*args, **kwargs) → 버전 scope 문자열.
+    st.cache_data가 반환값을 복사해 주므로 호출 측에서 DataFrame을 수정해도 안전.
+    프로세스 캐시에 없으면 레플리카 공유 캐시(modules.cache)를 거쳐 한 곳에서만 조회한다.
+    """
+    def deco(fetch):
+        namespace = fetch.__name__.lstrip("_")
+        traced_fetch = tracing.traced(f"sql.{namespace}")(fetch)
+
+        def cached(version, *args, **kwargs):
+            # 공유 캐시 hit이면 data.* 아래에 sql.* span이 없다
+            with tracing.span(f"data.{namespace}"):
+                return shared_cache().get_or_compute(
+                    cache_key(namespace, FRAME_FORMAT, version, args, kwargs), lambda: traced_fetch(*args, **kwargs))
+        # 중첩 함수는 소스가 같아 캐시 키가 겹치므로 이름을 조회 함수별로 구분
+        cached.__qualname__ = f"{fetch.__qualname__}.cached"
+        cached = st.cache_data(max_entries=max_entries, show_spinner=False)(cached)
+
+        def load(*args, **kwargs):
+            return cached(data_version(scope(*args, **kwargs)), *args, **kwargs)
+        load.__doc__ = fetch.__doc__
+        load.fetch = fetch
+        return load
+    return deco
+
+def _product_scope(product_id, *args, **kwargs) -> str:
+    return f"product:{product_id}"
+
+def _category_scope(cat_code, *args, **kwargs) -> str:
+    return f"category:{cat_code}"
+
+def _history_scope(product_id, *args, **kwargs) -> str:
+    return f"history:{product_id}"
 
-@st.cache_data(ttl=300) # 캐시방지
-def load_products_by_category(cat_code: str) -> pd.DataFrame:
+# -------------------------
+# 로더 반환 타입 (데이터 경계에서 한 번만 변환)
+# -------------------------
+# 문자열은 Arrow 기반 string, 프레임 안에서 반복되는 id는 category, 날짜는 datetime64, 평점은 int8.
+# 캐시(프로세스/공유)에 올라가는 프레임이 작아지고, 화면·API·분석 코드는 다시 변환하지 않는다.
+TEXT = pd.StringDtype("pyarrow")
+FRAME_FORMAT = 2   # 반환 타입이 바뀌면 올린다 (공유 캐시에 남은 옛 형식 프레임은 키가 달라 재사용되지 않음)
+
+REVIEW_DTYPES = {"review_no": TEXT, "product_id": "category", "userNickName": TEXT, "content": TEXT, "dup_of": TEXT}
+PRODUCT_DTYPES = {"product_id": TEXT, "brandName": TEXT, "goodsName": TEXT, "thumbnail": TEXT,
+                  "goodsLinkUrl": TEXT, "category": "category"}
+
+def _astype(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    return df.astype({col: dtype for col, dtype in dtypes.items() if col in df})
+
+def typed_reviews(df: pd.DataFrame) -> pd.DataFrame:
+    """리뷰 프레임 → Arrow 문자열 / category / datetime64 / int8 (있는 열만)"""
+    df = _astype(df, REVIEW_DTYPES)
+    if "createDate" in df:
+        df["createDate"] = pd.to_datetime(df["createDate"], errors="coerce")
+    if "grade" in df:
+        df["grade"] = pd.to_numeric(df["grade"], errors="coerce").fillna(0).astype("int8")
+    return df
+
+def typed_products(df: pd.DataFrame) -> pd.DataFrame:
+    """상품 프레임 → Arrow 문자열 / category / 다운캐스트한 숫자"""
+    df = _astype(df, PRODUCT_DTYPES)
+    for col in ("price", "reviewCount"):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce", downcast="integer")
+    if "reviewScore" in df:
+        df["reviewScore"] = pd.to_numeric(df["reviewScore"], errors="coerce", downcast="float")
+    return df
+
+def _fetch_products_by_category(cat_code: str) -> pd.DataFrame:
     query = """
         SELECT product_id, brandName, goodsName, price, reviewCount, reviewScore,
                thumbnail, goodsLinkUrl, category
         FROM products
         WHERE category = ?
     """
-    return pd.read_sql(query, engine, params=(cat_code,))
+    return typed_products(pd.read_sql(query, engine, params=(cat_code,)))
 
-def load_reviews_by_product(product_id: str) -> pd.DataFrame:
+def _fetch_reviews_by_product(product_id: str) -> pd.DataFrame:
     sql = text(
         """
-        SELECT review_no, product_id, createDate, userNickName, content, grade
-        FROM reviews
-        WHERE product_id = :pid
-        ORDER BY createDate DESC
+        SELECT r.review_no, r.product_id, r.createDate, r.userNickName, r.content, r.grade, m.dup_of
+        FROM reviews r
+        LEFT JOIN review_minhash m ON m.review_no = r.review_no
+        WHERE r.product_id = :pid
+        ORDER BY r.createDate DESC
         """
     )
     df = pd.read_sql(sql, engine, params={"pid": product_id})
-    if not df.empty:
-        df["grade"] = pd.to_numeric(df["grade"], errors="coerce")
-        df = df.dropna(subset=["grade"]).assign(grade=lambda d: d["grade"].astype(int))
+    df = df.loc[pd.to_numeric(df["grade"], errors="coerce").notna()]
+    return typed_reviews(df)
+
+@tracing.traced("data.review_tokens")
+def load_review_token_lists(reviews_df: pd.DataFrame) -> list[list[str]]:
+    """리뷰별 저장된 명사 토큰을 반환. 저장소에 없는 리뷰만 토큰화하여 채워 넣는다."""
+    if reviews_df.empty:
+        return []
+    product_id = str(reviews_df["product_id"].iloc[0])
+    review_nos = reviews_df["review_no"]
+
+    stored = load_review_tokens(product_id)
+    missing = reviews_df.loc[~review_nos.isin(stored.keys())]
+    if not missing.empty:
+        save_review_tokens(missing)  # keyword_counts와 버전도 함께 바뀐다
+        forget_versions()
+        stored = load_review_tokens(product_id)
+    return [stored.get(rno, []) for rno in review_nos]
+
+def _month_filter(start_month, end_month) -> str:
+    cond = ""
+    if start_month:
+        cond += " AND k.month >= :start_month"
+    if end_month:
+        cond += " AND k.month <= :end_month"
+    return cond
+
+def _fetch_keyword_counts(product_id: str, limit: int = 200,
+                        start_month: str | None = None, end_month: str | None = None) -> dict[str, int]:
+    """상품 키워드 빈도 상위 N개 (keyword_counts 인덱스). 월 범위('YYYY-MM')로 제한 가능"""
+    sql = text(f"""
+        SELECT k.term, SUM(k.count) AS cnt
+        FROM keyword_counts k
+        WHERE k.product_id = :pid{_month_filter(start_month, end_month)}
+        GROUP BY k.term
+        ORDER BY cnt DESC, k.term
+        LIMIT :limit
+    """)
+    df = pd.read_sql(sql, engine, params={
+        "pid": product_id, "limit": int(limit), "start_month": start_month, "end_month": end_month,
+    })
+    return dict(zip(df["term"], df["cnt"].astype(int)))
+
+def _fetch_category_keywords(cat_code: str, limit: int = 50,
+                           start_month: str | None = None, end_month: str | None = None) -> dict[str, int]:
+    """카테고리 전체 키워드 빈도 상위 N개"""
+    sql = text(f"""
+        SELECT k.term, SUM(k.count) AS cnt
+        FROM keyword_counts k JOIN products p ON p.product_id = k.product_id
+        WHERE p.category = :cat{_month_filter(start_month, end_month)}
+        GROUP BY k.term
+        ORDER BY cnt DESC, k.term
+        LIMIT :limit
+    """)
+    df = pd.read_sql(sql, engine, params={
+        "cat": cat_code, "limit": int(limit), "start_month": start_month, "end_month": end_month,
+    })
+    return dict(zip(df["term"], df["cnt"].astype(int)))
+
+def _fetch_rollups(product_id: str, period: str = "M") -> pd.DataFrame:
+    """상품의 주간(W)/월간(M) 롤업 (review_rollups)"""
+    sql = text(
+        """
+        SELECT period_start, reviews, grade_sum, grade_1, grade_2, grade_3, grade_4, grade_5, pos, neu, neg
+        FROM review_rollups
+        WHERE product_id = :pid AND period = :period
+        ORDER BY period_start
+        """
+    )
+    return pd.read_sql(sql, engine, params={"pid": product_id, "period": period})
+
+def _fetch_monthly_top_terms(product_id: str, per_month: int = 3, since_month: str | None = None) -> pd.DataFrame:
+    """월별 상위 키워드 (month, term, count)"""
+    sql = text(f"""
+        SELECT k.month, k.term, k.count
+        FROM keyword_counts k
+        WHERE k.product_id = :pid{_month_filter(since_month, None)}
+    """)
+    df = pd.read_sql(sql, engine, params={"pid": product_id, "start_month": since_month})
+    if df.empty:
+        return df
+    return (
+        df.sort_values(["month", "count", "term"], ascending=[False, False, True])
+          .groupby("month", sort=False)
+          .head(per_month)
+          .reset_index(drop=True)
+    )
+
+def _fetch_duplicate_rates(cat_code: str) -> pd.DataFrame:
+    """카테고리 상품별 유사/중복 리뷰 비율 (product_id, reviews, duplicates, dup_rate)"""
+    sql = text(
+        """
+        SELECT m.product_id,
+               COUNT(*) AS reviews,
+               SUM(CASE WHEN m.dup_of IS NULL THEN 0 ELSE 1 END) AS duplicates
+        FROM review_minhash m JOIN products p ON p.product_id = m.product_id
+        WHERE p.category = :cat
+        GROUP BY m.product_id
+        """
+    )
+    df = pd.read_sql(sql, engine, params={"cat": cat_code})
+    df["dup_rate"] = (df["duplicates"] / df["reviews"].clip(lower=1)).round(4)
+    return df.sort_values("dup_rate", ascending=False).reset_index(drop=True)
+
+# -------------------------
+# 리뷰 목록 (키셋 페이지네이션)
+# -------------------------
+# 최신순 (createDate DESC, review_no DESC). 커서는 이전 페이지 마지막 행의 (createDate, review_no)라
+# OFFSET 없이 idx_reviews_product_date 인덱스 범위만 읽고, 한 번에 한 페이지만 메모리에 올린다.
+REVIEW_PAGE_COLUMNS = ["review_no", "createDate", "userNickName", "content", "grade"]
+
+def _like_pattern(term: str) -> str:
+    # LIKE 특수문자는 '!'로 이스케이프 (SQLite/MySQL 공통, 쿼리에 ESCAPE '!' 필요)
+    escaped = term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"%{escaped}%"
+
+def _review_filters(min_grade: int = 1, max_grade: int = 5,
+                    start_date: str | None = None, end_date: str | None = None,
+                    text_query: str | None = None) -> tuple[str, dict]:
+    cond, params = "", {}
+    if min_grade > 1 or max_grade < 5:
+        cond += " AND grade BETWEEN :min_grade AND :max_grade"
+        params.update(min_grade=int(min_grade), max_grade=int(max_grade))
+    if start_date:
+        cond += " AND createDate >= :start_date"
+        params["start_date"] = str(start_date)[:10]
+    if end_date:
+        cond += " AND createDate <= :end_date"
+        params["end_date"] = str(end_date)[:10]
+    if text_query:
+        cond += " AND content LIKE :text_query ESCAPE '!'"
+        params["text_query"] = _like_pattern(text_query)
+    return cond, params
+
+def _fetch_review_page(product_id: str, cursor: tuple | None = None, page_size: int = 50,
+                       **filters) -> tuple[pd.DataFrame, tuple | None]:
+    """
+    (한 페이지 DataFrame, 다음 페이지 커서 또는 None).
+    작성일 DESC(NULL은 SQLite/MySQL 모두 맨 뒤), review_no DESC. 커서는 (DB에 저장된 작성일 문자열 또는 None, review_no)
+    """
+    cond, params = _review_filters(**filters)
+    if cursor and cursor[0] is None:
+        # 작성일 없는 리뷰 구간: 그 안에서 review_no 순으로만 진행
+        cond += " AND createDate IS NULL AND review_no < :c_no"
+        params.update(c_no=cursor[1])
+    elif cursor:
+        cond += " AND (createDate < :c_date OR (createDate = :c_date AND review_no < :c_no) OR createDate IS NULL)"
+        params.update(c_date=cursor[0], c_no=cursor[1])
+    sql = text(f"""
+        SELECT {", ".join(REVIEW_PAGE_COLUMNS)}
+        FROM reviews
+        WHERE product_id = :pid{cond}
+        ORDER BY createDate DESC, review_no DESC
+        LIMIT :limit
+    """)
+    df = pd.read_sql(sql, engine, params={"pid": product_id, "limit": int(page_size) + 1, **params})
+    has_more = len(df) > page_size
+    next_cursor = None
+    if has_more:
+        # 변환 전 원래 값으로 (파싱 못 하는 날짜 문자열도 그대로 비교되도록)
+        last_date, last_no = df["createDate"].iat[page_size - 1], df["review_no"].iat[page_size - 1]
+        next_cursor = (None if pd.isna(last_date) else str(last_date), str(last_no))
+    df = typed_reviews(df.iloc[:page_size].reset_index(drop=True))
+    return df, next_cursor
+
+def _fetch_review_count(product_id: str, **filters) -> int:
+    cond, params = _review_filters(**filters)
+    sql = text(f"SELECT COUNT(*) AS n FROM reviews WHERE product_id = :pid{cond}")
+    with engine.connect() as conn:
+        return int(conn.execute(sql, {"pid": product_id, **params}).scalar() or 0)
+
+# -------------------------
+# 상품 검색 (상품 선택기, 키셋 페이지네이션)
+# -------------------------
+# 카테고리 상품 전체를 selectbox에 넣지 않고, 검색어·정렬로 한 페이지씩 조회한다.
+# (category, 정렬 컬럼, product_id) 인덱스를 정렬 순서대로 읽으며 검색어를 거르므로 LIMIT만큼 찾으면 멈춘다.
+PRODUCT_SORTS = {"reviewCount": "리뷰 많은 순", "reviewScore": "평점 높은 순"}
+PRODUCT_PAGE_COLUMNS = ["product_id", "brandName", "goodsName", "price", "reviewCount", "reviewScore",
+                        "thumbnail", "goodsLinkUrl", "category"]
+
+def _product_search(query: str | None) -> tuple[str, dict]:
+    """공백으로 나눈 단어마다 브랜드 또는 상품명에 포함 (최대 5단어, AND)"""
+    cond, params = "", {}
+    for i, term in enumerate((query or "").split()[:5]):
+        cond += f" AND (brandName LIKE :q{i} ESCAPE '!' OR goodsName LIKE :q{i} ESCAPE '!')"
+        params[f"q{i}"] = _like_pattern(term)
+    return cond, params
+
+def _fetch_product_page(cat_code: str, cursor: tuple | None = None, page_size: int = 20,
+                        query: str | None = None, sort: str = "reviewCount") -> tuple[pd.DataFrame, tuple | None]:
+    """
+    (한 페이지 DataFrame, 다음 페이지 커서 또는 None).
+    정렬: sort DESC(NULL은 SQLite/MySQL 모두 맨 뒤), product_id DESC. 커서는 (sort 값 또는 None, product_id)
+    """
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"unknown sort: {sort}")
+    cond, params = _product_search(query)
+    if cursor and cursor[0] is None:
+        cond += f" AND {sort} IS NULL AND product_id < :c_id"
+        params.update(c_id=cursor[1])
+    elif cursor:
+        cond += f" AND ({sort} < :c_val OR ({sort} = :c_val AND product_id < :c_id) OR {sort} IS NULL)"
+        params.update(c_val=cursor[0], c_id=cursor[1])
+    sql = text(f"""
+        SELECT {", ".join(PRODUCT_PAGE_COLUMNS)}
+        FROM products
+        WHERE category = :cat{cond}
+        ORDER BY {sort} DESC, product_id DESC
+        LIMIT :limit
+    """)
+    df = pd.read_sql(sql, engine, params={"cat": cat_code, "limit": int(page_size) + 1, **params})
+    has_more = len(df) > page_size
+    df = df.iloc[:page_size].reset_index(drop=True)
+    # 커서는 변환 전 DB 값 그대로 (numpy 스칼라는 파이썬 값으로)
+    next_cursor = None
+    if has_more:
+        last = df[sort].iat[-1]
+        last = None if pd.isna(last) else last.item() if hasattr(last, "item") else last
+        next_cursor = (last, str(df["product_id"].iat[-1]))
+    return typed_products(df), next_cursor
+
+def _fetch_product_count(cat_code: str, query: str | None = None) -> int:
+    cond, params = _product_search(query)
+    sql = text(f"SELECT COUNT(*) AS n FROM products WHERE category = :cat{cond}")
+    with engine.connect() as conn:
+        return int(conn.execute(sql, {"cat": cat_code, **params}).scalar() or 0)
+
+
+# -------------------------
+# 가격/리뷰 수 이력 (값이 바뀐 시점만 저장된 product_history)
+# -------------------------
+def _fetch_product_history(product_id: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+    """[start, end] ('YYYY-MM-DD') 구간 이력. start 시점의 값을 알 수 있도록 그 직전 1행도 포함"""
+    cond, params = "", {"pid": product_id}
+    if start:
+        cond += """ AND observed_at >= COALESCE(
+            (SELECT MAX(observed_at) FROM product_history WHERE product_id = :pid AND observed_at <= :start), :start)"""
+        params["start"] = str(start)[:10]
+    if end:
+        cond += " AND observed_at <= :end"
+        params["end"] = f"{str(end)[:10]} 23:59:59"
+    sql = text(f"""
+        SELECT observed_at, price, reviewCount, reviewScore
+        FROM product_history
+        WHERE product_id = :pid{cond}
+        ORDER BY observed_at
+    """)
+    df = pd.read_sql(sql, engine, params=params)
+    df["observed_at"] = pd.to_datetime(df["observed_at"], errors="coerce")
+    for col in ("price", "reviewCount", "reviewScore"):
+        df[col] = pd.to_numeric(df[col], errors="coerce", downcast="float" if col == "reviewScore" else "integer")
     return df
+
+def _fetch_last_observed(product_id: str) -> str | None:
+    """마지막 수집 시각 ('YYYY-MM-DD HH:MM:SS', UTC). 이력 차트를 이 시점까지 이어 그린다"""
+    sql = text("SELECT observed_at FROM product_observed WHERE product_id = :pid")
+    with engine.connect() as conn:
+        value = conn.execute(sql, {"pid": product_id}).scalar()
+    return None if value is None else str(value)
+
+
+# -------------------------
+# 캐시된 조회 (앱/API는 이 이름들을 사용)
+# -------------------------
+load_products_by_category = versioned(_category_scope, max_entries=8)(_fetch_products_by_category)
+load_reviews_by_product = versioned(_product_scope, max_entries=16)(_fetch_reviews_by_product)
+load_keyword_counts = versioned(_product_scope, max_entries=64)(_fetch_keyword_counts)
+load_category_keywords = versioned(_category_scope, max_entries=16)(_fetch_category_keywords)
+load_rollups = versioned(_product_scope, max_entries=64)(_fetch_rollups)
+load_monthly_top_terms = versioned(_product_scope, max_entries=32)(_fetch_monthly_top_terms)
+load_duplicate_rates = versioned(_category_scope, max_entries=8)(_fetch_duplicate_rates)
+load_review_page = versioned(_product_scope, max_entries=64)(_fetch_review_page)
+load_review_count = versioned(_product_scope, max_entries=64)(_fetch_review_count)
+load_product_page = versioned(_category_scope, max_entries=64)(_fetch_product_page)
+load_product_count = versioned(_category_scope, max_entries=64)(_fetch_product_count)
+load_product_history = versioned(_history_scope, max_entries=64)(_fetch_product_history)
+load_last_observed = versioned(_history_scope, max_entries=64)(_fetch_last_observed)
@@ -0,0 +1,94 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ============================== MinHash + LSH ==============================
+# 문자 3-gram 집합의 MinHash(64개)를 16밴드 × 4행으로 나눠 버킷팅.
+# 같은 버킷을 하나라도 공유하는 리뷰만 후보로 보고, 추정 자카드 유사도가
+# THRESHOLD 이상이면 먼저 들어온 리뷰(대표)의 중복으로 묶는다.
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.8
+SHINGLE = 3
+
+_P = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(20250825)
+_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+_non_word = re.compile(r"[^0-9a-z가-힣]")
+
+def normalize(text: Optional[str]) -> str:
+    # 공백/문장부호/이모지 차이는 무시
+    return _non_word.sub("", (text or "").lower())
+
+def shingles(text: Optional[str]) -> np.ndarray:
+    s = normalize(text)
+    if len(s) <= SHINGLE:
+        grams = [s]
+    else:
+        grams = {s[i:i + SHINGLE] for i in range(len(s) - SHINGLE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64)
+
+def signature(text: Optional[str]) -> np.ndarray:
+    sh = shingles(text)
+    hv = (np.outer(sh, _A) + _B) % _P
+    return hv.min(axis=0).astype(np.uint32)
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    return [zlib.crc32(sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """MinHash 일치 비율 = 자카드 유사도 추정치"""
+    return float(np.mean(a == b))
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+def from_bytes(raw: bytes) -> np.ndarray:
+    return np.frombuffer(raw, dtype="<u4")
+
+
+class LSHIndex:
+    """
+    상품 단위 LSH 인덱스. DB에서 읽은 기존 항목 + 이번 배치를 함께 담아
+    순서대로 대표/중복을 판정한다.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        self._sigs: Dict[str, np.ndarray] = {}
+        self._rep: Dict[str, str] = {}   # review_no → 대표 review_no
+
+    def add_existing(self, review_no: str, sig: np.ndarray, dup_of: Optional[str]):
+        self._insert(review_no, sig, band_keys(sig))
+        self._rep[review_no] = dup_of or review_no
+
+    def _insert(self, review_no: str, sig: np.ndarray, keys: List[int]):
+        self._sigs[review_no] = sig
+        for band, key in enumerate(keys):
+            self._buckets[(band, key)].append(review_no)
+
+    def assign(self, review_no: str, sig: np.ndarray) -> Optional[str]:
+        """중복이면 대표 review_no, 새 대표면 None"""
+        keys = band_keys(sig)
+        best, best_sim = None, THRESHOLD
+        seen = set()
+        for band, key in enumerate(keys):
+            for cand in self._buckets.get((band, key), ()):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                sim = similarity(sig, self._sigs[cand])
+                if sim >= best_sim:
+                    best, best_sim = cand, sim
+        self._insert(review_no, sig, keys)
+        rep = self._rep.get(best, best) if best else review_no
+        self._rep[review_no] = rep
+        return None if rep == review_no else rep
+
@@ -0,0 +1,187 @@
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sqlalchemy import text
+
+from config import engine
+from modules import tracing
+from modules.data import data_version
+
+# ============================== 카테고리 키워드 행렬 ==============================
+# keyword_counts(수집 시 토큰화 + 불용어/접미사 필터 적용)를 그대로 읽어
+# 상품 × 단어 희소 행렬 하나로 카테고리 전체를 표현한다.
+# 카테고리 데이터 버전(data_versions 'category:<code>')이 바뀌었을 때만 확인하고,
+# 상품 버전('product:<id>')이 바뀐 상품의 행만 다시 읽어 증분 갱신.
+
+class CategoryTermMatrix:
+    def __init__(self, cat_code: str):
+        self.cat_code = cat_code
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self._rows: Dict[str, Tuple[int, Dict[int, int]]] = {}  # pid → (상품 버전, {col: count})
+        self._version = None  # 마지막으로 반영한 카테고리 버전
+        self.product_ids: List[str] = []
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._scores: Dict[str, sparse.csr_matrix] = {}
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # 증분 갱신
+    # -------------------------
+    def _signatures(self) -> Dict[str, int]:
+        """카테고리 상품별 데이터 버전 (키워드 빈도가 바뀌면 save_reviews/재구축이 올린다)"""
+        with engine.connect() as conn:
+            pids = [str(pid) for (pid,) in conn.execute(
+                text("SELECT product_id FROM products WHERE category = :cat"), {"cat": self.cat_code})]
+            base = conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM data_versions WHERE scope = 'all'")).scalar()
+            versions = {}
+            for i in range(0, len(pids), 500):
+                batch = pids[i:i + 500]
+                marks = ", ".join(f":s{j}" for j in range(len(batch)))
+                rows = conn.execute(
+                    text(f"SELECT scope, version FROM data_versions WHERE scope IN ({marks})"),
+                    {f"s{j}": f"product:{pid}" for j, pid in enumerate(batch)},
+                )
+                versions.update((scope.split(":", 1)[1], int(v)) for scope, v in rows)
+        return {pid: int(base) + versions.get(pid, 0) for pid in pids}
+
+    def _load_rows(self, product_ids: List[str]) -> pd.DataFrame:
+        frames = []
+        for i in range(0, len(product_ids), 500):
+            batch = product_ids[i:i + 500]
+            marks = ", ".join(f":p{j}" for j in range(len(batch)))
+            sql = text(f"""
+                SELECT product_id, term, SUM(count) AS cnt
+                FROM keyword_counts
+                WHERE product_id IN ({marks})
+                GROUP BY product_id, term
+            """)
+            frames.append(pd.read_sql(sql, engine, params={f"p{j}": pid for j, pid in enumerate(batch)}))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["product_id", "term", "cnt"])
+
+    def refresh(self) -> bool:
+        """카테고리 버전이 바뀌었으면 버전이 바뀐 상품의 행만 다시 읽는다. 변경이 있었으면 True"""
+        with self._lock:
+            version = data_version(f"category:{self.cat_code}")
+            if version == self._version:
+                return False
+            sigs = self._signatures()
+            self._version = version
+            changed = [pid for pid, sig in sigs.items() if self._rows.get(pid, (None,))[0] != sig]
+            removed = [pid for pid in self._rows if pid not in sigs]
+            if not changed and not removed:
+                return False
+
+            for pid in removed:
+                del self._rows[pid]
+
+            df = self._load_rows(changed)
+            for pid in changed:
+                self._rows[pid] = (sigs[pid], {})
+            for pid, term, cnt in zip(df["product_id"].astype(str), df["term"], df["cnt"].astype(int)):
+                col = self.vocab.get(term)
+                if col is None:
+                    col = self.vocab[term] = len(self.terms)
+                    self.terms.append(term)
+                self._rows[pid][1][col] = cnt
+
+            self._rebuild()
+            return True
+
+    def _rebuild(self):
+        self.product_ids = sorted(pid for pid, (_, row) in self._rows.items() if row)  # 키워드 없는 상품 제외
+        indptr, indices, data = [0], [], []
+        for pid in self.product_ids:
+            row = self._rows[pid][1]
+            indices.extend(row.keys())
+            data.extend(row.values())
+            indptr.append(len(indices))
+        self.matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(self.product_ids), len(self.terms)),
+        )
+        self._scores.clear()
+
+    # -------------------------
+    # 점수 (카테고리 전체를 한 번에 계산 후 캐시)
+    # -------------------------
+    def scores(self, method: str = "logodds") -> sparse.csr_matrix:
+        with self._lock:
+            if method not in self._scores:
+                if method == "tfidf":
+                    self._scores[method] = _tfidf(self.matrix)
+                elif method == "logodds":
+                    self._scores[method] = _log_odds(self.matrix)
+                else:
+                    raise ValueError(f"unknown method: {method}")
+            return self._scores[method]
+
+    def top_terms(self, product_id: str, k: int = 10, method: str = "logodds") -> List[Tuple[str, float]]:
+        try:
+            i = self.product_ids.index(str(product_id))
+        except ValueError:
+            return []
+        row = self.scores(method).getrow(i)
+        if row.nnz == 0:
+            return []
+        order = np.argsort(-row.data, kind="stable")[:k]
+        return [(self.terms[row.indices[j]], float(row.data[j])) for j in order if row.data[j] > 0]
+
+
+def _tfidf(counts: sparse.csr_matrix) -> sparse.csr_matrix:
+    if counts.shape[0] == 0:
+        return counts
+    from sklearn.feature_extraction.text import TfidfTransformer
+    return TfidfTransformer(sublinear_tf=True).fit_transform(counts).tocsr()
+
+def _log_odds(counts: sparse.csr_matrix, prior_scale: float = 0.01) -> sparse.csr_matrix:
+    """
+    정보적 디리클레 사전분포 기반 log-odds z-score (Monroe et al., 2008).
+    각 상품을 '같은 카테고리의 나머지 상품'과 비교. 0이 아닌 칸에 대해서만 벡터 연산.
+    """
+    counts = counts.tocsr()
+    if counts.nnz == 0:
+        return counts.copy()
+    col_tot = np.asarray(counts.sum(axis=0)).ravel()
+    row_tot = np.asarray(counts.sum(axis=1)).ravel()
+    total = col_tot.sum()
+
+    alpha_w = prior_scale * col_tot          # 카테고리 배경 빈도 비례 사전
+    alpha_0 = alpha_w.sum()
+
+    coo = counts.tocoo()
+    y_i = coo.data
+    a_w = alpha_w[coo.col]
+    n_i = row_tot[coo.row]
+    y_j = col_tot[coo.col] - y_i             # 나머지 상품
+    n_j = total - n_i
+
+    # 단어가 1개뿐인 카테고리 / 한 단어만 쓴 상품은 분모가 0 → 두 항 모두 하한
+    delta = (np.log((y_i + a_w) / np.maximum(n_i + alpha_0 - y_i - a_w, 1e-9))
+             - np.log((y_j + a_w) / np.maximum(n_j + alpha_0 - y_j - a_w, 1e-9)))
+    var = 1.0 / (y_i + a_w) + 1.0 / (y_j + a_w)
+    z = delta / np.sqrt(var)
+    return sparse.csr_matrix((z, (coo.row, coo.col)), shape=counts.shape)
+
+
+# -------------------------
+# 프로세스 전역 캐시 (카테고리별 행렬 1개)
+# -------------------------
+_matrices: Dict[str, CategoryTermMatrix] = {}
+_matrices_lock = threading.Lock()
+
+def category_matrix(cat_code: str) -> CategoryTermMatrix:
+    with _matrices_lock:
+        m = _matrices.get(cat_code)
+        if m is None:
+            m = _matrices[cat_code] = CategoryTermMatrix(cat_code)
+    m.refresh()
+    return m
+
+@tracing.traced("analytics.distinctive")
+def distinctive_terms(cat_code: str, product_id: str, k: int = 10, method: str = "logodds") -> List[Tuple[str, float]]:
+    """카테고리 내 다른 상품 대비 이 상품에서 특히 많이 언급되는 단어 상위 k개"""
+    return category_matrix(cat_code).top_terms(product_id, k=k, method=method)
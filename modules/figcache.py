@@ -0,0 +1,159 @@
+import io
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from modules import tracing
+
+logger = logging.getLogger("algosa.figcache")
+
+# -------------------------
+# 렌더링된 차트(PNG bytes) 캐시
+# - 입력 해시 → PNG bytes, 메모리는 총 바이트 기준 LRU
+# - ALGOSA_FIGURE_CACHE_DIR 지정 시 디스크에도 보존 (재시작 후 재사용)
+#   디스크도 disk_max_bytes(ALGOSA_FIGURE_CACHE_DISK_BYTES) 예산 안에서 mtime 기준 LRU
+# -------------------------
+class FigureCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._disk_size = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._prune_disk()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._disk_path(key))  # 최근 사용 표시 (LRU)
+            except OSError:  # 다른 프로세스가 방금 정리함 / 읽기 전용 볼륨
+                with self._lock:
+                    self.misses += 1
+                return None
+            self._remember(key, data)
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.disk_dir:
+            # 디스크 계층은 보조 캐시: 쓰기 실패(디스크 부족, 읽기 전용, 권한)는 기록만 하고 렌더링은 계속
+            tmp = self._disk_path(key) + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._disk_path(key))
+            except OSError as e:
+                logger.warning(f"차트 디스크 캐시 쓰기 실패: {e}")
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                return
+            with self._lock:
+                self._disk_size += len(data)
+                over = self._disk_size > self.disk_max_bytes
+            if over:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """오래 안 쓴(mtime) 파일부터 지워 예산 안으로. 여러 프로세스가 같은 폴더를 쓰므로 실제 크기로 다시 계산"""
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith(".png"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_size = total
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._size, "hits": self.hits, "misses": self.misses,
+                    "disk_bytes": self._disk_size}
+
+
+figure_cache = FigureCache(
+    disk_dir=os.getenv("ALGOSA_FIGURE_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("ALGOSA_FIGURE_CACHE_DISK_BYTES", 256 * 1024 * 1024)),
+)
+
+def figure_key(kind: str, *parts) -> str:
+    raw = json.dumps([kind, *parts], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+@tracing.traced("matplotlib.savefig")
+def figure_to_png(fig, dpi: Optional[int] = None) -> bytes:
+    """Figure를 PNG bytes로 저장하고 즉시 닫는다 (장시간 프로세스에서 figure 누적 방지)"""
+    import matplotlib.pyplot as plt   # figure가 있으면 이미 불러온 상태
+
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format="png", dpi=dpi or fig.dpi, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
+
+def cached_png(key: str, render: Callable[[], Optional[object]]) -> Optional[bytes]:
+    """캐시에 있으면 그대로, 없으면 render()로 만든 figure를 PNG로 굽고 저장"""
+    data = figure_cache.get(key)
+    if data is not None:
+        return data
+    fig = render()
+    if fig is None:
+        return None
+    data = figure_to_png(fig)
+    figure_cache.put(key, data)
+    return data
@@ -0,0 +1,102 @@
+import os
+import re
+import json
+import heapq
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ======================= 불용어/접미사 + 키워드 전처리 =======================
+
+# 규칙은 데이터 파일로 관리 (ALGOSA_KEYWORD_RULES 로 다른 파일 지정 가능)
+_RULES_PATH = os.getenv(
+    "ALGOSA_KEYWORD_RULES",
+    os.path.join(os.path.dirname(__file__), "keyword_rules.json"),
+)
+
+def load_rules(path: str = _RULES_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    return {
+        "min_length": int(rules.get("min_length", 2)),
+        "stopwords": list(rules.get("stopwords", [])),
+        "verb_suffixes": tuple(rules.get("verb_suffixes", [])),
+    }
+
+_RULES = load_rules()
+
+def default_stopwords() -> List[str]:
+    return list(_RULES["stopwords"])
+
+def verb_suffixes() -> Tuple[str, ...]:
+    return _RULES["verb_suffixes"]
+
+
+# -------------------------
+# 필터 엔진
+# -------------------------
+class KeywordFilter:
+    """
+    불용어 + 최소 길이/한글 여부 + 용언 접미사 규칙을 한 번 컴파일해 두고 재사용.
+    - 단건 판정: 접미사를 길이별 집합으로 나눠 w[-k:] 조회 (길이 종류 수만큼만 비교)
+    - 대량 판정: 접미사 하나의 정규식 alternation으로 pandas 문자열 연산에 위임
+    """
+
+    # 이 이상의 어휘는 pandas 벡터 경로로 처리
+    VECTORIZE_MIN = 5000
+
+    def __init__(self, stopwords, suffixes=(), min_length: int = 2, remove_suffixes: bool = True):
+        self.stop = frozenset(stopwords)
+        self.min_length = min_length
+        self.suffixes = tuple(suffixes) if remove_suffixes else ()
+        self._word = re.compile(rf"[가-힣]{{{max(min_length, 1)},}}")
+        self._suffix_set = frozenset(self.suffixes)
+        self._suffix_lens = sorted({len(s) for s in self.suffixes})
+        self._suffix_re = (
+            re.compile("(?:" + "|".join(map(re.escape, sorted(self.suffixes, key=len, reverse=True))) + ")$")
+            if self.suffixes else None
+        )
+
+    def keep(self, w: str) -> bool:
+        if w in self.stop:              # 불용어 제거
+            return False
+        if not self._word.fullmatch(w):  # 한글만, 최소 길이
+            return False
+        sufs = self._suffix_set
+        return not any(w[-k:] in sufs for k in self._suffix_lens)
+
+    def _mask(self, words: pd.Index):
+        mask = ~words.isin(self.stop) & words.str.fullmatch(self._word.pattern)
+        if self._suffix_re is not None:
+            mask &= ~words.str.contains(self._suffix_re.pattern, regex=True)
+        return mask
+
+    def filter(self, freq: Dict[str, int], top_k: Optional[int] = None) -> Dict[str, int]:
+        """빈도 dict를 필터링하여 빈도 내림차순 dict로 반환. top_k가 있으면 부분 선택"""
+        if len(freq) >= self.VECTORIZE_MIN:
+            s = pd.Series(freq, dtype="int64")
+            s = s[np.asarray(self._mask(s.index), dtype=bool)]
+            s = s.nlargest(top_k, keep="first") if top_k else s.sort_values(ascending=False, kind="stable")
+            return {w: int(c) for w, c in s.items()}
+
+        items = [(w, c) for w, c in freq.items() if self.keep(w)]
+        if top_k:
+            items = heapq.nlargest(top_k, items, key=lambda kv: kv[1])
+        else:
+            items.sort(key=lambda kv: kv[1], reverse=True)
+        return dict(items)
+
+
+@lru_cache(maxsize=16)
+def _engine(stop: frozenset, remove_suffixes: bool) -> KeywordFilter:
+    return KeywordFilter(stop, _RULES["verb_suffixes"], _RULES["min_length"], remove_suffixes)
+
+def default_filter(remove_suffixes: bool = True) -> KeywordFilter:
+    return _engine(frozenset(_RULES["stopwords"]), remove_suffixes)
+
+def post_filter(freq: Dict[str, int], stop: set[str], remove_suffixes: bool = True,
+                top_k: Optional[int] = None) -> Dict[str, int]:
+    # 자주 나온 순서로 정렬하여 반환
+    return _engine(frozenset(stop), remove_suffixes).filter(freq, top_k)
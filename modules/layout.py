@@ -1,7 +1,10 @@
 import os
 import streamlit as st
+import pandas as pd
 from PIL import Image
 
+from modules.data import PRODUCT_SORTS, load_product_page, load_product_count
+
 def setup_page(title: str):
     st.set_page_config(page_title="알고사(ALGOSA) AI 리뷰분석서비스", layout="wide")
 
@@ -21,8 +24,10 @@ def setup_page(title: str):
     
     st.title(title)
 
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "logo", "title.png")
+
 def render_sidebar(category_map: dict[str, str]) -> tuple[str, bool]:
-    st.sidebar.image(Image.open("/app/assets/logo/title.png"), use_container_width=True)
+    st.sidebar.image(Image.open(LOGO_PATH), use_container_width=True)
     st.sidebar.header("무신사 추천순 🔽")
     
     name = st.sidebar.selectbox("카테고리를 선택하세요", list(category_map.keys()))
@@ -30,12 +35,59 @@ def render_sidebar(category_map: dict[str, str]) -> tuple[str, bool]:
     do_crawl = st.sidebar.button("데이터 새로 수집")
     return code, do_crawl
 
+# -------------------------
+# 상품 선택기 (검색 + 정렬 + 페이지, product_id로 선택)
+# -------------------------
+PICKER_PAGE_SIZE = 20
+
+def _picker_next(cursor):
+    st.session_state["_product_pages"]["cursors"].append(cursor)
+
+def _picker_back():
+    cursors = st.session_state["_product_pages"]["cursors"]
+    if len(cursors) > 1:
+        cursors.pop()
+
+def render_product_picker(category: str) -> tuple[pd.Series | None, pd.DataFrame]:
+    """(선택한 상품 행 또는 None, 현재 페이지 상품들). 카테고리 전체 목록은 불러오지 않는다"""
+    c1, c2 = st.columns([3, 1])
+    query = c1.text_input("상품 검색", placeholder="브랜드 또는 상품명 (예: 나이키 에어)", key="product_query").strip()
+    sort = c2.selectbox("정렬", list(PRODUCT_SORTS), format_func=PRODUCT_SORTS.get, key="product_sort")
+
+    # 카테고리/검색어/정렬이 바뀌면 첫 페이지부터
+    state_key = (category, query, sort)
+    nav = st.session_state.get("_product_pages")
+    if not nav or nav["key"] != state_key:
+        nav = st.session_state["_product_pages"] = {"key": state_key, "cursors": [None]}
+
+    page, next_cursor = load_product_page(category, nav["cursors"][-1], PICKER_PAGE_SIZE, query=query, sort=sort)
+    if page.empty:
+        if query:
+            st.info("검색 결과가 없습니다.")
+        else:
+            st.warning("⚠️ 선택한 카테고리에 상품이 없습니다.")
+        return None, page
+
+    by_id = page.set_index("product_id", drop=False)
+    labels = dict(zip(by_id.index, page["brandName"] + " | " + page["goodsName"]))
+    product_id = st.selectbox("상품을 선택하세요", list(labels), format_func=labels.get, key="product_pick")
+
+    total = load_product_count(category, query=query)
+    if total > PICKER_PAGE_SIZE:
+        page_no = len(nav["cursors"])
+        b1, b2, b3 = st.columns([1, 3, 1])
+        b1.button("◀ 이전", key="pp_prev", on_click=_picker_back, disabled=page_no == 1, use_container_width=True)
+        b2.caption(f"{page_no} / {-(-total // PICKER_PAGE_SIZE)} 페이지 · 상품 {total:,}개")
+        b3.button("다음 ▶", key="pp_next", on_click=_picker_next, args=(next_cursor,),
+                  disabled=next_cursor is None, use_container_width=True)
+    return by_id.loc[product_id], page
+
 def render_product_info(row):
     st.subheader("상품 정보")
     c1, c2 = st.columns([1, 2], vertical_alignment="center")
     with c1:
         thumb = row.get("thumbnail")
-        if thumb and str(thumb).startswith("http"):
+        if pd.notna(thumb) and thumb.startswith("http"):
             st.image(thumb, width=200)
         else:
             st.image("https://via.placeholder.com/200x200.png?text=No+Image", width=200)
@@ -45,5 +97,23 @@ def render_product_info(row):
         st.write(f"**가격:** {row['price']:,}원" if row["price"] else "가격 정보 없음")
         st.write(f"**리뷰:** {row['reviewCount']:,}개")
         st.write(f"**평점:** {int(row['reviewScore'])}/100점")
-        if row.get("goodsLinkUrl"):
+        if pd.notna(row.get("goodsLinkUrl")) and row["goodsLinkUrl"]:
             st.link_button("🛒 구매하기", row["goodsLinkUrl"])
+
+def render_perf_panel(root):
+    """?debug=perf: 이번 실행의 단계별 소요시간 (같은 경로의 반복 구간은 합쳐서 표시)"""
+    rows = {}
+    for path, total, own in root.rows():
+        row = rows.setdefault(path, {"단계": "　" * (len(path) - 1) + path[-1], "횟수": 0, "총 ms": 0.0, "자체 ms": 0.0})
+        row["횟수"] += 1
+        row["총 ms"] += total
+        row["자체 ms"] += own
+    table = pd.DataFrame(rows.values()).round(1)
+
+    # 구간 이름 앞부분(sql / llm / analytics / matplotlib ...)별 자체 시간
+    by_kind = table.assign(종류=[p[-1].split(".")[0] for p in rows]).groupby("종류")["자체 ms"].sum()
+
+    with st.sidebar.expander("⏱️ 이번 실행 소요시간", expanded=True):
+        st.caption(f"총 {root.duration * 1000:,.0f} ms · 구간 {len(table)}개")
+        st.bar_chart(by_kind.sort_values(ascending=False), horizontal=True)
+        st.dataframe(table, hide_index=True, use_container_width=True)
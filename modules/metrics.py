@@ -0,0 +1,148 @@
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict
+
+logger = logging.getLogger("algosa.metrics")
+
+# -------------------------
+# 모델별 단가 (USD / 1M tokens)
+# -------------------------
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    "gpt-4o":      {"prompt": 2.50, "completion": 10.00},
+}
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price = MODEL_PRICING.get(model)
+    if not price:
+        return 0.0
+    return (prompt_tokens * price["prompt"] + completion_tokens * price["completion"]) / 1_000_000
+
+
+# -------------------------
+# 호출 단위 기록
+# -------------------------
+class LLMCall:
+    """모델 호출 1회의 측정값. llm_call() 컨텍스트 안에서 채워진다."""
+
+    def __init__(self, kind: str, product_id: Optional[str], model: str):
+        self.kind = kind
+        self.product_id = product_id
+        self.model = model
+        self.started = time.perf_counter()
+        self.wall_ms = 0.0
+        self.ttft_ms: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.parse_fallback = False
+        self.parse_failed = False
+        self.error: Optional[str] = None
+
+    def set_usage(self, usage) -> None:
+        if usage is None:
+            return
+        self.prompt_tokens = int(getattr(usage, "prompt_tokens", 0) or 0)
+        self.completion_tokens = int(getattr(usage, "completion_tokens", 0) or 0)
+
+    def first_token(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+
+    @property
+    def cost(self) -> float:
+        return estimate_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind, "product_id": self.product_id, "model": self.model,
+            "wall_ms": round(self.wall_ms, 1),
+            "ttft_ms": round(self.ttft_ms, 1) if self.ttft_ms is not None else None,
+            "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6), "retries": self.retries,
+            "parse_fallback": self.parse_fallback, "parse_failed": self.parse_failed,
+            "error": self.error,
+        }
+
+
+# -------------------------
+# 집계 (kind별 / 상품별)
+# -------------------------
+def _empty_bucket() -> dict:
+    return {
+        "calls": 0, "errors": 0, "wall_ms": 0.0, "max_wall_ms": 0.0,
+        "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+        "retries": 0, "parse_fallbacks": 0, "parse_failures": 0,
+        "cache_hits": 0, "cache_misses": 0,
+    }
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_kind: Dict[str, dict] = {}
+        self._by_product: Dict[str, dict] = {}
+
+    def _buckets(self, kind: str, product_id: Optional[str]):
+        yield self._by_kind.setdefault(kind, _empty_bucket())
+        if product_id is not None:
+            yield self._by_product.setdefault(str(product_id), _empty_bucket())
+
+    def record_call(self, call: LLMCall) -> None:
+        with self._lock:
+            for b in self._buckets(call.kind, call.product_id):
+                b["calls"] += 1
+                b["errors"] += int(call.error is not None)
+                b["wall_ms"] += call.wall_ms
+                b["max_wall_ms"] = max(b["max_wall_ms"], call.wall_ms)
+                b["prompt_tokens"] += call.prompt_tokens
+                b["completion_tokens"] += call.completion_tokens
+                b["cost_usd"] += call.cost
+                b["retries"] += call.retries
+                b["parse_fallbacks"] += int(call.parse_fallback)
+                b["parse_failures"] += int(call.parse_failed)
+        logger.info(json.dumps({"event": "llm_call", **call.as_dict()}, ensure_ascii=False))
+
+    def record_cache(self, kind: str, product_id: Optional[str], hit: bool) -> None:
+        with self._lock:
+            for b in self._buckets(kind, product_id):
+                b["cache_hits" if hit else "cache_misses"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "by_kind": {k: dict(v) for k, v in self._by_kind.items()},
+                "by_product": {k: dict(v) for k, v in self._by_product.items()},
+            }
+
+    def log_summary(self) -> None:
+        logger.info(json.dumps({"event": "llm_summary", **self.snapshot()}, ensure_ascii=False))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_kind.clear()
+            self._by_product.clear()
+
+
+registry = MetricsRegistry()
+
+@contextmanager
+def llm_call(kind: str, product_id: Optional[str] = None, model: str = ""):
+    """모델 호출을 감싸서 소요시간/토큰/비용을 registry에 기록"""
+    call = LLMCall(kind, product_id, model)
+    try:
+        yield call
+    except Exception as e:
+        call.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        call.wall_ms = (time.perf_counter() - call.started) * 1000
+        registry.record_call(call)
+
+def record_cache(kind: str, product_id: Optional[str], hit: bool) -> None:
+    registry.record_cache(kind, product_id, hit)
+
+def snapshot() -> dict:
+    return registry.snapshot()
@@ -0,0 +1,143 @@
+import os
+import re
+import time
+import logging
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# -------------------------
+# 프로세스 전역 Okt (JVM 기동은 1회만)
+# -------------------------
+_okt = None
+_okt_failed = False
+_okt_lock = threading.Lock()
+
+_regex_token = re.compile(r"[가-힣]{2,}")
+
+def get_okt():
+    """워밍된 Okt 싱글톤을 반환. KoNLPy/JVM을 쓸 수 없으면 None (실패도 캐시)"""
+    global _okt, _okt_failed
+    if _okt is not None or _okt_failed:
+        return _okt
+    with _okt_lock:
+        if _okt is None and not _okt_failed:
+            try:
+                from konlpy.tag import Okt
+                okt = Okt()
+                okt.nouns("워밍업")  # 첫 호출의 클래스 로딩 비용을 미리 지불
+                _okt = okt
+            except Exception as e:
+                logging.warning(f"Okt 초기화 실패, 정규식 토큰화로 대체: {e}")
+                _okt_failed = True
+    return _okt
+
+def active_tokenizer() -> str:
+    """현재 프로세스에서 쓰는 토크나이저 이름 ('okt' | 'regex')"""
+    return "okt" if get_okt() is not None else "regex"
+
+# -------------------------
+# 토큰화
+# -------------------------
+def regex_tokens(text: str) -> List[str]:
+    # CountVectorizer(token_pattern=r"(?u)[가-힣]{2,}") 폴백과 같은 규칙
+    return _regex_token.findall(text or "")
+
+def noun_tokens(text: str, okt=None) -> List[str]:
+    okt = okt or get_okt()
+    if okt is None:
+        return regex_tokens(text)
+    return [w for w in okt.nouns(text or "") if len(w) >= 2]
+
+def join_tokens(tokens: List[str]) -> str:
+    return " ".join(tokens)
+
+def split_tokens(joined: Optional[str]) -> List[str]:
+    return joined.split() if joined else []
+
+# -------------------------
+# 대량 토큰화 (프로세스 풀)
+# -------------------------
+def _worker_init():
+    # 워커마다 자기 JVM/Okt를 한 번만 띄워 둔다
+    get_okt()
+
+def _tokenize_chunk(texts: List[str]) -> Tuple[List[List[str]], str]:
+    okt = get_okt()
+    if okt is not None:
+        try:
+            return [noun_tokens(t, okt) for t in texts], "okt"
+        except Exception as e:
+            logging.warning(f"Okt 청크 처리 실패, 정규식으로 대체: {e}")
+    return [regex_tokens(t) for t in texts], "regex"
+
+def batch_tokenize(
+    texts: List[str],
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+    min_parallel: int = 5000,
+) -> Tuple[List[List[str]], List[str], dict]:
+    """
+    텍스트를 chunk_size 단위로 잘라 프로세스 풀에서 명사 토큰화.
+    반환: (리뷰별 토큰, 리뷰별 토크나이저 이름, 처리 통계)
+    - 청크 단위로 JVM 실패 시 정규식 토큰화로 대체
+    - min_parallel건 미만이면 풀을 띄우지 않고 현재 프로세스에서 처리
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    started = time.perf_counter()
+
+    if workers <= 1 or len(chunks) <= 1 or len(texts) < min_parallel:
+        results = [_tokenize_chunk(c) for c in chunks]
+        workers = 1
+    else:
+        # fork 후 JVM 사용은 안전하지 않으므로 spawn
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=ctx,
+                                 initializer=_worker_init) as ex:
+            results = list(ex.map(_tokenize_chunk, chunks))
+
+    token_lists: List[List[str]] = []
+    tokenizers: List[str] = []
+    for toks, name in results:
+        token_lists.extend(toks)
+        tokenizers.extend([name] * len(toks))
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "reviews": len(texts), "chunks": len(chunks), "workers": workers,
+        "seconds": round(elapsed, 3),
+        "reviews_per_sec": round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0,
+        "regex_chunks": sum(1 for _, name in results if name == "regex"),
+    }
+    logging.info(f"토큰화 {stats['reviews']}건 / {stats['seconds']}s ({stats['reviews_per_sec']} reviews/s, workers={workers})")
+    return token_lists, tokenizers, stats
+
+
+# -------------------------
+# 실행: 전체 코퍼스 백필 / 처리량 측정
+# -------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="리뷰 명사 토큰 대량 생성")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--csv", help="DB 대신 CSV(content 컬럼)로 처리량만 측정")
+    parser.add_argument("--all", action="store_true", help="이미 토큰이 있는 리뷰도 다시 생성")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.csv:
+        import pandas as pd
+        texts = pd.read_csv(args.csv, encoding="utf-8-sig")["content"].fillna("").astype(str).tolist()
+        _, _, stats = batch_tokenize(texts, workers=args.workers, chunk_size=args.chunk_size)
+    else:
+        from db import backfill_review_tokens, rebuild_review_dedup, rebuild_rollups, rebuild_semantic_index
+        stats = backfill_review_tokens(workers=args.workers, chunk_size=args.chunk_size,
+                                       only_missing=not args.all)
+        rebuild_review_dedup()  # 키워드 인덱스까지 재생성
+        rebuild_rollups()
+        rebuild_semantic_index()
+    print(stats)
@@ -0,0 +1,199 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import config
+from config import engine
+from modules import tracing
+
+# ============================== 로컬 의미 검색 ==============================
+# 네트워크 없이 CPU만으로: 문자 n-gram 해싱 → TF-IDF → TruncatedSVD(LSA) → L2 정규화.
+# 모델 학습과 전체 색인은 db.rebuild_semantic_index (python -m modules.nlp 백필)에서만 한다.
+# 새 모델/벡터는 임시 파일에 만들고 DB 커밋 후 os.replace로 교체(install)하므로 읽는 쪽은
+# 학습 중에도 이전 모델·벡터를 그대로 쓴다. 수집(db.save_reviews)은 그 배치 리뷰만 같은 모델로 변환한다.
+# 벡터는 float32 행렬 파일의 row_idx 위치에 기록, 조회 시 memmap으로 열어 내적 top-k.
+# row_idx는 DB 트랜잭션 안에서 review_vectors 기준으로 할당하므로(db._index_review_vectors)
+# 여러 프로세스가 같은 행을 받지 않는다. 모델/벡터 파일이 교체되면(재색인) 파일 상태로 감지해 다시 연다.
+
+DIM = 128
+MIN_FIT_DOCS = 200   # 이보다 적으면 모델 학습을 미룬다
+
+def _index_dir() -> str:
+    default = os.path.join(os.path.dirname(getattr(config, "DB_PATH", "./db/musinsa.db")) or ".", "semantic")
+    return getattr(config, "SEMANTIC_DIR", default)
+
+def _model_path() -> str:
+    return os.path.join(_index_dir(), "model.joblib")
+
+def _vectors_path() -> str:
+    return os.path.join(_index_dir(), "vectors.f32")
+
+def staged_paths() -> Tuple[str, str]:
+    """재색인용 임시 (모델, 벡터) 파일 경로. install()로 교체하거나 discard()로 지운다"""
+    tag = f".{os.getpid()}.tmp"
+    return _model_path() + tag, _vectors_path() + tag
+
+def install(model_path: str, vectors_path: str) -> None:
+    """임시 파일을 현재 모델/벡터로 교체 (각각 원자적). 읽는 쪽은 파일 상태가 바뀐 것을 보고 다시 연다"""
+    os.replace(vectors_path, _vectors_path())
+    os.replace(model_path, _model_path())
+
+def discard(*paths: str) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _stamp(path: str) -> Optional[tuple]:
+    """파일 교체/변경 감지용 (inode, mtime, 크기). 없으면 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+# -------------------------
+# 임베딩 모델
+# -------------------------
+_model = None
+_model_stamp = None
+_model_lock = threading.Lock()
+
+def load_model():
+    """저장된 모델. 다른 프로세스가 다시 학습해 파일이 바뀌었으면 새로 읽는다"""
+    global _model, _model_stamp
+    stamp = _stamp(_model_path())
+    if stamp is not None and stamp != _model_stamp:
+        import joblib
+        with _model_lock:
+            if stamp != _model_stamp:
+                _model = joblib.load(_model_path())
+                _model_stamp = stamp
+    return _model
+
+def fit_model(texts: List[str], path: str):
+    """코퍼스로 임베딩 모델 학습 후 path에 저장 (기존 벡터와 호환되지 않으므로 staged_paths/install과 함께 사용)"""
+    import joblib
+    from sklearn.pipeline import make_pipeline
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.decomposition import TruncatedSVD
+
+    model = make_pipeline(
+        HashingVectorizer(analyzer="char_wb", ngram_range=(2, 3), n_features=2 ** 15,
+                          alternate_sign=False, norm=None),
+        TfidfTransformer(sublinear_tf=True),
+        TruncatedSVD(n_components=DIM, random_state=0),
+    )
+    model.fit(texts)
+    svd = model[-1]
+    svd.components_ = svd.components_.astype(np.float32)  # 모델 파일/메모리 절반
+    os.makedirs(_index_dir(), exist_ok=True)
+    joblib.dump(model, path)
+    return model
+
+def embed(texts: List[str], batch_size: int = 5000, model=None) -> Optional[np.ndarray]:
+    """(n, DIM) float32, 행별 L2 정규화. model 생략 시 저장된 모델, 그것도 없으면 None"""
+    model = model if model is not None else load_model()
+    if model is None:
+        return None
+    out = np.empty((len(texts), DIM), dtype=np.float32)
+    for i in range(0, len(texts), batch_size):
+        vecs = model.transform(texts[i:i + batch_size]).astype(np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        out[i:i + batch_size] = vecs / np.maximum(norms, 1e-12)
+    return out
+
+# -------------------------
+# 벡터 파일 (row_idx 위치에 기록, memmap 조회)
+# -------------------------
+def write_vectors(rows, vecs: np.ndarray, path: Optional[str] = None) -> None:
+    """
+    vecs[i]를 rows[i] 행에 기록 (rows가 정수면 그 행부터 연속). 호출 측(DB 트랜잭션)이 행 번호를
+    할당하므로 롤백된 트랜잭션이 남긴 행은 다음 할당 때 그대로 덮어쓴다.
+    """
+    path = path or _vectors_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = np.ascontiguousarray(vecs, dtype="<f4")
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        if isinstance(rows, (int, np.integer)):
+            f.seek(int(rows) * DIM * 4)
+            f.write(data.tobytes())
+            return
+        for row, vec in zip(rows, data):
+            f.seek(int(row) * DIM * 4)
+            f.write(vec.tobytes())
+
+_mm: Optional[np.memmap] = None
+_mm_key = None
+_mm_lock = threading.Lock()
+
+def _matrix() -> Optional[np.memmap]:
+    """파일이 바뀌었으면(추가 기록, 재색인으로 교체) 다시 매핑"""
+    global _mm, _mm_key
+    stamp = _stamp(_vectors_path())
+    rows = stamp[2] // (DIM * 4) if stamp else 0
+    if rows == 0:
+        return None
+    with _mm_lock:
+        if _mm is None or stamp != _mm_key:
+            _mm = np.memmap(_vectors_path(), dtype="<f4", mode="r", shape=(rows, DIM))
+            _mm_key = stamp
+        return _mm
+
+# -------------------------
+# 검색
+# -------------------------
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+@tracing.traced("semantic.search")
+def search(query: str, k: int = 10, product_id: Optional[str] = None) -> List[Tuple[str, float]]:
+    """질의와 의미가 가까운 리뷰 [(review_no, 유사도)] 상위 k개"""
+    mm = _matrix()
+    q = embed([query]) if mm is not None else None
+    if q is None:
+        return []
+    q = q[0]
+
+    if product_id is not None:
+        ids = pd.read_sql(
+            text("SELECT review_no, row_idx FROM review_vectors WHERE product_id = :pid"),
+            engine, params={"pid": str(product_id)},
+        )
+        ids = ids[ids["row_idx"] < len(mm)]
+        if ids.empty:
+            return []
+        rows = ids["row_idx"].to_numpy(dtype=np.int64)
+        scores = np.asarray(mm[rows] @ q)
+        best = _top_k(scores, k)
+        return [(str(ids["review_no"].iat[i]), float(scores[i])) for i in best]
+
+    scores = np.asarray(mm @ q)
+    best = _top_k(scores, k)
+    if len(best) == 0:
+        return []
+    marks = ", ".join(f":r{i}" for i in range(len(best)))
+    ids = pd.read_sql(
+        text(f"SELECT review_no, row_idx FROM review_vectors WHERE row_idx IN ({marks})"),
+        engine, params={f"r{i}": int(r) for i, r in enumerate(best)},
+    )
+    by_row = dict(zip(ids["row_idx"].astype(int), ids["review_no"].astype(str)))
+    return [(by_row[int(r)], float(scores[r])) for r in best if int(r) in by_row]
+
+@tracing.traced("semantic.relevant_texts")
+def relevant_texts(reviews_df: pd.DataFrame, query: str, k: int) -> List[str]:
+    """상품 리뷰 중 질의와 가까운 리뷰 본문 k개 (색인이 없으면 앞에서부터 k개)"""
+    product_id = str(reviews_df["product_id"].iloc[0])
+    hits = search(query, k=k, product_id=product_id)
+    texts = reviews_df.set_index("review_no")["content"]
+    picked = [texts[rno] for rno, _ in hits if rno in texts.index]
+    if not picked:
+        return reviews_df["content"].dropna().tolist()[:k]
+    return [str(t) for t in picked if isinstance(t, str)]
@@ -1,85 +1,229 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
+from cachetools import LRUCache
 
-from analyzer import summarize_reviews, summarize_size_and_fit, summarize_coordination
+import config
+from modules import tracing
+from modules.data import (
+    data_version, load_review_token_lists, load_keyword_counts, load_rollups, load_monthly_top_terms,
+    _fetch_keyword_counts,
+    load_review_page, load_review_count, load_product_history, load_last_observed, load_product_page,
+)
+from modules.trends import trend_frame, history_frame
+from modules.semantic import search, relevant_texts
+from modules.distinctive import distinctive_terms
+from analyzer import stream_summary, summarize_size_and_fit, summarize_coordination, is_fallback
 from modules.analytics import (
-    compute_kpis, sentiment_percentages, donut_figure,
-    default_stopwords, keyword_freq, wordcloud_figure, topn_progress_table,
+    compute_kpis, sentiment_percentages, donut_png,
+    default_stopwords, keyword_freq, wordcloud_png, topn_progress_table,
 )
 
-def render_tabs(reviews_df: pd.DataFrame, products: pd.DataFrame):
-    reviews_texts = reviews_df["content"].dropna().astype(str).tolist()
+# 선택한 섹션만 계산한다 (st.tabs는 보이지 않는 탭까지 매번 전부 실행)
+SECTIONS = ["📊 리뷰 분석", "👟 사이즈·코디", "🔤 키워드", "📈 트렌드", "📋 전체 목록"]
+
+# 다음에 볼 가능성이 높은 섹션 (현재 섹션을 그린 뒤 백그라운드에서 미리 계산)
+NEXT_SECTION = {SECTIONS[0]: SECTIONS[1], SECTIONS[1]: SECTIONS[2]}
+
+SIZE_QUERY = "사이즈 정사이즈 발볼 발등 착화감 크다 작다"
+COORD_QUERY = "코디 스타일 청바지 슬랙스 데일리 색상 옷"
+
+# 전체 목록 탭의 같은 카테고리 상품 표 (선택기 검색/페이지와 무관하게 리뷰 많은 순 상위)
+RECOMMEND_SIZE = 50
+
+# -------------------------
+# 섹션 결과 메모 (세션) + 미리 계산 (프로세스 공용)
+# -------------------------
+MEMO_MAX = 32
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="algosa-prefetch")
+_prefetched = LRUCache(maxsize=64)   # key → Future
+_prefetch_lock = threading.Lock()
+
+def _memo(key: tuple, compute, keep=lambda value: True):
+    """
+    세션 메모 → 미리 계산된 결과 → 직접 계산 순으로 사용.
+    keep(value)가 False인 결과(요약 실패 기본값 등)는 이번 화면에만 쓰고 기억하지 않는다
+    """
+    memo = st.session_state.setdefault("_section_memo", {})
+    if key in memo:
+        return memo[key]
+
+    with _prefetch_lock:
+        future = _prefetched.get(key)
+    with tracing.span(f"tabs.{key[0]}", prefetched=future is not None):
+        try:
+            value = future.result() if future is not None else compute()
+        except Exception:
+            if future is None:
+                raise
+            with _prefetch_lock:  # 실패한 미리 계산은 버리고 직접 계산
+                _prefetched.pop(key, None)
+            value = compute()
+
+    if not keep(value):
+        with _prefetch_lock:
+            _prefetched.pop(key, None)
+        return value
+    if len(memo) >= MEMO_MAX:
+        memo.pop(next(iter(memo)))
+    memo[key] = value
+    return value
+
+def _summaries_ok(value) -> bool:
+    results = value if isinstance(value, tuple) else (value,)
+    return not any(is_fallback(r) for r in results)
+
+def _prefetch(key: tuple, compute):
+    """
+    compute를 백그라운드 스레드에서 실행. 스크립트 실행 컨텍스트가 없으므로
+    st.cache_data 로더 대신 원본 조회(_fetch_*)만 호출해야 한다
+    """
+    if not getattr(config, "PREFETCH_SECTIONS", True):
+        return
+    if key in st.session_state.get("_section_memo", {}):
+        return
+    with _prefetch_lock:
+        if key not in _prefetched:
+            _prefetched[key] = _prefetch_pool.submit(compute)
+
+# -------------------------
+# 섹션별 계산 (UI 없음 → 백그라운드 스레드에서도 실행 가능)
+# -------------------------
+def _compute_size_coord(rep_df: pd.DataFrame, product_id: str):
+    # 전체 리뷰 앞부분 대신 주제와 가까운 리뷰를 골라 프롬프트에 사용
+    size_texts = relevant_texts(rep_df, SIZE_QUERY, k=80)
+    coord_texts = relevant_texts(rep_df, COORD_QUERY, k=80)
+    return (
+        summarize_size_and_fit(size_texts, sample_size=80, product_id=product_id),
+        summarize_coordination(coord_texts, sample_size=80, product_id=product_id),
+    )
+
+def _compute_keywords(rep_df: pd.DataFrame, reviews_texts: list, product_id: str, category,
+                      background: bool = False):
+    # 수집 시 갱신된 키워드 인덱스 우선, 없으면(구 DB) 저장된 토큰으로 계산
+    counts = _fetch_keyword_counts if background else load_keyword_counts
+    freq = counts(product_id, limit=200)
+    if not freq:
+        freq = keyword_freq(
+            reviews_texts,
+            stopwords=default_stopwords(),
+            use_morph=True,          # konlpy 설치 시 명사 기준
+            max_features=2000,
+            tokens=load_review_token_lists(rep_df),  # 수집 시 저장된 토큰 재사용
+            top_k=200,               # 워드클라우드 max_words
+        )
+    # 카테고리 내 다른 상품 대비 특징 키워드 (카테고리 전체 희소 행렬 1회 계산 후 공유)
+    distinct = distinctive_terms(category, product_id, k=10) if category else []
+    return freq, distinct
+
+
+def render_tabs(reviews_df: pd.DataFrame, product: pd.Series):
+    # 유사/중복 리뷰는 대표 1건만 분석·프롬프트에 사용
+    rep_df = reviews_df[reviews_df["dup_of"].isna()] if "dup_of" in reviews_df else reviews_df
+    reviews_texts = rep_df["content"].dropna().tolist()
+    product_id = str(reviews_df["product_id"].iloc[0])
+    category = str(product["category"]) if pd.notna(product.get("category")) else None
     kpis = compute_kpis(reviews_df)
+    version = data_version(f"product:{product_id}")
 
     # KPI 요약
     st.divider()
     st.markdown("### 📌 요약 지표")
-    
-    m1, m2, m3 = st.columns([0.8, 1.2, 2.0]) 
+
+    m1, m2, m3 = st.columns([0.8, 1.2, 2.0])
     m1.metric("분석대상 리뷰 수", f"{kpis['total']:,}개")
     m2.metric("긍정 / 중립 / 부정", f"{kpis['pos']:,} / {kpis['neu']:,} / {kpis['neg']:,}")
 
     start, end = kpis["date_min"], kpis["date_max"]
     period = f"{start:%y/%m/%d} ~ {end:%y/%m/%d}" if pd.notna(start) and pd.notna(end) else "기간 정보 없음"
     m3.metric("수집 리뷰 기간", period)
+    if kpis["duplicates"]:
+        st.caption(f"유사·중복 리뷰 {kpis['duplicates']:,}개({kpis['duplicates'] / max(kpis['total'], 1):.0%})는 "
+                   "요약·키워드 분석에서 대표 리뷰 1건으로 합쳐 계산했습니다.")
+
+    section = st.radio("분석 항목", SECTIONS, horizontal=True, key="section", label_visibility="collapsed")
+    tracing.annotate(section=SECTIONS.index(section))
 
-    tab1, tab2, tab3 = st.tabs([f"📊 리뷰 분석 ({kpis['total']:,})", "👟 사이즈·코디", "🔤 키워드"])
+    size_key = ("size_coord", product_id, version)
+    keywords_key = ("keywords", product_id, version)
+    prefetch = {
+        SECTIONS[1]: lambda: _prefetch(size_key, lambda: _compute_size_coord(rep_df, product_id)),
+        SECTIONS[2]: lambda: _prefetch(keywords_key, lambda: _compute_keywords(rep_df, reviews_texts, product_id, category,
+                                                                                background=True)),
+    }
 
-    # Tab1: 리뷰 분석
-    with tab1:
-        st.markdown("### 📊 리뷰 분석 결과")
+    # 리뷰 분석: 첫 화면은 KPI + 도넛, 요약은 스트리밍으로 채움
+    if section == SECTIONS[0]:
+        st.markdown(f"### 📊 리뷰 분석 결과 ({kpis['total']:,}개)")
 
         vals = sentiment_percentages(kpis)
         c1, c2 = st.columns([1, 1])
 
         with c1:
-            fig = donut_figure(vals, kpis["total"])
-            st.pyplot(fig, use_container_width=False)
-
-        summary_result = summarize_reviews(reviews_texts, sample_size=50)
+            st.image(donut_png(vals, kpis["total"]))
 
         with c2:
             st.markdown("#### ✅ 전반적인 평가")
-            st.write(summary_result.get("positive_negative", "요약 없음"))
+            overall_ph = st.empty()
+            overall_ph.caption("리뷰를 분석하는 중...")
 
         c3, c4 = st.columns([1, 1])
         with c3:
             st.markdown("#### ⚠️ 주의해야 할 점")
-            for c in summary_result.get("cautions", []):
-                st.error(c)
+            cautions_ph = st.empty()
         with c4:
             st.markdown("#### 💬 자주 언급된 특징")
-            for f in summary_result.get("features", []):
-                st.success(f)
+            features_ph = st.empty()
+
+        # 스트리밍: 필드가 완성되는 대로 해당 자리에 채움
+        def _fill(key, value):
+            if key == "positive_negative":
+                overall_ph.write(value or "요약 없음")
+            elif key == "cautions":
+                with cautions_ph.container():
+                    for c in value or []:
+                        st.error(c)
+            elif key == "features":
+                with features_ph.container():
+                    for f in value or []:
+                        st.success(f)
+
+        summary_key = ("summary", product_id, version)
+        memo = st.session_state.get("_section_memo", {})
+        if summary_key in memo:
+            for k, v in memo[summary_key].items():
+                _fill(k, v)
+        else:
+            _memo(summary_key, lambda: stream_summary(reviews_texts, sample_size=50, product_id=product_id, on_field=_fill),
+                  keep=_summaries_ok)
+
+    # 사이즈/코디
+    elif section == SECTIONS[1]:
+        with st.spinner("사이즈·코디 리뷰를 분석하는 중..."):
+            size_res, coord_res = _memo(size_key, lambda: _compute_size_coord(rep_df, product_id), keep=_summaries_ok)
 
-    # Tab2: 사이즈/코디
-    with tab2:
         st.markdown("### 👟 구매자들이 느낀 사이즈 체감입니다.")
-        size_res = summarize_size_and_fit(reviews_texts, sample_size=80)
         st.info(size_res.get("size_summary", "요약 없음"))
         for r in size_res.get("recommendations", []):
             st.warning(r)
 
         st.divider()
         st.markdown("### 💁‍♂️ 이런 분이라면 만족하실 거예요.")
-        coord_res = summarize_coordination(reviews_texts, sample_size=80)
         st.info(coord_res.get("coord_summary", "요약 없음"))
         for t in coord_res.get("outfit_tips", []):
             st.success(t)
 
-    # Tab3: 키워드 워드클라우드
-    with tab3:
+    # 키워드 워드클라우드
+    elif section == SECTIONS[2]:
         st.markdown("### 🔤 리뷰 키워드 분석")
 
         if len(reviews_texts) == 0:
             st.info("키워드 분석할 리뷰가 없습니다.")
         else:
-            freq = keyword_freq(
-                reviews_texts,
-                stopwords=default_stopwords(),
-                use_morph=True,          # konlpy 설치 시 명사 기준
-                max_features=2000,
-            )
+            freq, distinct = _memo(keywords_key, lambda: _compute_keywords(rep_df, reviews_texts, product_id, category))
 
             if not freq:
                 st.info("표시할 키워드가 없습니다.")
@@ -89,17 +233,17 @@ def render_tabs(reviews_df: pd.DataFrame, products: pd.DataFrame):
                 max_count = int(kw_df["count"].max() or 1)
 
                 k1, k2 = st.columns([1, 1])
-                
+
                 with k1: # WordCloud
                     st.markdown("#### 워드 클라우드")
 
-                    fig_wc, _ = wordcloud_figure(freq)
-                    if fig_wc is None:
+                    wc_png = wordcloud_png(freq)
+                    if wc_png is None:
                         st.info("한글 폰트를 찾지 못해 워드클라우드를 표시할 수 없습니다.")
                     else:
-                        st.pyplot(fig_wc, use_container_width=True)
+                        st.image(wc_png, use_container_width=True)
                         st.write('해당 상품 리뷰에 가장 많이 등장한 키워드들입니다.')
-            
+
                 with k2: # 진행바 테이블
                     st.markdown("#### 최다 언급 키워드 TOP 10")
 
@@ -119,21 +263,164 @@ def render_tabs(reviews_df: pd.DataFrame, products: pd.DataFrame):
                         },
                     )
 
+                st.markdown("#### 🔍 이 상품만의 키워드")
+                if not distinct:
+                    st.info("같은 카테고리 상품과 비교할 키워드가 아직 없습니다.")
+                else:
+                    st.write(" · ".join(f"**{w}**" for w, _ in distinct))
+                    st.caption("같은 카테고리의 다른 상품 리뷰보다 이 상품 리뷰에서 유독 많이 언급된 단어입니다.")
+
+    # 기간별 추이 (수집 시 갱신된 롤업만 읽음, 집계 단위 변경은 이 부분만 다시 실행)
+    elif section == SECTIONS[3]:
+        _render_trends(product_id)
+
     # 리뷰 원본/상품 테이블
+    else:
+        _render_tables(product_id, category)
+
+    # 현재 섹션을 다 그린 뒤 다음 섹션을 미리 계산
+    nxt = NEXT_SECTION.get(section)
+    if nxt in prefetch:
+        prefetch[nxt]()
+
     st.divider()
+    with st.expander("🔎 리뷰 검색", expanded=False):
+        query = st.text_input("찾고 싶은 내용을 문장으로 입력하세요", placeholder="예: 발볼 넓은 사람 후기", key="review_search")
+        if query:
+            hits = search(query, k=10, product_id=product_id)
+            if not hits:
+                st.info("검색 색인이 아직 없거나 결과가 없습니다.")
+            else:
+                by_no = reviews_df.set_index("review_no")
+                for rno, score in hits:
+                    if rno not in by_no.index:
+                        continue
+                    row = by_no.loc[rno]
+                    st.markdown(f"**{'⭐' * int(row['grade'])}** · {row['createDate']:%Y-%m-%d} · 유사도 {score:.2f}")
+                    st.write(row["content"])
+
+
+@st.fragment
+@tracing.traced("tabs.trends")
+def _render_trends(product_id: str):
+    st.markdown("### 📈 리뷰 추이")
+    period_label = st.radio("집계 단위", ["월간", "주간"], horizontal=True, key="trend_period")
+    trend = trend_frame(load_rollups(product_id, "M" if period_label == "월간" else "W"))
+
+    if trend.empty:
+        st.info("추이를 표시할 데이터가 없습니다.")
+        return
+
+    st.markdown("#### 리뷰 수")
+    st.bar_chart(trend["reviews"])
+
+    t1, t2 = st.columns([1, 1])
+    with t1:
+        st.markdown("#### 긍정 / 부정 비율 (%)")
+        st.line_chart(trend[["pos_pct", "neg_pct"]].rename(columns={"pos_pct": "긍정", "neg_pct": "부정"}))
+    with t2:
+        st.markdown("#### 평균 평점")
+        st.line_chart(trend["avg_grade"].rename("평균 평점"))
+
+    # 가격/리뷰 증가 속도 (최근 1년, 수집 때 값이 바뀐 시점만 저장된 이력 → 마지막 수집일까지)
+    since = f"{pd.Timestamp.now() - pd.DateOffset(years=1):%Y-%m-%d}"
+    history = history_frame(load_product_history(product_id, start=since), start=since,
+                            until=load_last_observed(product_id))
+    if len(history) >= 2:
+        h1, h2 = st.columns([1, 1])
+        with h1:
+            st.markdown("#### 가격 변동")
+            st.line_chart(history["price"].rename("가격"))
+        with h2:
+            st.markdown("#### 하루 신규 리뷰")
+            st.bar_chart(history["new_reviews"].rename("신규 리뷰"))
+
+    st.markdown("#### 월별 주요 키워드")
+    top_terms = load_monthly_top_terms(product_id, per_month=3)
+    if top_terms.empty:
+        st.info("월별 키워드가 없습니다.")
+    else:
+        by_month = (
+            top_terms.groupby("month", sort=False)["term"]
+                     .agg(" · ".join)
+                     .head(12)
+                     .reset_index()
+                     .rename(columns={"month": "월", "term": "키워드"})
+        )
+        st.dataframe(by_month, use_container_width=True, hide_index=True)
+
+
+@tracing.traced("tabs.tables")
+def _render_tables(product_id: str, category: str | None):
     st.markdown("### 전체목록 보기")
 
-    with st.expander("📊 선택된 상품 리뷰 보기", expanded=False):
-        show_cols = ["userNickName", "content", "grade", "createDate"]
-        r_df = reviews_df.loc[:, show_cols].copy()
-        r_df["grade"] = pd.to_numeric(r_df["grade"], errors="coerce").astype("Int64")
-        r_df["createDate"] = pd.to_datetime(r_df["createDate"], errors="coerce").dt.strftime("%Y-%m-%d")
-        r_df = r_df.sort_values("createDate", ascending=False, na_position="last")
-        r_df = r_df.rename(columns={"userNickName": "닉네임", "content": "내용", "grade": "평점", "createDate": "작성일"})
-        st.dataframe(r_df, use_container_width=True, hide_index=True)
-
-    with st.expander("🛒 다른 무신사 추천상품 보기", expanded=False): 
-        show_cols = ["brandName","goodsName","price","reviewScore","reviewCount"] 
-        p_df = products.loc[:, show_cols].copy() 
-        p_df = p_df.rename(columns={"brandName":"브랜드","goodsName":"상품명","price":"가격","reviewScore":"평점","reviewCount":"리뷰 수"}) 
-        st.dataframe(p_df, use_container_width=True, hide_index=True)
+    st.markdown("#### 📊 선택된 상품 리뷰")
+    _render_review_browser(product_id)
+
+    st.markdown("#### 🛒 다른 무신사 추천상품")
+    if not category:
+        return
+    products, _ = load_product_page(category, None, RECOMMEND_SIZE + 1)
+    products = products[products["product_id"] != product_id].head(RECOMMEND_SIZE)
+    show_cols = ["brandName","goodsName","price","reviewScore","reviewCount"]
+    p_df = products.loc[:, show_cols].copy()
+    p_df = p_df.rename(columns={"brandName":"브랜드","goodsName":"상품명","price":"가격","reviewScore":"평점","reviewCount":"리뷰 수"})
+    st.dataframe(p_df, use_container_width=True, hide_index=True)
+
+
+# -------------------------
+# 리뷰 목록 (필터는 SQL로, 한 페이지씩 키셋 페이지네이션)
+# -------------------------
+def _page_next(cursor):
+    st.session_state["_review_pages"]["cursors"].append(cursor)
+
+def _page_back():
+    cursors = st.session_state["_review_pages"]["cursors"]
+    if len(cursors) > 1:
+        cursors.pop()
+
+@st.fragment
+@tracing.traced("tabs.review_browser")
+def _render_review_browser(product_id: str):
+    f1, f2, f3, f4 = st.columns([1.2, 1.4, 2.0, 0.8])
+    min_grade, max_grade = f1.slider("평점", 1, 5, (1, 5), key="rb_grade")
+    dates = f2.date_input("작성일", value=(), key="rb_dates")
+    text_query = f3.text_input("내용 검색", placeholder="포함된 단어", key="rb_text").strip()
+    page_size = f4.selectbox("개수", [20, 50, 100], index=1, key="rb_size")
+
+    filters = {
+        "min_grade": min_grade, "max_grade": max_grade,
+        "start_date": str(dates[0]) if len(dates) > 0 else None,
+        "end_date": str(dates[1]) if len(dates) > 1 else None,
+        "text_query": text_query or None,
+    }
+
+    # 상품/필터가 바뀌면 첫 페이지부터 (cursors: 지금까지 지나온 페이지의 시작 커서)
+    state_key = (product_id, page_size, tuple(sorted(filters.items())))
+    nav = st.session_state.get("_review_pages")
+    if not nav or nav["key"] != state_key:
+        nav = st.session_state["_review_pages"] = {"key": state_key, "cursors": [None]}
+
+    page, next_cursor = load_review_page(product_id, nav["cursors"][-1], page_size, **filters)
+    total = load_review_count(product_id, **filters)
+
+    if page.empty:
+        st.info("조건에 맞는 리뷰가 없습니다.")
+        return
+
+    view = pd.DataFrame({
+        "닉네임": page["userNickName"],
+        "내용": page["content"],
+        "평점": page["grade"],
+        "작성일": page["createDate"],
+    })
+    st.dataframe(view, use_container_width=True, hide_index=True,
+                 column_config={"작성일": st.column_config.DateColumn("작성일", format="YYYY-MM-DD")})
+
+    page_no = len(nav["cursors"])
+    pages = max(1, -(-total // page_size))
+    b1, b2, b3 = st.columns([1, 3, 1])
+    b1.button("◀ 이전", key="rb_prev", on_click=_page_back, disabled=page_no == 1, use_container_width=True)
+    b2.caption(f"{page_no} / {pages} 페이지 · 조건에 맞는 리뷰 {total:,}개")
+    b3.button("다음 ▶", key="rb_next", on_click=_page_next, args=(next_cursor,),
+              disabled=next_cursor is None, use_container_width=True)
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional, List
+
+import config
+
+logger = logging.getLogger("algosa.trace")
+
+# -------------------------
+# 단계별 소요시간 계측 (span)
+#
+#   with tracing.span("db.save_reviews", rows=len(df)): ...
+#   @tracing.traced("analytics.keyword_freq")
+#
+# - 꺼져 있으면 span()은 공용 no-op 객체를 돌려주고 traced()는 원 함수를 바로 호출 (전역 플래그 1회 확인)
+# - 켜는 방법: config.TRACING = True (또는 ALGOSA_TRACING=1) → 모든 루트 span 기록
+#              span(..., force=True) → 그 span 아래만 기록 (대시보드 ?debug=perf 한 번의 실행만 계측)
+# - 루트 span이 끝나면 트리를 JSON 로그로 남기고 이름별 히스토그램에 합산 (prometheus_text())
+# -------------------------
+_enabled = bool(getattr(config, "TRACING", os.getenv("ALGOSA_TRACING", "0") == "1"))
+_current: ContextVar[Optional["Span"]] = ContextVar("algosa_span", default=None)
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "duration", "children", "error", "_token")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.children: List["Span"] = []
+        self.duration = 0.0
+        self.error = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _current.reset(self._token)
+        parent = _current.get()
+        if parent is not None:
+            parent.children.append(self)
+        else:
+            _finish_root(self)
+        return False
+
+    @property
+    def self_time(self) -> float:
+        return max(self.duration - sum(c.duration for c in self.children), 0.0)
+
+    def as_dict(self) -> dict:
+        out = {"name": self.name, "ms": round(self.duration * 1000, 2)}
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.error:
+            out["error"] = self.error
+        if self.children:
+            out["children"] = [c.as_dict() for c in self.children]
+        return out
+
+    def rows(self, path: tuple = ()):
+        """(경로, 총 ms, 자체 ms) 전위 순회 - 패널 표시용"""
+        path = (*path, self.name)
+        yield path, self.duration * 1000, self.self_time * 1000
+        for c in self.children:
+            yield from c.rows(path)
+
+
+class _NoopSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, **attrs): pass
+
+_NOOP = _NoopSpan()
+
+
+def enabled() -> bool:
+    return _enabled
+
+def set_enabled(value: bool) -> None:
+    global _enabled
+    _enabled = bool(value)
+
+def span(name: str, force: bool = False, **attrs):
+    """계측이 켜져 있거나 상위 span이 있으면 Span, 아니면 no-op"""
+    if _enabled or force or _current.get() is not None:
+        return Span(name, attrs)
+    return _NOOP
+
+def annotate(**attrs) -> None:
+    """현재 span에 속성 추가 (계측 중이 아니면 무시)"""
+    current = _current.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+def traced(name: Optional[str] = None):
+    """함수 전체를 span으로 감싸는 데코레이터 (이름 생략 시 '모듈.함수')"""
+    def deco(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled and _current.get() is None:
+                return fn(*args, **kwargs)
+            with Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+# -------------------------
+# 집계 / 내보내기
+# -------------------------
+_lock = threading.Lock()
+_histograms: dict = {}     # name → {"buckets": [...], "sum": s, "count": n, "errors": e}
+recent: deque = deque(maxlen=32)   # 최근 루트 트리
+
+def _observe(s: Span):
+    h = _histograms.get(s.name)
+    if h is None:
+        h = _histograms[s.name] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0, "errors": 0}
+    for i, le in enumerate(BUCKETS):
+        if s.duration <= le:
+            h["buckets"][i] += 1
+    h["sum"] += s.duration
+    h["count"] += 1
+    h["errors"] += int(s.error is not None)
+    for c in s.children:
+        _observe(c)
+
+def _finish_root(root: Span):
+    with _lock:
+        _observe(root)
+        recent.append(root)
+    if getattr(config, "TRACE_LOG", True):
+        logger.info(json.dumps({"event": "trace", **root.as_dict()}, ensure_ascii=False, default=str))
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text() -> str:
+    """Prometheus text exposition (span 이름별 히스토그램 + 오류 수)"""
+    with _lock:
+        items = sorted((name, dict(h, buckets=list(h["buckets"]))) for name, h in _histograms.items())
+    lines = [
+        "# HELP algosa_span_seconds Time spent in traced stages.",
+        "# TYPE algosa_span_seconds histogram",
+    ]
+    for name, h in items:
+        n = _label(name)
+        for le, count in zip(BUCKETS, h["buckets"]):
+            lines.append(f'algosa_span_seconds_bucket{{span="{n}",le="{le}"}} {count}')
+        lines.append(f'algosa_span_seconds_bucket{{span="{n}",le="+Inf"}} {h["count"]}')
+        lines.append(f'algosa_span_seconds_sum{{span="{n}"}} {h["sum"]:.6f}')
+        lines.append(f'algosa_span_seconds_count{{span="{n}"}} {h["count"]}')
+    lines += ["# HELP algosa_span_errors_total Traced stages that raised.",
+              "# TYPE algosa_span_errors_total counter"]
+    lines += [f'algosa_span_errors_total{{span="{_label(name)}"}} {h["errors"]}' for name, h in items]
+    return "\n".join(lines) + "\n"
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        recent.clear()
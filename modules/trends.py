@@ -0,0 +1,100 @@
+from typing import Dict, Tuple
+
+import pandas as pd
+
+# ============================== 기간별 롤업 ==============================
+# W: 월요일 시작 주간, M: 월간
+PERIODS: Dict[str, str] = {"W": "W-MON", "M": "MS"}
+
+ROLLUP_COLUMNS = [
+    "product_id", "period", "period_start", "reviews", "grade_sum",
+    "grade_1", "grade_2", "grade_3", "grade_4", "grade_5", "pos", "neu", "neg",
+]
+
+def period_start(dates: pd.Series, period: str) -> pd.Series:
+    """날짜 → 해당 주/월의 시작일"""
+    dates = pd.to_datetime(dates, errors="coerce")
+    if period == "W":
+        return (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.normalize()
+    return dates.dt.to_period("M").dt.start_time
+
+def period_bounds(dates: pd.Series, period: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """dates가 속한 버킷 전체를 덮는 [시작, 끝) 범위"""
+    starts = period_start(dates, period).dropna()
+    lo, hi = starts.min(), starts.max()
+    step = pd.DateOffset(weeks=1) if period == "W" else pd.DateOffset(months=1)
+    return lo, hi + step
+
+def compute_rollups(reviews_df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    리뷰(product_id, createDate, grade) → 상품·기간별 집계.
+    감성은 compute_kpis와 같은 평점 기준 (4↑ 긍정, 2↓ 부정).
+    """
+    if reviews_df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    df = pd.DataFrame({
+        "product_id": reviews_df["product_id"].astype(str),
+        "createDate": pd.to_datetime(reviews_df["createDate"], errors="coerce"),
+        "grade": pd.to_numeric(reviews_df["grade"], errors="coerce").fillna(0).astype(int),
+    }).dropna(subset=["createDate"])
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    for g in range(1, 6):
+        df[f"grade_{g}"] = (df["grade"] == g).astype(int)
+    df["pos"] = (df["grade"] >= 4).astype(int)
+    df["neg"] = (df["grade"] <= 2).astype(int)
+    df["neu"] = 1 - df["pos"] - df["neg"]
+
+    grouper = pd.Grouper(key="createDate", freq=PERIODS[period], label="left", closed="left")
+    out = (
+        df.groupby(["product_id", grouper])
+          .agg(reviews=("grade", "size"), grade_sum=("grade", "sum"),
+               grade_1=("grade_1", "sum"), grade_2=("grade_2", "sum"), grade_3=("grade_3", "sum"),
+               grade_4=("grade_4", "sum"), grade_5=("grade_5", "sum"),
+               pos=("pos", "sum"), neu=("neu", "sum"), neg=("neg", "sum"))
+          .reset_index()
+          .rename(columns={"createDate": "period_start"})
+    )
+    out = out[out["reviews"] > 0]
+    out["period"] = period
+    out["period_start"] = out["period_start"].dt.strftime("%Y-%m-%d")
+    return out[ROLLUP_COLUMNS].reset_index(drop=True)
+
+def history_frame(history: pd.DataFrame, start=None, until=None) -> pd.DataFrame:
+    """
+    가격/리뷰 수 이력(값이 바뀐 시점만) → 일별 차트용 (가격, 누적 리뷰 수, 하루 신규 리뷰).
+    가격은 다음 변경까지 유지, 리뷰 수는 관측 사이에 고르게 늘었다고 보고 보간.
+    until(마지막 수집 시각)이 있으면 마지막 변경 이후 그 날까지 같은 값으로 이어 그린다.
+    """
+    if history.empty:
+        return pd.DataFrame(columns=["price", "review_count", "new_reviews"])
+    daily = history.set_index("observed_at").sort_index()[["price", "reviewCount"]].astype(float).resample("D").last()
+    if until is not None and pd.notna(until):
+        end = pd.Timestamp(until).normalize()
+        if end > daily.index[-1]:
+            daily = daily.reindex(pd.date_range(daily.index[0], end, freq="D"))
+    out = pd.DataFrame({
+        "price": daily["price"].ffill(),
+        "review_count": daily["reviewCount"].interpolate(method="time", limit_area="inside").ffill().round(),
+    })
+    out["new_reviews"] = out["review_count"].diff().clip(lower=0)
+    if start is not None:
+        out = out[out.index >= pd.Timestamp(start)]
+    return out
+
+def trend_frame(rollups: pd.DataFrame) -> pd.DataFrame:
+    """저장된 롤업 → 차트용 (기간 인덱스, 리뷰 수 / 평균 평점 / 긍정·부정 비율)"""
+    if rollups.empty:
+        return pd.DataFrame(columns=["reviews", "avg_grade", "pos_pct", "neg_pct"])
+    df = rollups.copy()
+    df["period_start"] = pd.to_datetime(df["period_start"])
+    df = df.set_index("period_start").sort_index()
+    total = df["reviews"].clip(lower=1)
+    return pd.DataFrame({
+        "reviews": df["reviews"],
+        "avg_grade": (df["grade_sum"] / total).round(2),
+        "pos_pct": (df["pos"] / total * 100).round(1),
+        "neg_pct": (df["neg"] / total * 100).round(1),
+    })
@@ -0,0 +1,23 @@
+import analyzer
+from modules.cache import MemoryCache, SQLiteCache
+
+
+def test_zero_ttl_is_not_stored(tmp_path):
+    for cache in (MemoryCache(1 << 20, default_ttl=3600),
+                  SQLiteCache(str(tmp_path / "cache.db"), 1 << 20, default_ttl=3600, secret=b"k")):
+        cache.set("llm:a", 1, ttl=0)
+        assert cache.get("llm:a") is None
+        cache.set("llm:b", 2)          # None → 기본 TTL
+        assert cache.get("llm:b") == 2
+
+
+def test_failure_ttl_zero_disables_failure_memo(monkeypatch):
+    cache = MemoryCache(1 << 20, default_ttl=3600)
+    monkeypatch.setattr(analyzer, "shared_cache", lambda: cache)
+    monkeypatch.setattr(analyzer, "FAILURE_TTL", 0)
+    analyzer._remember_failure("key")
+    assert not analyzer._failed_recently("key")
+
+    monkeypatch.setattr(analyzer, "FAILURE_TTL", 30)
+    analyzer._remember_failure("key")
+    assert analyzer._failed_recently("key")
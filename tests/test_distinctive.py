@@ -0,0 +1,20 @@
+import numpy as np
+from scipy import sparse
+
+from modules.distinctive import _log_odds
+
+
+def test_log_odds_single_term_category_is_finite():
+    # 단어 1개: 상품의 "그 밖의 단어" 분모가 0 (50 + 1 - 50 - 1)
+    for counts in ([[50.0], [50.0]], [[3.0], [5.0]]):
+        z = _log_odds(sparse.csr_matrix(np.array(counts)))
+        assert np.isfinite(z.data).all()
+        assert np.abs(z.data).max() < 100
+
+
+def test_log_odds_product_using_one_term_is_finite():
+    counts = sparse.csr_matrix(np.array([[4.0, 0.0, 0.0], [2.0, 3.0, 1.0], [0.0, 1.0, 5.0]]))
+    z = _log_odds(counts)
+    assert np.isfinite(z.data).all()
+    # 그 단어만 쓴 상품에서는 그 단어가 특징어 (양수)
+    assert z[0, 0] > 0